@@ -86,13 +86,17 @@ def read_tvt_data(training_file_names, validation_file_names,
 
 def normalize_tvt_data(
         training_predictor_table_denorm, validation_predictor_table_denorm,
-        testing_predictor_table_denorm):
+        testing_predictor_table_denorm, training_target_table,
+        validation_target_table, testing_target_table):
     """Normalizes training, validation, and testing data.
 
     :param training_predictor_table_denorm: See doc for
         `utils.read_feature_file`.
     :param validation_predictor_table_denorm: Same.
     :param testing_predictor_table_denorm: Same.
+    :param training_target_table: Same.
+    :param validation_target_table: Same.
+    :param testing_target_table: Same.
     """
 
     predictor_names = list(training_predictor_table_denorm)
@@ -141,16 +145,25 @@ def normalize_tvt_data(
         predictor_table=copy.deepcopy(testing_predictor_table_denorm),
         normalization_dict=normalization_dict)
 
+    # Convert tables to arrays once, rather than for every model.
+    training_dataset_dict = utils.create_dataset(
+        predictor_table=training_predictor_table,
+        target_table=training_target_table)
+
+    validation_dataset_dict = utils.create_dataset(
+        predictor_table=validation_predictor_table,
+        target_table=validation_target_table)
+
+    testing_dataset_dict = utils.create_dataset(
+        predictor_table=testing_predictor_table,
+        target_table=testing_target_table)
+
 
-def train_linear_regression(
-        training_predictor_table, training_target_table,
-        validation_predictor_table, validation_target_table):
+def train_linear_regression(training_dataset_dict, validation_dataset_dict):
     """Trains plain linear regression.
 
-    :param training_predictor_table: See doc for `utils.read_feature_file`.
-    :param training_target_table: Same.
-    :param validation_predictor_table: Same.
-    :param validation_target_table: Same.
+    :param training_dataset_dict: Dictionary created by `utils.create_dataset`.
+    :param validation_dataset_dict: Same.
     """
 
     linreg_model_object = utils.setup_linear_regression(
@@ -158,59 +171,54 @@ def train_linear_regression(
 
     _ = utils.train_linear_regression(
         model_object=linreg_model_object,
-        training_predictor_table=training_predictor_table,
-        training_target_table=training_target_table)
+        training_dataset_dict=training_dataset_dict)
 
     training_predictions = linreg_model_object.predict(
-        training_predictor_table.as_matrix()
+        training_dataset_dict[utils.PREDICTOR_MATRIX_KEY]
     )
     mean_training_target_value = numpy.mean(
-        training_target_table[utils.TARGET_NAME].values
+        training_dataset_dict[utils.TARGET_VALUES_KEY]
     )
 
     _ = utils.evaluate_regression(
-        target_values=training_target_table[utils.TARGET_NAME].values,
+        target_values=training_dataset_dict[utils.TARGET_VALUES_KEY],
         predicted_target_values=training_predictions,
         mean_training_target_value=mean_training_target_value,
         dataset_name='training')
     print(MINOR_SEPARATOR_STRING)
 
     validation_predictions = linreg_model_object.predict(
-        validation_predictor_table.as_matrix()
+        validation_dataset_dict[utils.PREDICTOR_MATRIX_KEY]
     )
 
     _ = utils.evaluate_regression(
-        target_values=validation_target_table[utils.TARGET_NAME].values,
+        target_values=validation_dataset_dict[utils.TARGET_VALUES_KEY],
         predicted_target_values=validation_predictions,
         mean_training_target_value=mean_training_target_value,
         dataset_name='validation')
 
 
 def plot_linear_regression_coeffs(linreg_model_object,
-                                  training_predictor_table):
+                                  training_dataset_dict):
     """Plots coefficients for plain linear regression.
 
     :param linreg_model_object: Trained instance of `sklearn.linear_model`.
-    :param training_predictor_table: See doc for `utils.read_feature_file`.
+    :param training_dataset_dict: Dictionary created by `utils.create_dataset`.
     """
 
     utils.plot_model_coefficients(
         model_object=linreg_model_object,
-        predictor_names=list(training_predictor_table)
+        predictor_names=training_dataset_dict[utils.PREDICTOR_NAMES_KEY]
     )
 
     pyplot.show()
 
 
-def train_linear_ridge(
-        training_predictor_table, training_target_table,
-        validation_predictor_table, validation_target_table):
+def train_linear_ridge(training_dataset_dict, validation_dataset_dict):
     """Trains linear regression with ridge penalty.
 
-    :param training_predictor_table: See doc for `utils.read_feature_file`.
-    :param training_target_table: Same.
-    :param validation_predictor_table: Same.
-    :param validation_target_table: Same.
+    :param training_dataset_dict: Dictionary created by `utils.create_dataset`.
+    :param validation_dataset_dict: Same.
     """
 
     linear_ridge_model_object = utils.setup_linear_regression(
@@ -218,60 +226,55 @@ def train_linear_ridge(
 
     _ = utils.train_linear_regression(
         model_object=linear_ridge_model_object,
-        training_predictor_table=training_predictor_table,
-        training_target_table=training_target_table)
+        training_dataset_dict=training_dataset_dict)
 
     training_predictions = linear_ridge_model_object.predict(
-        training_predictor_table.as_matrix()
+        training_dataset_dict[utils.PREDICTOR_MATRIX_KEY]
     )
     mean_training_target_value = numpy.mean(
-        training_target_table[utils.TARGET_NAME].values
+        training_dataset_dict[utils.TARGET_VALUES_KEY]
     )
 
     _ = utils.evaluate_regression(
-        target_values=training_target_table[utils.TARGET_NAME].values,
+        target_values=training_dataset_dict[utils.TARGET_VALUES_KEY],
         predicted_target_values=training_predictions,
         mean_training_target_value=mean_training_target_value,
         dataset_name='training')
     print(MINOR_SEPARATOR_STRING)
 
     validation_predictions = linear_ridge_model_object.predict(
-        validation_predictor_table.as_matrix()
+        validation_dataset_dict[utils.PREDICTOR_MATRIX_KEY]
     )
 
     _ = utils.evaluate_regression(
-        target_values=validation_target_table[utils.TARGET_NAME].values,
+        target_values=validation_dataset_dict[utils.TARGET_VALUES_KEY],
         predicted_target_values=validation_predictions,
         mean_training_target_value=mean_training_target_value,
         dataset_name='validation')
 
 
 def plot_linear_ridge_coeffs(linear_ridge_model_object,
-                             training_predictor_table):
+                             training_dataset_dict):
     """Plots coefficients for linear regression with ridge penalty.
 
     :param linear_ridge_model_object: Trained instance of
         `sklearn.linear_model`.
-    :param training_predictor_table: See doc for `utils.read_feature_file`.
+    :param training_dataset_dict: Dictionary created by `utils.create_dataset`.
     """
 
     utils.plot_model_coefficients(
         model_object=linear_ridge_model_object,
-        predictor_names=list(training_predictor_table)
+        predictor_names=training_dataset_dict[utils.PREDICTOR_NAMES_KEY]
     )
 
     pyplot.show()
 
 
-def train_linear_lasso(
-        training_predictor_table, training_target_table,
-        validation_predictor_table, validation_target_table):
+def train_linear_lasso(training_dataset_dict, validation_dataset_dict):
     """Trains linear regression with lasso penalty.
 
-    :param training_predictor_table: See doc for `utils.read_feature_file`.
-    :param training_target_table: Same.
-    :param validation_predictor_table: Same.
-    :param validation_target_table: Same.
+    :param training_dataset_dict: Dictionary created by `utils.create_dataset`.
+    :param validation_dataset_dict: Same.
     """
 
     linear_lasso_model_object = utils.setup_linear_regression(
@@ -279,59 +282,54 @@ def train_linear_lasso(
 
     _ = utils.train_linear_regression(
         model_object=linear_lasso_model_object,
-        training_predictor_table=training_predictor_table,
-        training_target_table=training_target_table)
+        training_dataset_dict=training_dataset_dict)
 
     training_predictions = linear_lasso_model_object.predict(
-        training_predictor_table.as_matrix()
+        training_dataset_dict[utils.PREDICTOR_MATRIX_KEY]
     )
     mean_training_target_value = numpy.mean(
-        training_target_table[utils.TARGET_NAME].values
+        training_dataset_dict[utils.TARGET_VALUES_KEY]
     )
 
     _ = utils.evaluate_regression(
-        target_values=training_target_table[utils.TARGET_NAME].values,
+        target_values=training_dataset_dict[utils.TARGET_VALUES_KEY],
         predicted_target_values=training_predictions,
         mean_training_target_value=mean_training_target_value,
         dataset_name='training')
     print(MINOR_SEPARATOR_STRING)
 
     validation_predictions = linear_lasso_model_object.predict(
-        validation_predictor_table.as_matrix()
+        validation_dataset_dict[utils.PREDICTOR_MATRIX_KEY]
     )
 
     _ = utils.evaluate_regression(
-        target_values=validation_target_table[utils.TARGET_NAME].values,
+        target_values=validation_dataset_dict[utils.TARGET_VALUES_KEY],
         predicted_target_values=validation_predictions,
         mean_training_target_value=mean_training_target_value,
         dataset_name='validation')
 
 
 def plot_linear_lasso_coeffs(linear_lasso_model_object,
-                             training_predictor_table):
+                             training_dataset_dict):
     """Plots coefficients for linear regression with lasso penalty.
 
     :param linear_lasso_model_object: Trained instance of `sklearn.linear_model`.
-    :param training_predictor_table: See doc for `utils.read_feature_file`.
+    :param training_dataset_dict: Dictionary created by `utils.create_dataset`.
     """
 
     utils.plot_model_coefficients(
         model_object=linear_lasso_model_object,
-        predictor_names=list(training_predictor_table)
+        predictor_names=training_dataset_dict[utils.PREDICTOR_NAMES_KEY]
     )
 
     pyplot.show()
 
 
-def train_linear_elastic_net(
-        training_predictor_table, training_target_table,
-        validation_predictor_table, validation_target_table):
+def train_linear_elastic_net(training_dataset_dict, validation_dataset_dict):
     """Trains linear regression with elastic-net penalty.
 
-    :param training_predictor_table: See doc for `utils.read_feature_file`.
-    :param training_target_table: Same.
-    :param validation_predictor_table: Same.
-    :param validation_target_table: Same.
+    :param training_dataset_dict: Dictionary created by `utils.create_dataset`.
+    :param validation_dataset_dict: Same.
     """
 
     linear_en_model_object = utils.setup_linear_regression(
@@ -339,121 +337,133 @@ def train_linear_elastic_net(
 
     _ = utils.train_linear_regression(
         model_object=linear_en_model_object,
-        training_predictor_table=training_predictor_table,
-        training_target_table=training_target_table)
+        training_dataset_dict=training_dataset_dict)
 
     training_predictions = linear_en_model_object.predict(
-        training_predictor_table.as_matrix()
+        training_dataset_dict[utils.PREDICTOR_MATRIX_KEY]
     )
     mean_training_target_value = numpy.mean(
-        training_target_table[utils.TARGET_NAME].values
+        training_dataset_dict[utils.TARGET_VALUES_KEY]
     )
 
     _ = utils.evaluate_regression(
-        target_values=training_target_table[utils.TARGET_NAME].values,
+        target_values=training_dataset_dict[utils.TARGET_VALUES_KEY],
         predicted_target_values=training_predictions,
         mean_training_target_value=mean_training_target_value,
         dataset_name='training')
     print(MINOR_SEPARATOR_STRING)
 
     validation_predictions = linear_en_model_object.predict(
-        validation_predictor_table.as_matrix()
+        validation_dataset_dict[utils.PREDICTOR_MATRIX_KEY]
     )
 
     _ = utils.evaluate_regression(
-        target_values=validation_target_table[utils.TARGET_NAME].values,
+        target_values=validation_dataset_dict[utils.TARGET_VALUES_KEY],
         predicted_target_values=validation_predictions,
         mean_training_target_value=mean_training_target_value,
         dataset_name='validation')
 
 
-def plot_linear_en_coeffs(linear_en_model_object, training_predictor_table):
+def plot_linear_en_coeffs(linear_en_model_object, training_dataset_dict):
     """Plots coefficients for linear regression with elastic-net penalty.
 
     :param linear_en_model_object: Trained instance of `sklearn.linear_model`.
-    :param training_predictor_table: See doc for `utils.read_feature_file`.
+    :param training_dataset_dict: Dictionary created by `utils.create_dataset`.
     """
 
     utils.plot_model_coefficients(
         model_object=linear_en_model_object,
-        predictor_names=list(training_predictor_table)
+        predictor_names=training_dataset_dict[utils.PREDICTOR_NAMES_KEY]
     )
 
     pyplot.show()
 
 
-def l1l2_experiment_training(
-        training_predictor_table, training_target_table,
-        validation_predictor_table, validation_target_table):
+def train_linear_elastic_net_streaming(
+        training_file_names, normalization_dict, mean_training_target_value,
+        validation_dataset_dict):
+    """Trains linear regression with elastic-net penalty, one file at a time.
+
+    :param training_file_names: 1-D list of paths to training files.
+    :param normalization_dict: Dictionary created by
+        `utils.normalize_predictors` for the training data.
+    :param mean_training_target_value: Mean target value in training data.
+    :param validation_dataset_dict: Dictionary created by
+        `utils.create_dataset`.
+    """
+
+    # With L1 regularization, the streaming method returns a new model object
+    # (`sklearn.linear_model.SGDRegressor`), so use the returned object rather
+    # than the one passed in.
+    linear_en_model_object = utils.train_linear_regression_streaming(
+        model_object=utils.setup_linear_regression(lambda1=1e-5, lambda2=5.),
+        training_file_names=training_file_names,
+        normalization_dict=normalization_dict)
+
+    validation_predictions = linear_en_model_object.predict(
+        validation_dataset_dict[utils.PREDICTOR_MATRIX_KEY]
+    )
+
+    _ = utils.evaluate_regression(
+        target_values=validation_dataset_dict[utils.TARGET_VALUES_KEY],
+        predicted_target_values=validation_predictions,
+        mean_training_target_value=mean_training_target_value,
+        dataset_name='validation')
+
+
+def l1l2_experiment_training(training_dataset_dict, validation_dataset_dict):
     """Trains models for hyperparameter experiment with L1/L2 regularization.
 
-    :param training_predictor_table: See doc for `utils.read_feature_file`.
-    :param training_target_table: Same.
-    :param validation_predictor_table: Same.
-    :param validation_target_table: Same.
+    :param training_dataset_dict: Dictionary created by `utils.create_dataset`.
+    :param validation_dataset_dict: Same.
     """
 
     lambda1_values = numpy.logspace(-8, -4, num=9)
     lambda2_values = numpy.logspace(-4, 1, num=11)
 
-    num_lambda1 = len(lambda1_values)
-    num_lambda2 = len(lambda2_values)
+    grid_search_dict = utils.run_l1l2_grid_search(
+        training_dataset_dict=training_dataset_dict,
+        validation_dataset_dict=validation_dataset_dict,
+        lambda1_values=lambda1_values, lambda2_values=lambda2_values)
 
-    validation_mae_matrix_s01 = numpy.full(
-        (num_lambda1, num_lambda2), numpy.nan
-    )
-    validation_mse_matrix_s02 = numpy.full(
-        (num_lambda1, num_lambda2), numpy.nan
-    )
-    validation_mae_skill_matrix = numpy.full(
-        (num_lambda1, num_lambda2), numpy.nan
-    )
-    validation_mse_skill_matrix = numpy.full(
-        (num_lambda1, num_lambda2), numpy.nan
-    )
+    validation_mae_matrix_s01 = grid_search_dict[utils.MAE_KEY]
+    validation_mse_matrix_s02 = grid_search_dict[utils.MSE_KEY]
+    validation_mae_skill_matrix = grid_search_dict[utils.MAE_SKILL_SCORE_KEY]
+    validation_mse_skill_matrix = grid_search_dict[utils.MSE_SKILL_SCORE_KEY]
 
-    mean_training_target_value = numpy.mean(
-        training_target_table[utils.TARGET_NAME].values
-    )
+    print('Total fit time over all models = {0:.1f} s'.format(
+        numpy.sum(grid_search_dict[utils.FIT_TIME_MATRIX_KEY])
+    ))
+
+
+def l1l2_path_experiment_training(
+        training_dataset_dict, validation_dataset_dict):
+    """Same as `l1l2_experiment_training` but with warm-started paths.
 
-    for i in range(num_lambda1):
-        for j in range(num_lambda2):
-            this_message_string = (
-                'Training model with lasso coeff = 10^{0:.1f}, ridge coeff = '
-                '10^{1:.1f}...'
-            ).format(
-                numpy.log10(lambda1_values[i]), numpy.log10(lambda2_values[j])
-            )
-
-            print(this_message_string)
-
-            this_model_object = utils.setup_linear_regression(
-                lambda1=lambda1_values[i], lambda2=lambda2_values[j]
-            )
-
-            _ = utils.train_linear_regression(
-                model_object=this_model_object,
-                training_predictor_table=training_predictor_table,
-                training_target_table=training_target_table)
-
-            these_validation_predictions = this_model_object.predict(
-                validation_predictor_table.as_matrix()
-            )
-
-            this_evaluation_dict = utils.evaluate_regression(
-                target_values=validation_target_table[utils.TARGET_NAME].values,
-                predicted_target_values=these_validation_predictions,
-                mean_training_target_value=mean_training_target_value,
-                verbose=False, create_plots=False)
-
-            validation_mae_matrix_s01[i, j] = this_evaluation_dict[
-                utils.MAE_KEY]
-            validation_mse_matrix_s02[i, j] = this_evaluation_dict[
-                utils.MSE_KEY]
-            validation_mae_skill_matrix[i, j] = this_evaluation_dict[
-                utils.MAE_SKILL_SCORE_KEY]
-            validation_mse_skill_matrix[i, j] = this_evaluation_dict[
-                utils.MSE_SKILL_SCORE_KEY]
+    All lambda1 values are > 0, so every model on the path can be warm-started.
+    Scores should be nearly the same as in `l1l2_experiment_training`, with
+    much less total fit time.
+
+    :param training_dataset_dict: Dictionary created by `utils.create_dataset`.
+    :param validation_dataset_dict: Same.
+    """
+
+    lambda1_values = numpy.logspace(-8, -4, num=9)
+    lambda2_values = numpy.logspace(-4, 1, num=11)
+
+    path_dict = utils.run_l1l2_path(
+        training_dataset_dict=training_dataset_dict,
+        validation_dataset_dict=validation_dataset_dict,
+        lambda1_values=lambda1_values, lambda2_values=lambda2_values)
+
+    validation_mae_matrix_s01 = path_dict[utils.MAE_KEY]
+    validation_mse_matrix_s02 = path_dict[utils.MSE_KEY]
+    validation_mae_skill_matrix = path_dict[utils.MAE_SKILL_SCORE_KEY]
+    validation_mse_skill_matrix = path_dict[utils.MSE_SKILL_SCORE_KEY]
+
+    print('Total fit time over all models = {0:.1f} s'.format(
+        numpy.sum(path_dict[utils.FIT_TIME_MATRIX_KEY])
+    ))
 
 
 def l1l2_experiment_validation(
@@ -528,17 +538,14 @@ def l1l2_experiment_validation(
 
 def l1l2_experiment_testing(
         lambda1_values, lambda2_values, validation_mae_skill_matrix,
-        training_predictor_table, training_target_table,
-        testing_predictor_table, testing_target_table):
+        training_dataset_dict, testing_dataset_dict):
     """Selects and tests model for experiment with L1/L2 regularization.
 
     :param lambda1_values: See doc for `l1l2_experiment_validation`.
     :param lambda2_values: Same.
     :param validation_mae_skill_matrix: Same.
-    :param training_predictor_table: See doc for `utils.read_feature_file`.
-    :param training_target_table: Same.
-    :param testing_predictor_table: Same.
-    :param testing_target_table: Same.
+    :param training_dataset_dict: Dictionary created by `utils.create_dataset`.
+    :param testing_dataset_dict: Same.
     """
 
     best_linear_index = numpy.argmax(numpy.ravel(validation_mae_skill_matrix))
@@ -566,31 +573,35 @@ def l1l2_experiment_testing(
 
     _ = utils.train_linear_regression(
         model_object=final_model_object,
-        training_predictor_table=training_predictor_table,
-        training_target_table=training_target_table)
+        training_dataset_dict=training_dataset_dict)
 
     testing_predictions = final_model_object.predict(
-        testing_predictor_table.as_matrix()
+        testing_dataset_dict[utils.PREDICTOR_MATRIX_KEY]
     )
     mean_training_target_value = numpy.mean(
-        training_target_table[utils.TARGET_NAME].values
+        training_dataset_dict[utils.TARGET_VALUES_KEY]
     )
 
     this_evaluation_dict = utils.evaluate_regression(
-        target_values=testing_target_table[utils.TARGET_NAME].values,
+        target_values=testing_dataset_dict[utils.TARGET_VALUES_KEY],
         predicted_target_values=testing_predictions,
         mean_training_target_value=mean_training_target_value,
         dataset_name='testing')
 
 
 def binarize_tvt_data(training_file_names, training_target_table,
-                      validation_target_table, testing_target_table):
+                      validation_target_table, testing_target_table,
+                      training_dataset_dict, validation_dataset_dict,
+                      testing_dataset_dict):
     """Binarizes target variable in training, validation, and testing data.
 
     :param training_file_names: 1-D list of paths to training files.
     :param training_target_table: See doc for `utils.read_feature_file`.
     :param validation_target_table: Same.
     :param testing_target_table: Same.
+    :param training_dataset_dict: Dictionary created by `utils.create_dataset`.
+    :param validation_dataset_dict: Same.
+    :param testing_dataset_dict: Same.
     """
 
     binarization_threshold = utils.get_binarization_threshold(
@@ -613,6 +624,9 @@ def binarize_tvt_data(training_file_names, training_target_table,
     training_target_table = training_target_table.assign(
         **{utils.BINARIZED_TARGET_NAME: training_target_values}
     )
+    training_dataset_dict[utils.BINARIZED_TARGET_VALUES_KEY] = (
+        training_target_values
+    )
 
     print('\nBinarization threshold = {0:.3e} s^-1'.format(
         binarization_threshold
@@ -634,6 +648,9 @@ def binarize_tvt_data(training_file_names, training_target_table,
     validation_target_table = validation_target_table.assign(
         **{utils.BINARIZED_TARGET_NAME: validation_target_values}
     )
+    validation_dataset_dict[utils.BINARIZED_TARGET_VALUES_KEY] = (
+        validation_target_values
+    )
 
     testing_target_values = utils.binarize_target_values(
         target_values=testing_target_table[utils.TARGET_NAME].values,
@@ -642,17 +659,16 @@ def binarize_tvt_data(training_file_names, training_target_table,
     testing_target_table = testing_target_table.assign(
         **{utils.BINARIZED_TARGET_NAME: testing_target_values}
     )
+    testing_dataset_dict[utils.BINARIZED_TARGET_VALUES_KEY] = (
+        testing_target_values
+    )
 
 
-def train_logistic_model(
-        training_predictor_table, training_target_table,
-        validation_predictor_table, validation_target_table):
+def train_logistic_model(training_dataset_dict, validation_dataset_dict):
     """Trains plain logistic-regression model.
 
-    :param training_predictor_table: See doc for `utils.read_feature_file`.
-    :param training_target_table: Same.
-    :param validation_predictor_table: Same.
-    :param validation_target_table: Same.
+    :param training_dataset_dict: Dictionary created by `utils.create_dataset`.
+    :param validation_dataset_dict: Same.
     """
 
     plain_log_model_object = utils.setup_logistic_regression(
@@ -660,61 +676,56 @@ def train_logistic_model(
 
     _ = utils.train_logistic_regression(
         model_object=plain_log_model_object,
-        training_predictor_table=training_predictor_table,
-        training_target_table=training_target_table)
+        training_dataset_dict=training_dataset_dict)
 
     training_probabilities = plain_log_model_object.predict_proba(
-        training_predictor_table.as_matrix()
+        training_dataset_dict[utils.PREDICTOR_MATRIX_KEY]
     )[:, 1]
     training_event_frequency = numpy.mean(
-        training_target_table[utils.BINARIZED_TARGET_NAME].values
+        training_dataset_dict[utils.BINARIZED_TARGET_VALUES_KEY]
     )
 
     utils.eval_binary_classifn(
-        observed_labels=training_target_table[
-            utils.BINARIZED_TARGET_NAME].values,
+        observed_labels=training_dataset_dict[
+            utils.BINARIZED_TARGET_VALUES_KEY],
         forecast_probabilities=training_probabilities,
         training_event_frequency=training_event_frequency,
         dataset_name='training')
 
     validation_probabilities = plain_log_model_object.predict_proba(
-        validation_predictor_table.as_matrix()
+        validation_dataset_dict[utils.PREDICTOR_MATRIX_KEY]
     )[:, 1]
 
     utils.eval_binary_classifn(
-        observed_labels=validation_target_table[
-            utils.BINARIZED_TARGET_NAME].values,
+        observed_labels=validation_dataset_dict[
+            utils.BINARIZED_TARGET_VALUES_KEY],
         forecast_probabilities=validation_probabilities,
         training_event_frequency=training_event_frequency,
         dataset_name='validation')
 
 
 def plot_logistic_regression_coeffs(plain_log_model_object,
-                                    training_predictor_table):
+                                    training_dataset_dict):
     """Plots coefficients for plain logistic regression.
 
     :param plain_log_model_object: Trained instance of
         `sklearn.linear_model.SGDClassifier`.
-    :param training_predictor_table: See doc for `utils.read_feature_file`.
+    :param training_dataset_dict: Dictionary created by `utils.create_dataset`.
     """
 
     utils.plot_model_coefficients(
         model_object=plain_log_model_object,
-        predictor_names=list(training_predictor_table)
+        predictor_names=training_dataset_dict[utils.PREDICTOR_NAMES_KEY]
     )
 
     pyplot.show()
 
 
-def train_logistic_elastic_net(
-        training_predictor_table, training_target_table,
-        validation_predictor_table, validation_target_table):
+def train_logistic_elastic_net(training_dataset_dict, validation_dataset_dict):
     """Trains logistic regression with elastic-net penalty.
 
-    :param training_predictor_table: See doc for `utils.read_feature_file`.
-    :param training_target_table: Same.
-    :param validation_predictor_table: Same.
-    :param validation_target_table: Same.
+    :param training_dataset_dict: Dictionary created by `utils.create_dataset`.
+    :param validation_dataset_dict: Same.
     """
 
     logistic_en_model_object = utils.setup_logistic_regression(
@@ -722,49 +733,44 @@ def train_logistic_elastic_net(
 
     _ = utils.train_logistic_regression(
         model_object=logistic_en_model_object,
-        training_predictor_table=training_predictor_table,
-        training_target_table=training_target_table)
+        training_dataset_dict=training_dataset_dict)
 
     validation_probabilities = logistic_en_model_object.predict_proba(
-        validation_predictor_table.as_matrix()
+        validation_dataset_dict[utils.PREDICTOR_MATRIX_KEY]
     )[:, 1]
     training_event_frequency = numpy.mean(
-        training_target_table[utils.BINARIZED_TARGET_NAME].values
+        training_dataset_dict[utils.BINARIZED_TARGET_VALUES_KEY]
     )
 
     utils.eval_binary_classifn(
-        observed_labels=validation_target_table[
-            utils.BINARIZED_TARGET_NAME].values,
+        observed_labels=validation_dataset_dict[
+            utils.BINARIZED_TARGET_VALUES_KEY],
         forecast_probabilities=validation_probabilities,
         training_event_frequency=training_event_frequency,
         dataset_name='validation')
 
 
-def plot_logistic_en_coeffs(logistic_en_model_object, training_predictor_table):
+def plot_logistic_en_coeffs(logistic_en_model_object, training_dataset_dict):
     """Plots coefficients for logistic regression with elastic-net penalty.
 
     :param logistic_en_model_object: Trained instance of
         `sklearn.linear_model.SGDClassifier`.
-    :param training_predictor_table: See doc for `utils.read_feature_file`.
+    :param training_dataset_dict: Dictionary created by `utils.create_dataset`.
     """
 
     utils.plot_model_coefficients(
         model_object=logistic_en_model_object,
-        predictor_names=list(training_predictor_table)
+        predictor_names=training_dataset_dict[utils.PREDICTOR_NAMES_KEY]
     )
 
     pyplot.show()
 
 
-def train_tree_default(
-        training_predictor_table, training_target_table,
-        validation_predictor_table, validation_target_table):
+def train_tree_default(training_dataset_dict, validation_dataset_dict):
     """Trains decision tree with default params.
 
-    :param training_predictor_table: See doc for `utils.read_feature_file`.
-    :param training_target_table: Same.
-    :param validation_predictor_table: Same.
-    :param validation_target_table: Same.
+    :param training_dataset_dict: Dictionary created by `utils.create_dataset`.
+    :param validation_dataset_dict: Same.
     """
 
     default_tree_model_object = utils.setup_classification_tree(
@@ -772,44 +778,39 @@ def train_tree_default(
 
     _ = utils.train_classification_tree(
         model_object=default_tree_model_object,
-        training_predictor_table=training_predictor_table,
-        training_target_table=training_target_table)
+        training_dataset_dict=training_dataset_dict)
 
     training_probabilities = default_tree_model_object.predict_proba(
-        training_predictor_table.as_matrix()
+        training_dataset_dict[utils.PREDICTOR_MATRIX_KEY]
     )[:, 1]
     training_event_frequency = numpy.mean(
-        training_target_table[utils.BINARIZED_TARGET_NAME].values
+        training_dataset_dict[utils.BINARIZED_TARGET_VALUES_KEY]
     )
 
     utils.eval_binary_classifn(
-        observed_labels=training_target_table[
-            utils.BINARIZED_TARGET_NAME].values,
+        observed_labels=training_dataset_dict[
+            utils.BINARIZED_TARGET_VALUES_KEY],
         forecast_probabilities=training_probabilities,
         training_event_frequency=training_event_frequency,
         dataset_name='training')
 
     validation_probabilities = default_tree_model_object.predict_proba(
-        validation_predictor_table.as_matrix()
+        validation_dataset_dict[utils.PREDICTOR_MATRIX_KEY]
     )[:, 1]
 
     utils.eval_binary_classifn(
-        observed_labels=validation_target_table[
-            utils.BINARIZED_TARGET_NAME].values,
+        observed_labels=validation_dataset_dict[
+            utils.BINARIZED_TARGET_VALUES_KEY],
         forecast_probabilities=validation_probabilities,
         training_event_frequency=training_event_frequency,
         dataset_name='validation')
 
 
-def tree_experiment_training(
-        training_predictor_table, training_target_table,
-        validation_predictor_table, validation_target_table):
+def tree_experiment_training(training_dataset_dict, validation_dataset_dict):
     """Trains decision trees for experiment with min examples per split/leaf.
 
-    :param training_predictor_table: See doc for `utils.read_feature_file`.
-    :param training_target_table: Same.
-    :param validation_predictor_table: Same.
-    :param validation_target_table: Same.
+    :param training_dataset_dict: Dictionary created by `utils.create_dataset`.
+    :param validation_dataset_dict: Same.
     """
 
     min_per_split_values = numpy.array(
@@ -817,61 +818,16 @@ def tree_experiment_training(
     min_per_leaf_values = numpy.array(
         [1, 5, 10, 20, 30, 40, 50, 100, 200, 500], dtype=int)
 
-    num_min_per_split_values = len(min_per_split_values)
-    num_min_per_leaf_values = len(min_per_leaf_values)
-
-    validation_auc_matrix = numpy.full(
-        (num_min_per_split_values, num_min_per_leaf_values), numpy.nan
-    )
-
-    validation_max_csi_matrix = validation_auc_matrix + 0.
-    validation_bs_matrix = validation_auc_matrix + 0.
-    validation_bss_matrix = validation_auc_matrix + 0.
+    grid_search_dict = utils.run_tree_grid_search(
+        training_dataset_dict=training_dataset_dict,
+        validation_dataset_dict=validation_dataset_dict,
+        min_per_split_values=min_per_split_values,
+        min_per_leaf_values=min_per_leaf_values)
 
-    training_event_frequency = numpy.mean(
-        training_target_table[utils.BINARIZED_TARGET_NAME].values
-    )
-
-    for i in range(num_min_per_split_values):
-        for j in range(num_min_per_leaf_values):
-            if min_per_leaf_values[j] >= min_per_split_values[i]:
-                continue
-            
-            this_message_string = (
-                'Training model with minima of {0:d} examples per split node, '
-                '{1:d} per leaf node...'
-            ).format(min_per_split_values[i], min_per_leaf_values[j])
-
-            print(this_message_string)
-
-            this_model_object = utils.setup_classification_tree(
-                min_examples_at_split=min_per_split_values[i],
-                min_examples_at_leaf=min_per_leaf_values[j]
-            )
-
-            _ = utils.train_classification_tree(
-                model_object=this_model_object,
-                training_predictor_table=training_predictor_table,
-                training_target_table=training_target_table)
-
-            these_validation_predictions = this_model_object.predict_proba(
-                validation_predictor_table.as_matrix()
-            )[:, 1]
-
-            this_evaluation_dict = utils.eval_binary_classifn(
-                observed_labels=validation_target_table[
-                    utils.BINARIZED_TARGET_NAME].values,
-                forecast_probabilities=these_validation_predictions,
-                training_event_frequency=training_event_frequency,
-                create_plots=False, verbose=False)
-
-            validation_auc_matrix[i, j] = this_evaluation_dict[utils.AUC_KEY]
-            validation_max_csi_matrix[i, j] = this_evaluation_dict[
-                utils.MAX_CSI_KEY]
-            validation_bs_matrix[i, j] = this_evaluation_dict[
-                utils.BRIER_SCORE_KEY]
-            validation_bss_matrix[i, j] = this_evaluation_dict[
-                utils.BRIER_SKILL_SCORE_KEY]
+    validation_auc_matrix = grid_search_dict[utils.AUC_KEY]
+    validation_max_csi_matrix = grid_search_dict[utils.MAX_CSI_KEY]
+    validation_bs_matrix = grid_search_dict[utils.BRIER_SCORE_KEY]
+    validation_bss_matrix = grid_search_dict[utils.BRIER_SKILL_SCORE_KEY]
 
 
 def tree_experiment_validation(
@@ -948,17 +904,14 @@ def tree_experiment_validation(
 
 def tree_experiment_testing(
         min_per_split_values, min_per_leaf_values, validation_bss_matrix,
-        training_predictor_table, training_target_table,
-        testing_predictor_table, testing_target_table):
+        training_dataset_dict, testing_dataset_dict):
     """Selects and tests tree for experiment with min examples per split/leaf.
 
     :param min_per_split_values: See doc for `tree_experiment_validation`.
     :param min_per_leaf_values: Same.
     :param validation_bss_matrix: Same.
-    :param training_predictor_table: See doc for `utils.read_feature_file`.
-    :param training_target_table: Same.
-    :param testing_predictor_table: Same.
-    :param testing_target_table: Same.
+    :param training_dataset_dict: Dictionary created by `utils.create_dataset`.
+    :param testing_dataset_dict: Same.
     """
 
     best_linear_index = numpy.nanargmax(numpy.ravel(validation_bss_matrix))
@@ -987,36 +940,31 @@ def tree_experiment_testing(
 
     _ = utils.train_classification_tree(
         model_object=final_model_object,
-        training_predictor_table=training_predictor_table,
-        training_target_table=training_target_table)
+        training_dataset_dict=training_dataset_dict)
 
     testing_predictions = final_model_object.predict_proba(
-        testing_predictor_table.as_matrix()
+        testing_dataset_dict[utils.PREDICTOR_MATRIX_KEY]
     )[:, 1]
     training_event_frequency = numpy.mean(
-        training_target_table[utils.BINARIZED_TARGET_NAME].values
+        training_dataset_dict[utils.BINARIZED_TARGET_VALUES_KEY]
     )
 
     _ = utils.eval_binary_classifn(
-        observed_labels=testing_target_table[
-            utils.BINARIZED_TARGET_NAME].values,
+        observed_labels=testing_dataset_dict[
+            utils.BINARIZED_TARGET_VALUES_KEY],
         forecast_probabilities=testing_predictions,
         training_event_frequency=training_event_frequency,
         create_plots=True, verbose=True, dataset_name='testing')
 
 
-def train_random_forest(
-        training_predictor_table, training_target_table,
-        validation_predictor_table, validation_target_table):
+def train_random_forest(training_dataset_dict, validation_dataset_dict):
     """Trains random forest.
 
-    :param training_predictor_table: See doc for `utils.read_feature_file`.
-    :param training_target_table: Same.
-    :param validation_predictor_table: Same.
-    :param validation_target_table: Same.
+    :param training_dataset_dict: Dictionary created by `utils.create_dataset`.
+    :param validation_dataset_dict: Same.
     """
 
-    num_predictors = len(list(training_predictor_table))
+    num_predictors = len(training_dataset_dict[utils.PREDICTOR_NAMES_KEY])
     max_predictors_per_split = int(numpy.round(
         numpy.sqrt(num_predictors)
     ))
@@ -1027,47 +975,43 @@ def train_random_forest(
 
     _ = utils.train_classification_forest(
         model_object=random_forest_model_object,
-        training_predictor_table=training_predictor_table,
-        training_target_table=training_target_table)
+        training_dataset_dict=training_dataset_dict)
 
     training_probabilities = random_forest_model_object.predict_proba(
-        training_predictor_table.as_matrix()
+        training_dataset_dict[utils.PREDICTOR_MATRIX_KEY]
     )[:, 1]
     training_event_frequency = numpy.mean(
-        training_target_table[utils.BINARIZED_TARGET_NAME].values
+        training_dataset_dict[utils.BINARIZED_TARGET_VALUES_KEY]
     )
 
     utils.eval_binary_classifn(
-        observed_labels=training_target_table[
-            utils.BINARIZED_TARGET_NAME].values,
+        observed_labels=training_dataset_dict[
+            utils.BINARIZED_TARGET_VALUES_KEY],
         forecast_probabilities=training_probabilities,
         training_event_frequency=training_event_frequency,
         dataset_name='training')
 
     validation_probabilities = random_forest_model_object.predict_proba(
-        validation_predictor_table.as_matrix()
+        validation_dataset_dict[utils.PREDICTOR_MATRIX_KEY]
     )[:, 1]
 
     utils.eval_binary_classifn(
-        observed_labels=validation_target_table[
-            utils.BINARIZED_TARGET_NAME].values,
+        observed_labels=validation_dataset_dict[
+            utils.BINARIZED_TARGET_VALUES_KEY],
         forecast_probabilities=validation_probabilities,
         training_event_frequency=training_event_frequency,
         dataset_name='validation')
 
 
 def train_gradient_boosted_trees(
-        training_predictor_table, training_target_table,
-        validation_predictor_table, validation_target_table):
+        training_dataset_dict, validation_dataset_dict):
     """Trains gradient-boosted trees.
 
-    :param training_predictor_table: See doc for `utils.read_feature_file`.
-    :param training_target_table: Same.
-    :param validation_predictor_table: Same.
-    :param validation_target_table: Same.
+    :param training_dataset_dict: Dictionary created by `utils.create_dataset`.
+    :param validation_dataset_dict: Same.
     """
 
-    num_predictors = len(list(training_predictor_table))
+    num_predictors = len(training_dataset_dict[utils.PREDICTOR_NAMES_KEY])
     # max_predictors_per_split = int(numpy.round(
     #     numpy.sqrt(num_predictors)
     # ))
@@ -1078,30 +1022,29 @@ def train_gradient_boosted_trees(
 
     _ = utils.train_classification_gbt(
         model_object=gbt_model_object,
-        training_predictor_table=training_predictor_table,
-        training_target_table=training_target_table)
+        training_dataset_dict=training_dataset_dict)
 
     training_probabilities = gbt_model_object.predict_proba(
-        training_predictor_table.as_matrix()
+        training_dataset_dict[utils.PREDICTOR_MATRIX_KEY]
     )[:, 1]
     training_event_frequency = numpy.mean(
-        training_target_table[utils.BINARIZED_TARGET_NAME].values
+        training_dataset_dict[utils.BINARIZED_TARGET_VALUES_KEY]
     )
 
     utils.eval_binary_classifn(
-        observed_labels=training_target_table[
-            utils.BINARIZED_TARGET_NAME].values,
+        observed_labels=training_dataset_dict[
+            utils.BINARIZED_TARGET_VALUES_KEY],
         forecast_probabilities=training_probabilities,
         training_event_frequency=training_event_frequency,
         dataset_name='training')
 
     validation_probabilities = gbt_model_object.predict_proba(
-        validation_predictor_table.as_matrix()
+        validation_dataset_dict[utils.PREDICTOR_MATRIX_KEY]
     )[:, 1]
 
     utils.eval_binary_classifn(
-        observed_labels=validation_target_table[
-            utils.BINARIZED_TARGET_NAME].values,
+        observed_labels=validation_dataset_dict[
+            utils.BINARIZED_TARGET_VALUES_KEY],
         forecast_probabilities=validation_probabilities,
         training_event_frequency=training_event_frequency,
         dataset_name='validation')
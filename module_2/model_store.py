@@ -0,0 +1,233 @@
+"""Stores trained models as flat numpy arrays (one directory per model).
+
+Each model directory contains a JSON file with metadata and one .npy file per
+array.  Arrays can be memory-mapped, so reading a model takes milliseconds even
+for large forests.  Reading and applying a model requires only numpy and scipy
+(not scikit-learn).
+
+Supported models are those created by `utils.setup_linear_regression`,
+`utils.setup_logistic_regression`, `utils.setup_classification_tree`,
+`utils.setup_classification_forest`, and `utils.setup_classification_gbt`
+(with either backend).
+"""
+
+import os.path
+import json
+import errno
+import numpy
+from scipy.special import expit
+from module_2 import tree_inference
+
+FORMAT_VERSION = 1
+METADATA_FILE_NAME = 'metadata.json'
+DEFAULT_NUM_EXAMPLES_PER_BLOCK = tree_inference.DEFAULT_NUM_EXAMPLES_PER_BLOCK
+
+LINEAR_REGRESSION_TYPE_STRING = 'linear_regression'
+LINEAR_CLASSIFICATION_TYPE_STRING = 'linear_classification'
+TREE_AVERAGE_TYPE_STRING = tree_inference.TREE_AVERAGE_TYPE_STRING
+TREE_BOOSTING_TYPE_STRING = tree_inference.TREE_BOOSTING_TYPE_STRING
+
+FORMAT_VERSION_KEY = 'format_version'
+PREDICTOR_NAMES_KEY = 'predictor_names'
+MODEL_TYPE_KEY = tree_inference.MODEL_TYPE_KEY
+INPUT_DTYPE_KEY = tree_inference.INPUT_DTYPE_KEY
+NUM_PREDICTORS_KEY = tree_inference.NUM_PREDICTORS_KEY
+NUM_TREES_KEY = tree_inference.NUM_TREES_KEY
+MAX_DEPTH_KEY = tree_inference.MAX_DEPTH_KEY
+LEARNING_RATE_KEY = tree_inference.LEARNING_RATE_KEY
+INITIAL_RAW_SCORE_KEY = tree_inference.INITIAL_RAW_SCORE_KEY
+LINK_FUNCTION_KEY = tree_inference.LINK_FUNCTION_KEY
+
+METADATA_KEYS = [
+    FORMAT_VERSION_KEY, MODEL_TYPE_KEY, INPUT_DTYPE_KEY, NUM_PREDICTORS_KEY,
+    PREDICTOR_NAMES_KEY, NUM_TREES_KEY, MAX_DEPTH_KEY, LEARNING_RATE_KEY,
+    INITIAL_RAW_SCORE_KEY, LINK_FUNCTION_KEY
+]
+
+COEFFICIENTS_KEY = 'coefficients'
+INTERCEPTS_KEY = 'intercepts'
+
+TREE_ARRAY_KEYS = tree_inference.TREE_ARRAY_KEYS
+LINEAR_ARRAY_KEYS = [COEFFICIENTS_KEY, INTERCEPTS_KEY]
+
+
+def _create_directory(directory_name):
+    """Creates directory (along with parents if necessary).
+
+    :param directory_name: Name of desired directory.
+    """
+
+    try:
+        os.makedirs(directory_name)
+    except OSError as this_error:
+        if this_error.errno == errno.EEXIST and os.path.isdir(directory_name):
+            pass
+        else:
+            raise
+
+
+def model_to_dict(model_object, predictor_names=None):
+    """Converts trained scikit-learn model to dictionary of arrays.
+
+    :param model_object: Trained model (see list of supported models at top of
+        file).
+    :param predictor_names: 1-D list with names of predictors (optional, stored
+        only for reference).
+    :return: model_dict: Dictionary with keys in the lists `METADATA_KEYS`,
+        plus `TREE_ARRAY_KEYS` (for tree-based models) or `LINEAR_ARRAY_KEYS`
+        (for linear models).  For tree-based models, see
+        `tree_inference.compile_model` for details.
+    """
+
+    model_dict = {
+        FORMAT_VERSION_KEY: FORMAT_VERSION,
+        PREDICTOR_NAMES_KEY: predictor_names,
+        NUM_TREES_KEY: None,
+        MAX_DEPTH_KEY: None,
+        LEARNING_RATE_KEY: None,
+        INITIAL_RAW_SCORE_KEY: None,
+        LINK_FUNCTION_KEY: None
+    }
+
+    if not hasattr(model_object, 'coef_'):
+        model_dict.update(tree_inference.compile_model(model_object))
+        return model_dict
+
+    if hasattr(model_object, 'classes_'):
+        model_dict[MODEL_TYPE_KEY] = LINEAR_CLASSIFICATION_TYPE_STRING
+    else:
+        model_dict[MODEL_TYPE_KEY] = LINEAR_REGRESSION_TYPE_STRING
+
+    model_dict[INPUT_DTYPE_KEY] = 'float64'
+    model_dict[NUM_PREDICTORS_KEY] = tree_inference.get_num_predictors(
+        model_object)
+    model_dict[COEFFICIENTS_KEY] = numpy.array(model_object.coef_, dtype=float)
+    model_dict[INTERCEPTS_KEY] = numpy.array(
+        model_object.intercept_, dtype=float, ndmin=1)
+
+    return model_dict
+
+
+def write_model(model_object, output_dir_name, predictor_names=None):
+    """Writes trained model to directory of numpy arrays.
+
+    :param model_object: See doc for `model_to_dict`.
+    :param output_dir_name: Name of output directory.
+    :param predictor_names: See doc for `model_to_dict`.
+    """
+
+    model_dict = model_to_dict(
+        model_object=model_object, predictor_names=predictor_names)
+
+    print('Writing model to: "{0:s}"...'.format(output_dir_name))
+    _create_directory(output_dir_name)
+
+    metadata_dict = {}
+
+    for this_key in model_dict.keys():
+        if this_key in METADATA_KEYS:
+            metadata_dict[this_key] = model_dict[this_key]
+            continue
+
+        numpy.save(
+            '{0:s}/{1:s}.npy'.format(output_dir_name, this_key),
+            numpy.ascontiguousarray(model_dict[this_key]), allow_pickle=False
+        )
+
+    metadata_file_name = '{0:s}/{1:s}'.format(
+        output_dir_name, METADATA_FILE_NAME)
+
+    with open(metadata_file_name, 'w') as this_file:
+        json.dump(metadata_dict, this_file)
+
+
+def read_model(input_dir_name, memory_map=True):
+    """Reads trained model from directory of numpy arrays.
+
+    :param input_dir_name: Name of input directory (created by `write_model`).
+    :param memory_map: Boolean flag.  If True, arrays will be memory-mapped
+        (read from disk only when needed).
+    :return: model_dict: Dictionary created by `model_to_dict`.  This can be
+        used as input to `apply_model`.
+    :raises: ValueError: if the files were written with a different format
+        version.
+    """
+
+    metadata_file_name = '{0:s}/{1:s}'.format(
+        input_dir_name, METADATA_FILE_NAME)
+
+    with open(metadata_file_name) as this_file:
+        model_dict = json.load(this_file)
+
+    if model_dict[FORMAT_VERSION_KEY] != FORMAT_VERSION:
+        error_string = (
+            'Model in "{0:s}" has format version {1:d}.  Expected version '
+            '{2:d}.'
+        ).format(input_dir_name, model_dict[FORMAT_VERSION_KEY],
+                 FORMAT_VERSION)
+
+        raise ValueError(error_string)
+
+    if model_dict[MODEL_TYPE_KEY] in [
+            LINEAR_REGRESSION_TYPE_STRING, LINEAR_CLASSIFICATION_TYPE_STRING]:
+        array_keys = LINEAR_ARRAY_KEYS
+    else:
+        array_keys = TREE_ARRAY_KEYS
+
+    mmap_mode = 'r' if memory_map else None
+
+    for this_key in array_keys:
+        model_dict[this_key] = numpy.load(
+            '{0:s}/{1:s}.npy'.format(input_dir_name, this_key),
+            mmap_mode=mmap_mode, allow_pickle=False)
+
+    return model_dict
+
+
+def apply_model(model_dict, predictor_matrix,
+                num_examples_per_block=DEFAULT_NUM_EXAMPLES_PER_BLOCK,
+                num_threads=1):
+    """Applies trained model to new examples.
+
+    For tree-based models, results are identical to those from scikit-learn.
+    For linear models, results may differ by rounding error.
+
+    E = number of examples
+    P = number of predictors
+    K = number of classes
+
+    :param model_dict: Dictionary created by `model_to_dict` or `read_model`.
+    :param predictor_matrix: E-by-P numpy array of predictor values.
+    :param num_examples_per_block: [used only for tree-based models]
+        See doc for `tree_inference.predict_proba`.
+    :param num_threads: Same.
+    :return: forecast_matrix: For a regression model, a length-E numpy array of
+        predictions.  For a classification model, an E-by-K numpy array of
+        class probabilities (same as output of `predict_proba`).
+    """
+
+    model_type_string = model_dict[MODEL_TYPE_KEY]
+
+    if model_type_string not in [
+            LINEAR_REGRESSION_TYPE_STRING, LINEAR_CLASSIFICATION_TYPE_STRING]:
+        return tree_inference.predict_proba(
+            model_dict=model_dict, predictor_matrix=predictor_matrix,
+            num_examples_per_block=num_examples_per_block,
+            num_threads=num_threads)
+
+    predictor_matrix = numpy.ascontiguousarray(
+        predictor_matrix, dtype=model_dict[INPUT_DTYPE_KEY])
+    assert predictor_matrix.shape[1] == model_dict[NUM_PREDICTORS_KEY]
+
+    raw_predictions = (
+        numpy.dot(predictor_matrix, model_dict[COEFFICIENTS_KEY].T) +
+        model_dict[INTERCEPTS_KEY]
+    )
+
+    if model_type_string == LINEAR_REGRESSION_TYPE_STRING:
+        return raw_predictions
+
+    positive_class_probs = expit(raw_predictions.ravel())
+    return numpy.transpose(numpy.vstack(
+        (1. - positive_class_probs, positive_class_probs)
+    ))
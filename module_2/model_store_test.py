@@ -0,0 +1,180 @@
+"""Unit tests for model_store.py."""
+
+import shutil
+import tempfile
+import unittest
+import numpy
+from module_2 import model_store
+from module_2 import utils
+
+TOLERANCE = 1e-6
+
+RANDOM_STATE_OBJECT = numpy.random.RandomState(6695)
+NUM_TRAINING_EXAMPLES = 1000
+NUM_TESTING_EXAMPLES = 300
+NUM_PREDICTORS = 5
+NUM_TREES = 20
+PREDICTOR_NAMES = ['predictor{0:d}'.format(m) for m in range(NUM_PREDICTORS)]
+
+TRAINING_PREDICTOR_MATRIX = RANDOM_STATE_OBJECT.normal(
+    size=(NUM_TRAINING_EXAMPLES, NUM_PREDICTORS)
+)
+TRAINING_TARGET_VALUES = (
+    TRAINING_PREDICTOR_MATRIX[:, 0] - TRAINING_PREDICTOR_MATRIX[:, 1] +
+    RANDOM_STATE_OBJECT.normal(size=NUM_TRAINING_EXAMPLES)
+)
+
+TRAINING_DATASET_DICT = {
+    utils.PREDICTOR_MATRIX_KEY: TRAINING_PREDICTOR_MATRIX,
+    utils.TARGET_VALUES_KEY: TRAINING_TARGET_VALUES,
+    utils.BINARIZED_TARGET_VALUES_KEY:
+        (TRAINING_TARGET_VALUES > 1.).astype(int)
+}
+
+TESTING_PREDICTOR_MATRIX = RANDOM_STATE_OBJECT.normal(
+    size=(NUM_TESTING_EXAMPLES, NUM_PREDICTORS)
+)
+
+
+def _write_and_apply_model(model_object, memory_map):
+    """Writes model to temporary directory, reads it back, and applies it.
+
+    :param model_object: Trained scikit-learn model.
+    :param memory_map: See doc for `model_store.read_model`.
+    :return: forecast_matrix: Output from `model_store.apply_model` for
+        `TESTING_PREDICTOR_MATRIX`.
+    :return: model_dict: Dictionary created by `model_store.read_model`.
+    """
+
+    output_dir_name = tempfile.mkdtemp()
+
+    try:
+        model_store.write_model(
+            model_object=model_object, output_dir_name=output_dir_name,
+            predictor_names=PREDICTOR_NAMES)
+
+        model_dict = model_store.read_model(
+            input_dir_name=output_dir_name, memory_map=memory_map)
+
+        # Memory-mapped arrays cannot outlive the directory.
+        forecast_matrix = model_store.apply_model(
+            model_dict=model_dict, predictor_matrix=TESTING_PREDICTOR_MATRIX)
+    finally:
+        shutil.rmtree(output_dir_name)
+
+    return forecast_matrix, model_dict
+
+
+class ModelStoreTests(unittest.TestCase):
+    """Each method is a unit test for model_store.py."""
+
+    def _check_tree_model(self, model_object):
+        """Ensures that stored tree model gives same output as scikit-learn.
+
+        :param model_object: Trained scikit-learn model.
+        """
+
+        expected_probability_matrix = model_object.predict_proba(
+            TESTING_PREDICTOR_MATRIX)
+
+        for this_flag in [True, False]:
+            this_probability_matrix, this_model_dict = (
+                _write_and_apply_model(
+                    model_object=model_object, memory_map=this_flag)
+            )
+
+            self.assertTrue(
+                this_model_dict[model_store.PREDICTOR_NAMES_KEY] ==
+                PREDICTOR_NAMES
+            )
+            self.assertTrue(numpy.array_equal(
+                this_probability_matrix, expected_probability_matrix
+            ))
+
+    def test_apply_model_forest(self):
+        """Ensures correct output from apply_model.
+
+        In this case, the model is a random forest.
+        """
+
+        self._check_tree_model(utils.train_classification_forest(
+            model_object=utils.setup_classification_forest(
+                max_predictors_per_split=2, num_trees=NUM_TREES,
+                min_examples_at_split=10, min_examples_at_leaf=5,
+                num_cores=1),
+            training_dataset_dict=TRAINING_DATASET_DICT
+        ))
+
+    def test_apply_model_gbt_exact(self):
+        """Ensures correct output from apply_model.
+
+        In this case, the model is gradient-boosted trees with the exact
+        backend.
+        """
+
+        self._check_tree_model(utils.train_classification_gbt(
+            model_object=utils.setup_classification_gbt(
+                max_predictors_per_split=NUM_PREDICTORS, num_trees=NUM_TREES,
+                backend_string=utils.EXACT_GBT_BACKEND_STRING),
+            training_dataset_dict=TRAINING_DATASET_DICT
+        ))
+
+    def test_apply_model_gbt_histogram(self):
+        """Ensures correct output from apply_model.
+
+        In this case, the model is gradient-boosted trees with the histogram
+        backend.
+        """
+
+        self._check_tree_model(utils.train_classification_gbt(
+            model_object=utils.setup_classification_gbt(
+                max_predictors_per_split=NUM_PREDICTORS, num_trees=NUM_TREES,
+                backend_string=utils.HISTOGRAM_GBT_BACKEND_STRING,
+                num_predictors=NUM_PREDICTORS),
+            training_dataset_dict=TRAINING_DATASET_DICT
+        ))
+
+    def test_apply_model_linear_regression(self):
+        """Ensures correct output from apply_model.
+
+        In this case, the model is linear regression with ridge penalty.
+        """
+
+        this_model_object = utils.train_linear_regression(
+            model_object=utils.setup_linear_regression(lambda1=0., lambda2=1.),
+            training_dataset_dict=TRAINING_DATASET_DICT)
+
+        this_forecast_matrix = _write_and_apply_model(
+            model_object=this_model_object, memory_map=True
+        )[0]
+
+        self.assertTrue(numpy.allclose(
+            this_forecast_matrix,
+            this_model_object.predict(TESTING_PREDICTOR_MATRIX),
+            atol=TOLERANCE
+        ))
+
+    def test_apply_model_logistic_regression(self):
+        """Ensures correct output from apply_model.
+
+        In this case, the model is logistic regression with ridge penalty.
+        """
+
+        this_model_object = utils.train_logistic_regression(
+            model_object=utils.setup_logistic_regression(
+                lambda1=0., lambda2=1e-3),
+            training_dataset_dict=TRAINING_DATASET_DICT)
+
+        this_forecast_matrix = _write_and_apply_model(
+            model_object=this_model_object, memory_map=True
+        )[0]
+
+        self.assertTrue(numpy.allclose(
+            this_forecast_matrix,
+            this_model_object.predict_proba(TESTING_PREDICTOR_MATRIX),
+            atol=TOLERANCE
+        ))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,612 @@
+"""Inference for tree-based models without scikit-learn.
+
+Trees are compiled into flat numpy arrays (node thresholds, features, children,
+leaf values).  Nodes in each tree are stored in breadth-first (depth-major)
+order, with the two children of each node next to each other, so that one
+level of one tree can be evaluated for a whole block of examples with a few
+numpy gathers.  Blocks can be evaluated in parallel by a pool of threads
+(numpy releases the GIL for most of the work).  Probabilities are identical to
+those from `predict_proba` in scikit-learn.  Only numpy and scipy are needed.
+
+This is not faster than the compiled tree loop in scikit-learn.  On one core,
+scripts/benchmark_tree_inference.py measures 0.5-0.75 times the speed of
+scikit-learn (fastest for deep random forests, slowest for unbalanced trees
+from histogram-based boosting, where many examples reach a leaf long before
+the last level).
+
+Supported models are those created by `utils.setup_classification_tree`,
+`utils.setup_classification_forest`, and `utils.setup_classification_gbt`
+(with either backend).
+"""
+
+import numpy
+from multiprocessing.pool import ThreadPool
+from scipy.special import expit
+
+TREE_LEAF_INDEX = -1
+DEFAULT_NUM_EXAMPLES_PER_BLOCK = 20000
+
+TREE_AVERAGE_TYPE_STRING = 'tree_average'
+TREE_BOOSTING_TYPE_STRING = 'tree_boosting'
+
+LOGIT_LINK_STRING = 'logit'
+HALF_LOGIT_LINK_STRING = 'half_logit'
+
+MODEL_TYPE_KEY = 'model_type_string'
+INPUT_DTYPE_KEY = 'input_dtype_string'
+NUM_PREDICTORS_KEY = 'num_predictors'
+NUM_TREES_KEY = 'num_trees'
+MAX_DEPTH_KEY = 'max_depth'
+LEARNING_RATE_KEY = 'learning_rate'
+INITIAL_RAW_SCORE_KEY = 'initial_raw_score'
+LINK_FUNCTION_KEY = 'link_function_string'
+
+ROOT_INDICES_KEY = 'root_node_indices'
+TREE_DEPTHS_KEY = 'tree_depths'
+FEATURE_INDICES_KEY = 'feature_indices'
+THRESHOLDS_KEY = 'thresholds'
+LEFT_CHILDREN_KEY = 'left_child_indices'
+RIGHT_CHILDREN_KEY = 'right_child_indices'
+MISSING_GO_LEFT_KEY = 'missing_go_left_flags'
+LEAF_VALUES_KEY = 'leaf_values'
+
+TREE_ARRAY_KEYS = [
+    ROOT_INDICES_KEY, TREE_DEPTHS_KEY, FEATURE_INDICES_KEY, THRESHOLDS_KEY,
+    LEFT_CHILDREN_KEY, MISSING_GO_LEFT_KEY, LEAF_VALUES_KEY
+]
+
+
+def get_num_predictors(model_object):
+    """Returns number of predictors used to train scikit-learn model.
+
+    :param model_object: Trained scikit-learn model.
+    :return: num_predictors: Number of predictors.
+    """
+
+    if hasattr(model_object, 'n_features_in_'):
+        return int(model_object.n_features_in_)
+
+    return int(model_object.n_features_)
+
+
+def _sklearn_tree_to_arrays(tree_object, num_classes=None):
+    """Converts one scikit-learn tree to arrays.
+
+    N = number of nodes
+    K = number of values at each node
+
+    :param tree_object: Instance of `sklearn.tree._tree.Tree` (the `tree_`
+        attribute of a decision tree).
+    :param num_classes: Number of classes.  If the tree is a classifier, leaf
+        values will be converted to class probabilities (exactly as in
+        `predict_proba`).  If None, leaf values will be left alone.
+    :return: tree_dict: Dictionary with the following keys.
+    tree_dict['feature_indices']: length-N numpy array with index of predictor
+        used at each node.
+    tree_dict['thresholds']: length-N numpy array of thresholds.  Examples with
+        predictor value <= threshold go to the left child.
+    tree_dict['left_child_indices']: length-N numpy array with index of left
+        child (-1 for leaf nodes).
+    tree_dict['right_child_indices']: Same but for right child.
+    tree_dict['missing_go_left_flags']: length-N numpy array of Boolean flags,
+        indicating whether examples with missing predictor go to the left child.
+    tree_dict['leaf_values']: N-by-K numpy array of values.
+    """
+
+    num_nodes = tree_object.node_count
+    leaf_values = numpy.array(tree_object.value[:, 0, :], dtype=float)
+
+    if num_classes is not None:
+        leaf_values = leaf_values[:, :num_classes]
+        normalizers = leaf_values.sum(axis=1)[:, numpy.newaxis]
+        normalizers[normalizers == 0.] = 1.
+        leaf_values /= normalizers
+
+    missing_go_left_flags = getattr(tree_object, 'missing_go_to_left', None)
+    if missing_go_left_flags is None:
+        missing_go_left_flags = numpy.full(num_nodes, False, dtype=bool)
+
+    return {
+        FEATURE_INDICES_KEY: numpy.array(tree_object.feature),
+        THRESHOLDS_KEY: numpy.array(tree_object.threshold, dtype=float),
+        LEFT_CHILDREN_KEY: numpy.array(tree_object.children_left),
+        RIGHT_CHILDREN_KEY: numpy.array(tree_object.children_right),
+        MISSING_GO_LEFT_KEY: numpy.array(missing_go_left_flags, dtype=bool),
+        LEAF_VALUES_KEY: leaf_values
+    }
+
+
+def _hist_tree_to_arrays(predictor_object):
+    """Converts one tree from histogram-based gradient boosting to arrays.
+
+    :param predictor_object: Instance of
+        `sklearn.ensemble._hist_gradient_boosting.predictor.TreePredictor`.
+    :return: tree_dict: See doc for `_sklearn_tree_to_arrays`.
+    :raises: ValueError: if the tree has categorical splits.
+    """
+
+    node_table = predictor_object.nodes
+
+    if ('is_categorical' in node_table.dtype.names and
+            numpy.any(node_table['is_categorical'])):
+        raise ValueError('Trees with categorical splits are not supported.')
+
+    leaf_flags = node_table['is_leaf'].astype(bool)
+
+    left_child_indices = node_table['left'].astype(int)
+    left_child_indices[leaf_flags] = TREE_LEAF_INDEX
+    right_child_indices = node_table['right'].astype(int)
+    right_child_indices[leaf_flags] = TREE_LEAF_INDEX
+
+    return {
+        FEATURE_INDICES_KEY: node_table['feature_idx'].astype(int),
+        THRESHOLDS_KEY: node_table['num_threshold'].astype(float),
+        LEFT_CHILDREN_KEY: left_child_indices,
+        RIGHT_CHILDREN_KEY: right_child_indices,
+        MISSING_GO_LEFT_KEY: node_table['missing_go_to_left'].astype(bool),
+        LEAF_VALUES_KEY: node_table['value'].astype(float)[:, numpy.newaxis]
+    }
+
+
+def _sort_nodes_breadth_first(tree_dict):
+    """Sorts nodes of one tree in breadth-first order.
+
+    After sorting, the root is node 0, the nodes at each depth are contiguous,
+    and the right child of each node is right after the left child.  Leaf nodes
+    become their own left child, with an infinite threshold, so that a
+    traversal can keep going (and stay at the leaf) after reaching one.
+
+    :param tree_dict: Dictionary created by `_sklearn_tree_to_arrays` or
+        `_hist_tree_to_arrays`.
+    :return: tree_dict: Same but with sorted nodes and without the key
+        "right_child_indices".  There is a new key, "max_depth" (depth of
+        deepest leaf).
+    """
+
+    left_child_indices = tree_dict[LEFT_CHILDREN_KEY]
+    right_child_indices = tree_dict[RIGHT_CHILDREN_KEY]
+
+    old_indices_by_depth = [numpy.array([0], dtype=int)]
+
+    while True:
+        these_old_indices = old_indices_by_depth[-1]
+        these_old_indices = these_old_indices[
+            left_child_indices[these_old_indices] != TREE_LEAF_INDEX
+        ]
+
+        if len(these_old_indices) == 0:
+            break
+
+        old_indices_by_depth.append(numpy.stack(
+            (left_child_indices[these_old_indices],
+             right_child_indices[these_old_indices]),
+            axis=1
+        ).ravel())
+
+    old_indices = numpy.concatenate(old_indices_by_depth)
+    num_nodes = len(old_indices)
+
+    new_indices = numpy.full(len(left_child_indices), -1, dtype=int)
+    new_indices[old_indices] = numpy.arange(num_nodes)
+
+    sorted_tree_dict = {
+        this_key: tree_dict[this_key][old_indices]
+        for this_key in
+        [FEATURE_INDICES_KEY, THRESHOLDS_KEY, MISSING_GO_LEFT_KEY,
+         LEAF_VALUES_KEY]
+    }
+
+    these_left_indices = left_child_indices[old_indices]
+    leaf_flags = these_left_indices == TREE_LEAF_INDEX
+
+    sorted_tree_dict[LEFT_CHILDREN_KEY] = numpy.where(
+        leaf_flags, numpy.arange(num_nodes), new_indices[these_left_indices]
+    )
+    sorted_tree_dict[FEATURE_INDICES_KEY][leaf_flags] = 0
+    sorted_tree_dict[THRESHOLDS_KEY][leaf_flags] = numpy.inf
+    sorted_tree_dict[MISSING_GO_LEFT_KEY][leaf_flags] = True
+    sorted_tree_dict[MAX_DEPTH_KEY] = len(old_indices_by_depth) - 1
+
+    return sorted_tree_dict
+
+
+def _round_thresholds(thresholds, input_dtype_string):
+    """Rounds thresholds to data type of predictors.
+
+    scikit-learn compares float32 predictors with float64 thresholds.  Since
+    x <= t if and only if x <= (largest float32 value <= t), rounding each
+    threshold down to float32 gives exactly the same splits, without
+    converting predictors to float64 at every node.
+
+    :param thresholds: numpy array of thresholds (float64).
+    :param input_dtype_string: Data type of predictors ("float32" or
+        "float64").
+    :return: thresholds: numpy array of thresholds (with data type
+        `input_dtype_string`).
+    """
+
+    if input_dtype_string == 'float64':
+        return thresholds
+
+    rounded_thresholds = thresholds.astype(numpy.float32)
+    round_up_flags = rounded_thresholds > thresholds
+    rounded_thresholds[round_up_flags] = numpy.nextafter(
+        rounded_thresholds[round_up_flags], numpy.float32(-numpy.inf)
+    )
+
+    return rounded_thresholds
+
+
+def _concat_trees(list_of_tree_dicts, input_dtype_string):
+    """Concatenates trees into one set of arrays.
+
+    Child indices are shifted, so that they index the concatenated arrays.
+
+    T = number of trees
+    N = total number of nodes
+    K = number of values at each node
+
+    :param list_of_tree_dicts: length-T list of dictionaries, each created by
+        `_sort_nodes_breadth_first`.
+    :param input_dtype_string: Data type of predictors ("float32" or
+        "float64").
+    :return: model_dict: Dictionary with the following keys.
+    model_dict['root_node_indices']: length-T numpy array with index of root
+        node in each tree.
+    model_dict['tree_depths']: length-T numpy array with depth of each tree.
+    model_dict['max_depth']: Max depth of any tree.
+    model_dict['feature_indices']: length-N numpy array with index of predictor
+        used at each node (0 for leaf nodes).
+    model_dict['thresholds']: length-N numpy array of thresholds (infinity for
+        leaf nodes).  Examples with predictor value <= threshold go to the left
+        child.
+    model_dict['left_child_indices']: length-N numpy array with index of left
+        child (the node itself for leaf nodes).  The right child is always the
+        next node.
+    model_dict['missing_go_left_flags']: length-N numpy array of Boolean flags,
+        indicating whether examples with missing predictor go to the left child.
+    model_dict['leaf_values']: N-by-K numpy array of values.
+    """
+
+    num_nodes_by_tree = numpy.array(
+        [len(d[THRESHOLDS_KEY]) for d in list_of_tree_dicts], dtype=int
+    )
+    root_node_indices = numpy.concatenate((
+        numpy.array([0], dtype=int), numpy.cumsum(num_nodes_by_tree[:-1])
+    ))
+
+    tree_depths = numpy.array(
+        [d[MAX_DEPTH_KEY] for d in list_of_tree_dicts], dtype=int
+    )
+
+    model_dict = {
+        ROOT_INDICES_KEY: root_node_indices.astype(numpy.int32),
+        TREE_DEPTHS_KEY: tree_depths.astype(numpy.int32),
+        MAX_DEPTH_KEY: int(numpy.max(tree_depths))
+    }
+
+    for this_key in [FEATURE_INDICES_KEY, THRESHOLDS_KEY, MISSING_GO_LEFT_KEY,
+                     LEAF_VALUES_KEY]:
+        model_dict[this_key] = numpy.concatenate(
+            [d[this_key] for d in list_of_tree_dicts], axis=0
+        )
+
+    model_dict[LEFT_CHILDREN_KEY] = numpy.concatenate([
+        d[LEFT_CHILDREN_KEY] + root_node_indices[i]
+        for i, d in enumerate(list_of_tree_dicts)
+    ])
+
+    for this_key in [FEATURE_INDICES_KEY, LEFT_CHILDREN_KEY]:
+        model_dict[this_key] = model_dict[this_key].astype(numpy.int32)
+
+    model_dict[THRESHOLDS_KEY] = _round_thresholds(
+        thresholds=model_dict[THRESHOLDS_KEY],
+        input_dtype_string=input_dtype_string)
+
+    return model_dict
+
+
+def compile_model(model_object):
+    """Compiles trained tree-based model into arrays.
+
+    :param model_object: Trained model (see list of supported models at top of
+        file).
+    :return: model_dict: Dictionary with the following keys, plus those in the
+        list `TREE_ARRAY_KEYS` (see doc for `_concat_trees`).
+    model_dict['model_type_string']: "tree_average" (decision tree or random
+        forest) or "tree_boosting" (gradient-boosted trees).
+    model_dict['input_dtype_string']: Data type to which predictors are
+        converted before traversing trees ("float32" or "float64", as in
+        scikit-learn).
+    model_dict['num_predictors']: Number of predictors.
+    model_dict['num_trees']: Number of trees.
+    model_dict['max_depth']: Max depth of any tree.
+    model_dict['learning_rate']: [None if "tree_average"] Learning rate.
+    model_dict['initial_raw_score']: [None if "tree_average"] Raw score (log
+        odds) before the first tree.
+    model_dict['link_function_string']: [None if "tree_average"] Link function
+        ("logit" or "half_logit") used to convert raw score to probability.
+
+    For "tree_average", each row of "leaf_values" contains class probabilities.
+    For "tree_boosting", each row contains one raw score (to be multiplied by
+    the learning rate).
+
+    :raises: TypeError: if model type is not supported.
+    :raises: ValueError: if model is gradient-boosted trees with more than 2
+        classes.
+    """
+
+    model_dict = {
+        NUM_PREDICTORS_KEY: get_num_predictors(model_object),
+        LEARNING_RATE_KEY: None,
+        INITIAL_RAW_SCORE_KEY: None,
+        LINK_FUNCTION_KEY: None
+    }
+
+    is_boosting = hasattr(model_object, '_predictors') or (
+        hasattr(model_object, 'estimators_') and hasattr(model_object, 'init_')
+    )
+
+    if is_boosting:
+        if len(model_object.classes_) != 2:
+            raise ValueError(
+                'Gradient-boosted trees with > 2 classes are not supported.')
+
+        model_dict[MODEL_TYPE_KEY] = TREE_BOOSTING_TYPE_STRING
+
+        if model_object.loss == 'exponential':
+            model_dict[LINK_FUNCTION_KEY] = HALF_LOGIT_LINK_STRING
+        else:
+            model_dict[LINK_FUNCTION_KEY] = LOGIT_LINK_STRING
+
+        if hasattr(model_object, '_predictors'):
+            list_of_tree_dicts = [
+                _hist_tree_to_arrays(p[0]) for p in model_object._predictors
+            ]
+
+            model_dict[INPUT_DTYPE_KEY] = 'float64'
+            model_dict[LEARNING_RATE_KEY] = 1.
+            model_dict[INITIAL_RAW_SCORE_KEY] = float(
+                model_object._baseline_prediction.ravel()[0]
+            )
+        else:
+            list_of_tree_dicts = [
+                _sklearn_tree_to_arrays(e.tree_)
+                for e in model_object.estimators_[:, 0]
+            ]
+
+            # The initial raw score (log odds of the class prior) is not
+            # exposed by a public attribute, so it is computed by a private
+            # method, which was renamed in scikit-learn 0.21.  With the default
+            # init estimator, the score does not depend on the predictors, so
+            # one dummy example is enough.
+            dummy_predictor_matrix = numpy.zeros(
+                (1, model_dict[NUM_PREDICTORS_KEY]), dtype=numpy.float32)
+
+            if hasattr(model_object, '_raw_predict_init'):
+                this_raw_score = model_object._raw_predict_init(
+                    dummy_predictor_matrix)
+            else:
+                this_raw_score = model_object._init_decision_function(
+                    dummy_predictor_matrix)
+
+            model_dict[INPUT_DTYPE_KEY] = 'float32'
+            model_dict[LEARNING_RATE_KEY] = float(model_object.learning_rate)
+            model_dict[INITIAL_RAW_SCORE_KEY] = float(this_raw_score.ravel()[0])
+
+    elif hasattr(model_object, 'estimators_') or hasattr(model_object, 'tree_'):
+        if hasattr(model_object, 'estimators_'):
+            tree_objects = [e.tree_ for e in model_object.estimators_]
+        else:
+            tree_objects = [model_object.tree_]
+
+        num_classes = len(model_object.classes_)
+        list_of_tree_dicts = [
+            _sklearn_tree_to_arrays(t, num_classes=num_classes)
+            for t in tree_objects
+        ]
+
+        model_dict[MODEL_TYPE_KEY] = TREE_AVERAGE_TYPE_STRING
+        model_dict[INPUT_DTYPE_KEY] = 'float32'
+
+    else:
+        error_string = (
+            'Models of type "{0:s}" are not supported.'
+        ).format(type(model_object).__name__)
+
+        raise TypeError(error_string)
+
+    model_dict.update(_concat_trees(
+        list_of_tree_dicts=[
+            _sort_nodes_breadth_first(d) for d in list_of_tree_dicts
+        ],
+        input_dtype_string=model_dict[INPUT_DTYPE_KEY]
+    ))
+
+    model_dict[NUM_TREES_KEY] = len(list_of_tree_dicts)
+    return model_dict
+
+
+def _find_leaves_one_tree(model_dict, tree_index, predictor_matrix,
+                          any_missing):
+    """Finds leaf node reached by each example in one tree.
+
+    The tree is traversed one level per iteration, for all examples at once.
+    Examples that have already reached a leaf stay there (see doc for
+    `_sort_nodes_breadth_first`), so every iteration has the same cost.
+
+    E = number of examples
+
+    :param model_dict: Dictionary created by `compile_model`.
+    :param tree_index: Index of tree.
+    :param predictor_matrix: E-by-P numpy array of predictor values.
+    :param any_missing: Boolean flag.  If True, `predictor_matrix` may contain
+        NaN.
+    :return: leaf_indices: length-E numpy array with indices of leaf nodes (in
+        the concatenated arrays).
+    """
+
+    num_examples = predictor_matrix.shape[0]
+    num_predictors = predictor_matrix.shape[1]
+
+    feature_indices = model_dict[FEATURE_INDICES_KEY]
+    thresholds = model_dict[THRESHOLDS_KEY]
+    left_child_indices = model_dict[LEFT_CHILDREN_KEY]
+
+    predictor_values = predictor_matrix.ravel()
+    row_offsets = numpy.arange(num_examples) * num_predictors
+
+    node_indices = numpy.full(
+        num_examples, model_dict[ROOT_INDICES_KEY][tree_index],
+        dtype=numpy.intp)
+
+    for _ in range(model_dict[TREE_DEPTHS_KEY][tree_index]):
+        these_values = predictor_values[
+            feature_indices[node_indices] + row_offsets
+        ]
+        these_go_right_flags = these_values > thresholds[node_indices]
+
+        if any_missing:
+            these_go_right_flags |= numpy.logical_and(
+                numpy.isnan(these_values),
+                numpy.invert(model_dict[MISSING_GO_LEFT_KEY][node_indices])
+            )
+
+        node_indices = left_child_indices[node_indices] + these_go_right_flags
+
+    return node_indices
+
+
+def _predict_one_block(model_dict, predictor_matrix):
+    """Computes class probabilities for one block of examples.
+
+    E = number of examples in block
+    K = number of classes
+
+    :param model_dict: Dictionary created by `compile_model`.
+    :param predictor_matrix: E-by-P numpy array of predictor values (already
+        converted to the right data type).
+    :return: probability_matrix: E-by-K numpy array of class probabilities.
+    """
+
+    any_missing = numpy.any(numpy.isnan(predictor_matrix))
+    leaf_values = model_dict[LEAF_VALUES_KEY]
+    num_trees = len(model_dict[ROOT_INDICES_KEY])
+
+    # Trees are added in the same order as in scikit-learn, so that results are
+    # identical.
+    if model_dict[MODEL_TYPE_KEY] == TREE_AVERAGE_TYPE_STRING:
+        probability_matrix = numpy.zeros(
+            (predictor_matrix.shape[0], leaf_values.shape[1])
+        )
+
+        for j in range(num_trees):
+            probability_matrix += leaf_values[_find_leaves_one_tree(
+                model_dict=model_dict, tree_index=j,
+                predictor_matrix=predictor_matrix, any_missing=any_missing
+            ), :]
+
+        probability_matrix /= num_trees
+        return probability_matrix
+
+    raw_scores = numpy.full(
+        predictor_matrix.shape[0], model_dict[INITIAL_RAW_SCORE_KEY]
+    )
+    learning_rate = model_dict[LEARNING_RATE_KEY]
+
+    for j in range(num_trees):
+        raw_scores += learning_rate * leaf_values[_find_leaves_one_tree(
+            model_dict=model_dict, tree_index=j,
+            predictor_matrix=predictor_matrix, any_missing=any_missing
+        ), 0]
+
+    if model_dict[LINK_FUNCTION_KEY] == HALF_LOGIT_LINK_STRING:
+        raw_scores = 2 * raw_scores
+
+    positive_class_probs = expit(raw_scores)
+    return numpy.transpose(numpy.vstack(
+        (1. - positive_class_probs, positive_class_probs)
+    ))
+
+
+def _predict_block_in_place(argument_tuple):
+    """Computes class probabilities for one block and writes them to output.
+
+    :param argument_tuple: Tuple with the following elements.
+    argument_tuple[0]: model_dict: See doc for `predict_proba`.
+    argument_tuple[1]: predictor_matrix: Same.
+    argument_tuple[2]: probability_matrix: Output array (see doc for
+        `predict_proba`), which is filled in place.
+    argument_tuple[3]: first_index: Index of first example in block.
+    argument_tuple[4]: last_index: Index of last example in block, plus one.
+    """
+
+    (model_dict, predictor_matrix, probability_matrix, first_index,
+     last_index) = argument_tuple
+
+    probability_matrix[first_index:last_index, :] = _predict_one_block(
+        model_dict=model_dict,
+        predictor_matrix=predictor_matrix[first_index:last_index, :]
+    )
+
+
+def predict_proba(model_dict, predictor_matrix,
+                  num_examples_per_block=DEFAULT_NUM_EXAMPLES_PER_BLOCK,
+                  num_threads=1):
+    """Computes class probabilities with compiled model.
+
+    Results are identical to those from `predict_proba` in scikit-learn (for a
+    random forest, with `n_jobs = 1`; with more jobs, scikit-learn adds trees in
+    a random order, which can change the last bit).
+
+    E = number of examples
+    P = number of predictors
+    K = number of classes
+
+    :param model_dict: Dictionary created by `compile_model` or
+        `model_store.read_model`.
+    :param predictor_matrix: E-by-P numpy array of predictor values.
+    :param num_examples_per_block: Number of examples per block.  Each tree is
+        traversed once per block, so small blocks add Python overhead.
+    :param num_threads: Number of threads (each evaluating a different block).
+    :return: probability_matrix: E-by-K numpy array of class probabilities.
+    """
+
+    predictor_matrix = numpy.ascontiguousarray(
+        predictor_matrix, dtype=model_dict[INPUT_DTYPE_KEY])
+    assert predictor_matrix.shape[1] == model_dict[NUM_PREDICTORS_KEY]
+
+    # Node indices are stored as 32-bit integers, but numpy is much faster at
+    # indexing with native integers, so they are converted once per call.
+    model_dict = model_dict.copy()
+    for this_key in [FEATURE_INDICES_KEY, LEFT_CHILDREN_KEY]:
+        model_dict[this_key] = numpy.array(
+            model_dict[this_key], dtype=numpy.intp)
+
+    if model_dict[MODEL_TYPE_KEY] == TREE_AVERAGE_TYPE_STRING:
+        num_classes = model_dict[LEAF_VALUES_KEY].shape[1]
+    else:
+        num_classes = 2
+
+    num_examples = predictor_matrix.shape[0]
+    probability_matrix = numpy.full((num_examples, num_classes), numpy.nan)
+
+    argument_tuples = [
+        (model_dict, predictor_matrix, probability_matrix, i,
+         min([i + num_examples_per_block, num_examples]))
+        for i in range(0, num_examples, num_examples_per_block)
+    ]
+
+    if num_threads == 1 or len(argument_tuples) == 1:
+        for this_argument_tuple in argument_tuples:
+            _predict_block_in_place(this_argument_tuple)
+    else:
+        thread_pool_object = ThreadPool(processes=num_threads)
+
+        try:
+            thread_pool_object.map(_predict_block_in_place, argument_tuples)
+        finally:
+            thread_pool_object.close()
+            thread_pool_object.join()
+
+    return probability_matrix
@@ -0,0 +1,134 @@
+"""Unit tests for tree_inference.py."""
+
+import unittest
+import numpy
+from module_2 import tree_inference
+from module_2 import utils
+
+RANDOM_STATE_OBJECT = numpy.random.RandomState(6695)
+NUM_TRAINING_EXAMPLES = 1000
+NUM_TESTING_EXAMPLES = 300
+NUM_PREDICTORS = 5
+NUM_TREES = 20
+
+TRAINING_PREDICTOR_MATRIX = RANDOM_STATE_OBJECT.normal(
+    size=(NUM_TRAINING_EXAMPLES, NUM_PREDICTORS)
+)
+TRAINING_TARGET_VALUES = (
+    TRAINING_PREDICTOR_MATRIX[:, 0] - TRAINING_PREDICTOR_MATRIX[:, 1] +
+    RANDOM_STATE_OBJECT.normal(size=NUM_TRAINING_EXAMPLES)
+)
+
+TRAINING_DATASET_DICT = {
+    utils.PREDICTOR_MATRIX_KEY: TRAINING_PREDICTOR_MATRIX,
+    utils.TARGET_VALUES_KEY: TRAINING_TARGET_VALUES,
+    utils.BINARIZED_TARGET_VALUES_KEY:
+        (TRAINING_TARGET_VALUES > 1.).astype(int)
+}
+
+TESTING_PREDICTOR_MATRIX = RANDOM_STATE_OBJECT.normal(
+    size=(NUM_TESTING_EXAMPLES, NUM_PREDICTORS)
+)
+
+# Some models can handle missing values.
+TESTING_PREDICTOR_MATRIX_WITH_NAN = TESTING_PREDICTOR_MATRIX + 0.
+TESTING_PREDICTOR_MATRIX_WITH_NAN[::7, 2] = numpy.nan
+
+
+class TreeInferenceTests(unittest.TestCase):
+    """Each method is a unit test for tree_inference.py."""
+
+    def _check_predict_proba(self, model_object, predictor_matrix,
+                             num_examples_per_block=1000, num_threads=1):
+        """Compares predict_proba with scikit-learn.
+
+        :param model_object: Trained scikit-learn model.
+        :param predictor_matrix: numpy array of predictor values.
+        :param num_examples_per_block: See doc for
+            `tree_inference.predict_proba`.
+        :param num_threads: Same.
+        """
+
+        this_probability_matrix = tree_inference.predict_proba(
+            model_dict=tree_inference.compile_model(model_object),
+            predictor_matrix=predictor_matrix,
+            num_examples_per_block=num_examples_per_block,
+            num_threads=num_threads)
+
+        self.assertTrue(numpy.array_equal(
+            this_probability_matrix,
+            model_object.predict_proba(predictor_matrix)
+        ))
+
+    def test_predict_proba_tree(self):
+        """Ensures correct output from predict_proba.
+
+        In this case, the model is one decision tree.
+        """
+
+        this_model_object = utils.train_classification_tree(
+            model_object=utils.setup_classification_tree(
+                min_examples_at_split=10, min_examples_at_leaf=5),
+            training_dataset_dict=TRAINING_DATASET_DICT)
+
+        self._check_predict_proba(
+            model_object=this_model_object,
+            predictor_matrix=TESTING_PREDICTOR_MATRIX_WITH_NAN)
+
+    def test_predict_proba_forest(self):
+        """Ensures correct output from predict_proba.
+
+        In this case, the model is a random forest, and examples are split
+        into blocks evaluated by different threads.
+        """
+
+        this_model_object = utils.train_classification_forest(
+            model_object=utils.setup_classification_forest(
+                max_predictors_per_split=2, num_trees=NUM_TREES,
+                min_examples_at_split=10, min_examples_at_leaf=5,
+                num_cores=1),
+            training_dataset_dict=TRAINING_DATASET_DICT)
+
+        self._check_predict_proba(
+            model_object=this_model_object,
+            predictor_matrix=TESTING_PREDICTOR_MATRIX_WITH_NAN,
+            num_examples_per_block=64, num_threads=2)
+
+    def test_predict_proba_gbt_exact(self):
+        """Ensures correct output from predict_proba.
+
+        In this case, the model is gradient-boosted trees with the exact
+        backend.
+        """
+
+        this_model_object = utils.train_classification_gbt(
+            model_object=utils.setup_classification_gbt(
+                max_predictors_per_split=NUM_PREDICTORS, num_trees=NUM_TREES,
+                backend_string=utils.EXACT_GBT_BACKEND_STRING),
+            training_dataset_dict=TRAINING_DATASET_DICT)
+
+        self._check_predict_proba(
+            model_object=this_model_object,
+            predictor_matrix=TESTING_PREDICTOR_MATRIX)
+
+    def test_predict_proba_gbt_histogram(self):
+        """Ensures correct output from predict_proba.
+
+        In this case, the model is gradient-boosted trees with the histogram
+        backend.
+        """
+
+        this_model_object = utils.train_classification_gbt(
+            model_object=utils.setup_classification_gbt(
+                max_predictors_per_split=NUM_PREDICTORS, num_trees=NUM_TREES,
+                backend_string=utils.HISTOGRAM_GBT_BACKEND_STRING,
+                num_predictors=NUM_PREDICTORS),
+            training_dataset_dict=TRAINING_DATASET_DICT)
+
+        self._check_predict_proba(
+            model_object=this_model_object,
+            predictor_matrix=TESTING_PREDICTOR_MATRIX_WITH_NAN)
+
+
+if __name__ == '__main__':
+    unittest.main()
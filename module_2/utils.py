@@ -1,11 +1,14 @@
 """Helper methods for Module 2."""
 
+import copy
+import gzip
 import errno
 import glob
 import os.path
 import pickle
 import time
 import calendar
+import multiprocessing
 import numpy
 import pandas
 import matplotlib.colors
@@ -14,6 +17,14 @@ import sklearn.metrics
 import sklearn.linear_model
 import sklearn.tree
 import sklearn.ensemble
+
+if not hasattr(sklearn.ensemble, 'HistGradientBoostingClassifier'):
+    try:
+        # Needed for histogram-based gradient boosting in scikit-learn < 1.0.
+        import sklearn.experimental.enable_hist_gradient_boosting  # noqa: F401
+    except ImportError:
+        pass
+
 from module_4 import roc_curves
 from module_4 import performance_diagrams as perf_diagrams
 from module_4 import attributes_diagrams as attr_diagrams
@@ -40,9 +51,15 @@ EXTRANEOUS_COLUMNS = [
 TARGET_NAME = 'RVORT1_MAX-future_max'
 BINARIZED_TARGET_NAME = 'strong_future_rotation_flag'
 
+PREDICTOR_MATRIX_KEY = 'predictor_matrix'
+PREDICTOR_NAMES_KEY = 'predictor_names'
+TARGET_VALUES_KEY = 'target_values'
+BINARIZED_TARGET_VALUES_KEY = 'binarized_target_values'
+
 NUM_VALUES_KEY = 'num_values'
 MEAN_VALUE_KEY = 'mean_value'
 MEAN_OF_SQUARES_KEY = 'mean_of_squares'
+SCATTER_MATRIX_KEY = 'scatter_matrix'
 
 MAE_KEY = 'mean_absolute_error'
 MSE_KEY = 'mean_squared_error'
@@ -56,6 +73,21 @@ MAX_CSI_KEY = 'max_csi'
 BRIER_SCORE_KEY = 'brier_score'
 BRIER_SKILL_SCORE_KEY = 'brier_skill_score'
 
+LAMBDA1_VALUES_KEY = 'lambda1_values'
+LAMBDA2_VALUES_KEY = 'lambda2_values'
+FIT_TIME_MATRIX_KEY = 'fit_time_matrix_sec'
+MODEL_OBJECTS_KEY = 'model_object_matrix'
+MIN_PER_SPLIT_VALUES_KEY = 'min_per_split_values'
+MIN_PER_LEAF_VALUES_KEY = 'min_per_leaf_values'
+
+TRAINING_DATASET_KEY = 'training_dataset_dict'
+VALIDATION_DATASET_KEY = 'validation_dataset_dict'
+NORMALIZATION_DICT_KEY = 'normalization_dict'
+VALIDATION_DATE_STRINGS_KEY = 'validation_date_strings'
+FOLD_EVALUATION_DICTS_KEY = 'fold_evaluation_dicts'
+MEAN_EVALUATION_DICT_KEY = 'mean_evaluation_dict'
+FIT_TIMES_KEY = 'fit_times_sec'
+
 # Plotting constants.
 DEFAULT_FIG_WIDTH_INCHES = 10
 DEFAULT_FIG_HEIGHT_INCHES = 10
@@ -83,6 +115,27 @@ DATE_FORMAT_REGEX = '[0-9][0-9][0-9][0-9][0-1][0-9][0-3][0-9]'
 
 RANDOM_SEED = 6695
 LAMBDA_TOLERANCE = 1e-10
+GZIP_MAGIC_BYTES = b'\x1f\x8b'
+
+EXACT_GBT_BACKEND_STRING = 'exact'
+HISTOGRAM_GBT_BACKEND_STRING = 'histogram'
+VALID_GBT_BACKEND_STRINGS = [
+    EXACT_GBT_BACKEND_STRING, HISTOGRAM_GBT_BACKEND_STRING
+]
+DEFAULT_GBT_MAX_DEPTH = 3
+DEFAULT_NUM_STREAMING_EPOCHS = 5
+
+CV_DATE_COLUMN_NAME = 'Run_Date'
+DEFAULT_NUM_CV_FOLDS = 5
+
+# Arrays shared by worker processes in a grid search.  These are filled by
+# `_init_grid_worker` in each worker, so they are never pickled per task.  In
+# cross-validation, each key is a tuple with (one of these strings, fold index).
+TRAINING_PREDICTORS_KEY = 'training_predictor_matrix'
+TRAINING_TARGETS_KEY = 'training_target_values'
+VALIDATION_PREDICTORS_KEY = 'validation_predictor_matrix'
+VALIDATION_TARGETS_KEY = 'validation_target_values'
+SHARED_GRID_ARRAY_DICT = {}
 
 
 def time_string_to_unix(time_string, time_format):
@@ -470,6 +523,111 @@ def binarize_target_values(target_values, binarization_threshold):
     return (target_values >= binarization_threshold).astype(int)
 
 
+def create_dataset(predictor_table, target_table):
+    """Converts predictor and target tables to dataset dictionary.
+
+    Each table is converted to numpy arrays only once, so that training and
+    evaluating many models does not repeatedly copy the full table.
+
+    Predictors are kept in double precision, so that linear and logistic
+    models are fit exactly as before.  Tree-based models work in single
+    precision, so `train_classification_forest` converts the predictors once
+    before training, and `run_tree_grid_search` converts them once for all
+    trees in the grid.
+
+    E = number of examples (storm objects)
+    P = number of predictors
+
+    :param predictor_table: See doc for `read_feature_file`.
+    :param target_table: Same.  May also contain a column with binarized target
+        values (named `BINARIZED_TARGET_NAME`).
+    :return: dataset_dict: Dictionary with the following keys.
+    dataset_dict['predictor_matrix']: E-by-P numpy array of predictor values
+        (C-contiguous, float64).
+    dataset_dict['predictor_names']: length-P list with names of predictors.
+    dataset_dict['target_values']: length-E numpy array of real-number target
+        values.
+    dataset_dict['binarized_target_values']: length-E numpy array of binarized
+        target values (integers in 0...1).  If `target_table` does not contain
+        binarized values, this is None.
+    """
+
+    if BINARIZED_TARGET_NAME in target_table:
+        binarized_target_values = target_table[BINARIZED_TARGET_NAME].values
+    else:
+        binarized_target_values = None
+
+    return {
+        PREDICTOR_MATRIX_KEY: numpy.ascontiguousarray(
+            predictor_table.values, dtype=numpy.float64),
+        PREDICTOR_NAMES_KEY: list(predictor_table),
+        TARGET_VALUES_KEY: target_table[TARGET_NAME].values,
+        BINARIZED_TARGET_VALUES_KEY: binarized_target_values
+    }
+
+
+def dataset_generator(csv_file_names, normalization_dict,
+                      binarization_threshold=None, num_files_per_chunk=1,
+                      random_state_object=None):
+    """Reads dataset from feature files, one chunk of files at a time.
+
+    This allows models to be trained on more data than fits in memory.  Each
+    chunk is normalized on the fly, using the given normalization params.
+
+    :param csv_file_names: 1-D list of paths to input files.
+    :param normalization_dict: See doc for `normalize_predictors`.  You cannot
+        leave this as None.
+    :param binarization_threshold: Binarization threshold for target variable.
+        If None, binarized target values will not be created.
+    :param num_files_per_chunk: Number of files per chunk.
+    :param random_state_object: Instance of `numpy.random.RandomState`.  If
+        specified, will shuffle the order of files and the order of examples
+        within each chunk.  If None, will not shuffle.
+    :return: dataset_dict: Dictionary created by `create_dataset` (for one
+        chunk), with predictors normalized.  If `binarization_threshold is not
+        None`, this will also contain binarized target values.
+    :raises: TypeError: if `normalization_dict is None`.
+    """
+
+    if normalization_dict is None:
+        error_string = 'normalization_dict cannot be None.  Must be specified.'
+        raise TypeError(error_string)
+
+    csv_file_names = list(csv_file_names)
+    if random_state_object is not None:
+        random_state_object.shuffle(csv_file_names)
+
+    for i in range(0, len(csv_file_names), num_files_per_chunk):
+        _, this_predictor_table, this_target_table = read_many_feature_files(
+            csv_file_names[i:(i + num_files_per_chunk)]
+        )
+
+        this_predictor_table, _ = normalize_predictors(
+            predictor_table=this_predictor_table,
+            normalization_dict=normalization_dict)
+
+        if random_state_object is not None:
+            these_indices = random_state_object.permutation(
+                len(this_predictor_table.index)
+            )
+
+            this_predictor_table = this_predictor_table.iloc[these_indices]
+            this_target_table = this_target_table.iloc[these_indices]
+
+        this_dataset_dict = create_dataset(
+            predictor_table=this_predictor_table,
+            target_table=this_target_table)
+
+        if binarization_threshold is not None:
+            this_dataset_dict[BINARIZED_TARGET_VALUES_KEY] = (
+                binarize_target_values(
+                    target_values=this_dataset_dict[TARGET_VALUES_KEY],
+                    binarization_threshold=binarization_threshold)
+            )
+
+        yield this_dataset_dict
+
+
 def _lambdas_to_sklearn_inputs(lambda1, lambda2):
     """Converts lambdas to input arguments for scikit-learn.
 
@@ -515,24 +673,562 @@ def setup_linear_regression(lambda1=0., lambda2=0.):
         random_state=RANDOM_SEED)
 
 
-def train_linear_regression(model_object, training_predictor_table,
-                            training_target_table):
+def train_linear_regression(model_object, training_predictor_table=None,
+                            training_target_table=None,
+                            training_dataset_dict=None):
     """Trains linear-regression model.
 
     :param model_object: Untrained model created by `setup_linear_regression`.
     :param training_predictor_table: See doc for `read_feature_file`.
     :param training_target_table: Same.
+    :param training_dataset_dict: Dictionary created by `create_dataset`.  If
+        this is specified, `training_predictor_table` and
+        `training_target_table` will not be used.
     :return: model_object: Trained version of input.
     """
 
+    if training_dataset_dict is None:
+        training_dataset_dict = create_dataset(
+            predictor_table=training_predictor_table,
+            target_table=training_target_table)
+
     model_object.fit(
-        X=training_predictor_table.as_matrix(),
-        y=training_target_table[TARGET_NAME].values
+        X=training_dataset_dict[PREDICTOR_MATRIX_KEY],
+        y=training_dataset_dict[TARGET_VALUES_KEY]
+    )
+
+    return model_object
+
+
+def _update_scatter_matrix(intermediate_scatter_dict, new_data_matrix):
+    """Updates mean and scatter matrix with new examples.
+
+    This method merges the new examples into the running estimates with the
+    pairwise algorithm of Chan et al. (1979), which is more stable than
+    accumulating raw sums of squares.
+
+    E = number of new examples
+    V = number of variables
+
+    :param intermediate_scatter_dict: Dictionary with the following keys.  If
+        empty, will be initialized.
+    intermediate_scatter_dict['num_values']: Number of examples on which
+        current estimates are based.
+    intermediate_scatter_dict['mean_value']: length-V numpy array of means.
+    intermediate_scatter_dict['scatter_matrix']: V-by-V numpy array with sum of
+        outer products of deviations from the mean.
+
+    :param new_data_matrix: E-by-V numpy array of new values.
+    :return: intermediate_scatter_dict: Same as input but with updated values.
+    """
+
+    new_data_matrix = new_data_matrix.astype(float)
+    new_num_values = new_data_matrix.shape[0]
+    new_means = numpy.mean(new_data_matrix, axis=0)
+    new_deviation_matrix = new_data_matrix - new_means
+    new_scatter_matrix = numpy.dot(
+        new_deviation_matrix.T, new_deviation_matrix)
+
+    if MEAN_VALUE_KEY not in intermediate_scatter_dict:
+        return {
+            NUM_VALUES_KEY: new_num_values,
+            MEAN_VALUE_KEY: new_means,
+            SCATTER_MATRIX_KEY: new_scatter_matrix
+        }
+
+    old_num_values = intermediate_scatter_dict[NUM_VALUES_KEY]
+    total_num_values = old_num_values + new_num_values
+    mean_differences = new_means - intermediate_scatter_dict[MEAN_VALUE_KEY]
+
+    intermediate_scatter_dict[SCATTER_MATRIX_KEY] += (
+        new_scatter_matrix +
+        numpy.outer(mean_differences, mean_differences) *
+        float(old_num_values) * new_num_values / total_num_values
+    )
+    intermediate_scatter_dict[MEAN_VALUE_KEY] += (
+        mean_differences * float(new_num_values) / total_num_values
+    )
+    intermediate_scatter_dict[NUM_VALUES_KEY] = total_num_values
+
+    return intermediate_scatter_dict
+
+
+def _get_sgd_regressor(model_object):
+    """Converts lasso or elastic-net model to SGD model with same objective.
+
+    :param model_object: Instance of `sklearn.linear_model.Lasso` or
+        `sklearn.linear_model.ElasticNet`.
+    :return: model_object: Instance of `sklearn.linear_model.SGDRegressor`.
+    """
+
+    return sklearn.linear_model.SGDRegressor(
+        penalty='elasticnet', alpha=model_object.alpha,
+        l1_ratio=model_object.l1_ratio, fit_intercept=True,
+        random_state=RANDOM_SEED)
+
+
+def _train_sgd_model_streaming(
+        model_object, training_file_names, normalization_dict,
+        binarization_threshold, num_files_per_chunk, num_epochs):
+    """Trains SGD model with one call to `partial_fit` per chunk of files.
+
+    :param model_object: Instance of `sklearn.linear_model.SGDRegressor` or
+        `sklearn.linear_model.SGDClassifier`.
+    :param training_file_names: See doc for `dataset_generator`.
+    :param normalization_dict: Same.
+    :param binarization_threshold: Same.  If None, will train on real-number
+        target values (regression).
+    :param num_files_per_chunk: Same.
+    :param num_epochs: Number of passes through the training data.
+    :return: model_object: Trained version of input.
+    :raises: ValueError: if the files contain no examples.
+    """
+
+    random_state_object = numpy.random.RandomState(RANDOM_SEED)
+    num_examples_in_epoch = 0
+
+    for i in range(num_epochs):
+        print('Training epoch {0:d} of {1:d}...'.format(i + 1, num_epochs))
+
+        for this_dataset_dict in dataset_generator(
+                csv_file_names=training_file_names,
+                normalization_dict=normalization_dict,
+                binarization_threshold=binarization_threshold,
+                num_files_per_chunk=num_files_per_chunk,
+                random_state_object=random_state_object):
+
+            if i == 0:
+                num_examples_in_epoch += len(
+                    this_dataset_dict[TARGET_VALUES_KEY])
+
+            if len(this_dataset_dict[TARGET_VALUES_KEY]) == 0:
+                continue
+
+            if binarization_threshold is None:
+                model_object.partial_fit(
+                    X=this_dataset_dict[PREDICTOR_MATRIX_KEY],
+                    y=this_dataset_dict[TARGET_VALUES_KEY]
+                )
+            else:
+                model_object.partial_fit(
+                    X=this_dataset_dict[PREDICTOR_MATRIX_KEY],
+                    y=this_dataset_dict[BINARIZED_TARGET_VALUES_KEY],
+                    classes=numpy.array([0, 1], dtype=int)
+                )
+
+        if num_examples_in_epoch == 0:
+            raise ValueError('Training files contain no examples.')
+
+    return model_object
+
+
+def train_linear_regression_streaming(
+        model_object, training_file_names, normalization_dict,
+        num_files_per_chunk=1, num_epochs=DEFAULT_NUM_STREAMING_EPOCHS):
+    """Trains linear-regression model without reading all data into memory.
+
+    If the model is un-regularized or ridge (L2 only), it is fit in one pass
+    over the data, by accumulating the normal equations.  The coefficients are
+    the same as from `train_linear_regression`, up to rounding error.
+
+    If the model has L1 regularization (lasso or elastic net), it is replaced
+    by `sklearn.linear_model.SGDRegressor` with the same objective function and
+    fit by stochastic gradient descent, one chunk of files at a time.
+
+    :param model_object: Untrained model created by `setup_linear_regression`.
+    :param training_file_names: 1-D list of paths to feature (CSV) files.
+    :param normalization_dict: See doc for `dataset_generator`.
+    :param num_files_per_chunk: Same.
+    :param num_epochs: [used only with L1 regularization]
+        Number of passes through the training data.
+    :return: model_object: Trained model.  This is the input object, except
+        with L1 regularization (see above).  Thus, callers must always use the
+        returned object, not the input object.
+    :raises: ValueError: if `training_file_names` is empty or the files contain
+        no examples.
+    """
+
+    if len(training_file_names) == 0:
+        raise ValueError('`training_file_names` is empty.')
+
+    # Lasso and elastic-net models have this attribute.
+    if hasattr(model_object, 'l1_ratio'):
+        return _train_sgd_model_streaming(
+            model_object=_get_sgd_regressor(model_object),
+            training_file_names=training_file_names,
+            normalization_dict=normalization_dict, binarization_threshold=None,
+            num_files_per_chunk=num_files_per_chunk, num_epochs=num_epochs)
+
+    intermediate_scatter_dict = {}
+
+    for this_dataset_dict in dataset_generator(
+            csv_file_names=training_file_names,
+            normalization_dict=normalization_dict,
+            num_files_per_chunk=num_files_per_chunk):
+
+        if len(this_dataset_dict[TARGET_VALUES_KEY]) == 0:
+            continue
+
+        # Last column contains target values.
+        intermediate_scatter_dict = _update_scatter_matrix(
+            intermediate_scatter_dict=intermediate_scatter_dict,
+            new_data_matrix=numpy.hstack((
+                this_dataset_dict[PREDICTOR_MATRIX_KEY],
+                numpy.reshape(this_dataset_dict[TARGET_VALUES_KEY], (-1, 1))
+            ))
+        )
+
+    if SCATTER_MATRIX_KEY not in intermediate_scatter_dict:
+        raise ValueError('Training files contain no examples.')
+
+    scatter_matrix = intermediate_scatter_dict[SCATTER_MATRIX_KEY]
+    mean_values = intermediate_scatter_dict[MEAN_VALUE_KEY]
+    num_predictors = len(mean_values) - 1
+
+    lambda2 = getattr(model_object, 'alpha', 0.)
+    coefficients = numpy.linalg.lstsq(
+        scatter_matrix[:-1, :-1] + lambda2 * numpy.eye(num_predictors),
+        scatter_matrix[:-1, -1], rcond=None
+    )[0]
+
+    model_object.coef_ = coefficients
+    model_object.intercept_ = (
+        mean_values[-1] - numpy.dot(mean_values[:-1], coefficients)
     )
+    model_object.n_features_in_ = num_predictors
 
     return model_object
 
 
+def _array_to_shared_memory(input_array):
+    """Copies numpy array to shared memory.
+
+    :param input_array: numpy array.
+    :return: shared_array: Instance of `multiprocessing.RawArray`, containing
+        flattened values.
+    :return: array_shape: Shape of input array (tuple).
+    :return: data_type: Data type of input array (instance of `numpy.dtype`).
+    """
+
+    shared_array = multiprocessing.RawArray(
+        input_array.dtype.char, input_array.size)
+    numpy.frombuffer(shared_array, dtype=input_array.dtype)[:] = numpy.ravel(
+        input_array)
+
+    return shared_array, input_array.shape, input_array.dtype
+
+
+def _init_grid_worker(shared_array_dict):
+    """Initializes worker process for grid search.
+
+    This method wraps shared memory in numpy arrays (without copying) and
+    stores them in `SHARED_GRID_ARRAY_DICT`.
+
+    :param shared_array_dict: Dictionary, where each key is a string listed at
+        top of file (e.g., `TRAINING_PREDICTORS_KEY`) or a tuple with such a
+        string and a fold index, and each value is a tuple created by
+        `_array_to_shared_memory`.
+    """
+
+    for this_key in shared_array_dict:
+        this_shared_array, this_shape, this_data_type = shared_array_dict[
+            this_key]
+
+        SHARED_GRID_ARRAY_DICT[this_key] = numpy.frombuffer(
+            this_shared_array, dtype=this_data_type
+        ).reshape(this_shape)
+
+
+def _train_one_l1l2_model(lambda_tuple):
+    """Trains and validates one linear-regression model in grid search.
+
+    This method must be called in a worker process initialized by
+    `_init_grid_worker`.
+
+    :param lambda_tuple: Tuple with (lambda1, lambda2).  See doc for
+        `setup_linear_regression`.
+    :return: evaluation_dict: Dictionary created by `evaluate_regression`, for
+        validation data.
+    :return: fit_time_sec: Time taken to train model.
+    """
+
+    training_target_values = SHARED_GRID_ARRAY_DICT[TRAINING_TARGETS_KEY]
+
+    model_object = setup_linear_regression(
+        lambda1=lambda_tuple[0], lambda2=lambda_tuple[1])
+
+    start_time_sec = time.time()
+    model_object.fit(
+        X=SHARED_GRID_ARRAY_DICT[TRAINING_PREDICTORS_KEY],
+        y=training_target_values
+    )
+    fit_time_sec = time.time() - start_time_sec
+
+    evaluation_dict = evaluate_regression(
+        target_values=SHARED_GRID_ARRAY_DICT[VALIDATION_TARGETS_KEY],
+        predicted_target_values=model_object.predict(
+            SHARED_GRID_ARRAY_DICT[VALIDATION_PREDICTORS_KEY]
+        ),
+        mean_training_target_value=numpy.mean(training_target_values),
+        verbose=False, create_plots=False)
+
+    return evaluation_dict, fit_time_sec
+
+
+def run_l1l2_grid_search(
+        training_dataset_dict, validation_dataset_dict, lambda1_values,
+        lambda2_values, num_processes=None):
+    """Trains linear-regression models on a grid of L1/L2 weights.
+
+    Models are trained in parallel, one per (lambda1, lambda2) pair.  Training
+    and validation data are copied once to shared memory, which is read by all
+    worker processes.
+
+    M = number of lambda1 values
+    N = number of lambda2 values
+
+    :param training_dataset_dict: Dictionary created by `create_dataset`.
+    :param validation_dataset_dict: Same.
+    :param lambda1_values: length-M numpy array of L1-regularization weights.
+    :param lambda2_values: length-N numpy array of L2-regularization weights.
+    :param num_processes: Number of worker processes.  If None, will use all
+        cores.
+    :return: grid_search_dict: Dictionary with the following keys.
+    grid_search_dict['lambda1_values']: Same as input.
+    grid_search_dict['lambda2_values']: Same as input.
+    grid_search_dict['mean_absolute_error']: M-by-N numpy array of mean
+        absolute errors on validation data.
+    grid_search_dict['mean_squared_error']: Same but for mean squared error.
+    grid_search_dict['mean_bias']: Same but for mean bias.
+    grid_search_dict['mae_skill_score']: Same but for MAE skill score.
+    grid_search_dict['mse_skill_score']: Same but for MSE skill score.
+    grid_search_dict['fit_time_matrix_sec']: M-by-N numpy array of training
+        times.
+    """
+
+    num_lambda1 = len(lambda1_values)
+    num_lambda2 = len(lambda2_values)
+
+    shared_array_dict = {
+        TRAINING_PREDICTORS_KEY: _array_to_shared_memory(
+            training_dataset_dict[PREDICTOR_MATRIX_KEY]),
+        TRAINING_TARGETS_KEY: _array_to_shared_memory(
+            training_dataset_dict[TARGET_VALUES_KEY]),
+        VALIDATION_PREDICTORS_KEY: _array_to_shared_memory(
+            validation_dataset_dict[PREDICTOR_MATRIX_KEY]),
+        VALIDATION_TARGETS_KEY: _array_to_shared_memory(
+            validation_dataset_dict[TARGET_VALUES_KEY])
+    }
+
+    lambda_tuples = [
+        (lambda1_values[i], lambda2_values[j])
+        for i in range(num_lambda1) for j in range(num_lambda2)
+    ]
+
+    print((
+        'Training {0:d} models (lasso coeffs from 10^{1:.1f} to 10^{2:.1f}, '
+        'ridge coeffs from 10^{3:.1f} to 10^{4:.1f})...'
+    ).format(
+        len(lambda_tuples), numpy.log10(numpy.min(lambda1_values)),
+        numpy.log10(numpy.max(lambda1_values)),
+        numpy.log10(numpy.min(lambda2_values)),
+        numpy.log10(numpy.max(lambda2_values))
+    ))
+
+    pool_object = multiprocessing.Pool(
+        processes=num_processes, initializer=_init_grid_worker,
+        initargs=(shared_array_dict,)
+    )
+
+    try:
+        list_of_results = pool_object.map(_train_one_l1l2_model, lambda_tuples)
+    finally:
+        pool_object.close()
+        pool_object.join()
+
+    score_keys = [
+        MAE_KEY, MSE_KEY, MEAN_BIAS_KEY, MAE_SKILL_SCORE_KEY,
+        MSE_SKILL_SCORE_KEY
+    ]
+
+    grid_search_dict = {
+        LAMBDA1_VALUES_KEY: lambda1_values,
+        LAMBDA2_VALUES_KEY: lambda2_values,
+        FIT_TIME_MATRIX_KEY: numpy.full((num_lambda1, num_lambda2), numpy.nan)
+    }
+
+    for this_key in score_keys:
+        grid_search_dict[this_key] = numpy.full(
+            (num_lambda1, num_lambda2), numpy.nan)
+
+    for k in range(len(list_of_results)):
+        i, j = numpy.unravel_index(k, (num_lambda1, num_lambda2))
+        this_evaluation_dict, this_fit_time_sec = list_of_results[k]
+
+        grid_search_dict[FIT_TIME_MATRIX_KEY][i, j] = this_fit_time_sec
+        for this_key in score_keys:
+            grid_search_dict[this_key][i, j] = this_evaluation_dict[this_key]
+
+        print((
+            'Lasso coeff = 10^{0:.1f}, ridge coeff = 10^{1:.1f} ... fit time = '
+            '{2:.2f} s ... validation MAE skill score = {3:.3f}'
+        ).format(
+            numpy.log10(lambda1_values[i]), numpy.log10(lambda2_values[j]),
+            this_fit_time_sec, this_evaluation_dict[MAE_SKILL_SCORE_KEY]
+        ))
+
+    return grid_search_dict
+
+
+def _get_next_model_on_path(previous_model_object, new_model_object):
+    """Returns model for next fit on regularization path.
+
+    If both models are of the same type and the type supports warm-starting,
+    the previous model (with coefficients from its last fit) will be given the
+    hyperparameters of the new model.  Otherwise, the new model will be used
+    as is (cold start).
+
+    :param previous_model_object: Model trained at the previous point on the
+        path.  May be None.
+    :param new_model_object: Untrained model for the next point on the path.
+    :return: model_object: Model to be trained at the next point on the path.
+    """
+
+    new_param_dict = new_model_object.get_params()
+
+    if previous_model_object is None or 'warm_start' not in new_param_dict:
+        return new_model_object
+    if type(previous_model_object) is not type(new_model_object):
+        return new_model_object
+
+    new_param_dict['warm_start'] = True
+    previous_model_object.set_params(**new_param_dict)
+    return previous_model_object
+
+
+def run_l1l2_path(
+        training_dataset_dict, validation_dataset_dict, lambda1_values,
+        lambda2_values, classification=False):
+    """Trains linear or logistic models along regularization paths.
+
+    For each lambda1 value, this method sweeps lambda2 from the strongest to the
+    weakest regularization, warm-starting each fit from the coefficients of the
+    previous fit.  Neighbouring lambdas have similar solutions, so this is much
+    faster than training each model from scratch.
+
+    Warm starts work only for model types with a `warm_start` option (lasso,
+    elastic net, and all logistic models).  Thus, when lambda1 = 0 (ridge or
+    un-regularized linear regression), every fit on the path starts from
+    scratch and there is no speedup.  The same is true for the first lasso fit
+    (lambda2 = 0) after a series of elastic-net fits.
+
+    M = number of lambda1 values
+    N = number of lambda2 values
+
+    :param training_dataset_dict: Dictionary created by `create_dataset`.
+    :param validation_dataset_dict: Same.
+    :param lambda1_values: length-M numpy array of L1-regularization weights.
+    :param lambda2_values: length-N numpy array of L2-regularization weights.
+    :param classification: Boolean flag.  If True, will train logistic models
+        (created by `setup_logistic_regression`) to predict the binarized
+        target.  If False, will train linear models (created by
+        `setup_linear_regression`) to predict the real-valued target.
+    :return: path_dict: Dictionary with the following keys, plus one key for
+        each score in the dictionary returned by `evaluate_regression` (if
+        `classification == False`) or `eval_binary_classifn` (if
+        `classification == True`).  Each score is an M-by-N numpy array, on
+        validation data.
+    path_dict['lambda1_values']: Same as input.
+    path_dict['lambda2_values']: Same as input.
+    path_dict['fit_time_matrix_sec']: M-by-N numpy array of training times.
+    path_dict['model_object_matrix']: M-by-N list of lists, where
+        path_dict['model_object_matrix'][i][j] is the trained model for the
+        [i]th lambda1 value and [j]th lambda2 value.
+    """
+
+    num_lambda1 = len(lambda1_values)
+    num_lambda2 = len(lambda2_values)
+
+    training_predictor_matrix = training_dataset_dict[PREDICTOR_MATRIX_KEY]
+    validation_predictor_matrix = validation_dataset_dict[PREDICTOR_MATRIX_KEY]
+
+    if classification:
+        target_key = BINARIZED_TARGET_VALUES_KEY
+    else:
+        target_key = TARGET_VALUES_KEY
+
+    training_target_values = training_dataset_dict[target_key]
+    validation_target_values = validation_dataset_dict[target_key]
+    mean_training_target_value = numpy.mean(training_target_values)
+
+    path_dict = {
+        LAMBDA1_VALUES_KEY: lambda1_values,
+        LAMBDA2_VALUES_KEY: lambda2_values,
+        FIT_TIME_MATRIX_KEY: numpy.full((num_lambda1, num_lambda2), numpy.nan),
+        MODEL_OBJECTS_KEY: [[None] * num_lambda2 for _ in range(num_lambda1)]
+    }
+
+    # Strongest to weakest L2 regularization.
+    sort_indices = numpy.argsort(-1 * numpy.array(lambda2_values))
+
+    for i in range(num_lambda1):
+        this_model_object = None
+
+        for j in sort_indices:
+            if classification:
+                this_new_model_object = setup_logistic_regression(
+                    lambda1=lambda1_values[i], lambda2=lambda2_values[j])
+            else:
+                this_new_model_object = setup_linear_regression(
+                    lambda1=lambda1_values[i], lambda2=lambda2_values[j])
+
+            this_model_object = _get_next_model_on_path(
+                previous_model_object=this_model_object,
+                new_model_object=this_new_model_object)
+
+            this_start_time_sec = time.time()
+            this_model_object.fit(
+                X=training_predictor_matrix, y=training_target_values)
+            path_dict[FIT_TIME_MATRIX_KEY][i, j] = (
+                time.time() - this_start_time_sec
+            )
+
+            path_dict[MODEL_OBJECTS_KEY][i][j] = copy.deepcopy(
+                this_model_object)
+
+            if classification:
+                this_evaluation_dict = eval_binary_classifn(
+                    observed_labels=validation_target_values,
+                    forecast_probabilities=this_model_object.predict_proba(
+                        validation_predictor_matrix)[:, 1],
+                    training_event_frequency=mean_training_target_value,
+                    verbose=False, create_plots=False)
+            else:
+                this_evaluation_dict = evaluate_regression(
+                    target_values=validation_target_values,
+                    predicted_target_values=this_model_object.predict(
+                        validation_predictor_matrix),
+                    mean_training_target_value=mean_training_target_value,
+                    verbose=False, create_plots=False)
+
+            for this_key in this_evaluation_dict:
+                if this_key not in path_dict:
+                    path_dict[this_key] = numpy.full(
+                        (num_lambda1, num_lambda2), numpy.nan)
+
+                path_dict[this_key][i, j] = this_evaluation_dict[this_key]
+
+        print((
+            'Trained path with lasso coeff = {0:.2e} ({1:d} ridge coeffs) '
+            'in {2:.2f} s'
+        ).format(
+            lambda1_values[i], num_lambda2,
+            numpy.sum(path_dict[FIT_TIME_MATRIX_KEY][i, :])
+        ))
+
+    return path_dict
+
+
 def _create_directory(directory_name=None, file_name=None):
     """Creates directory (along with parents if necessary).
 
@@ -556,21 +1252,51 @@ def _create_directory(directory_name=None, file_name=None):
             raise
 
 
-def write_model(model_object, pickle_file_name):
+def write_model(model_object, pickle_file_name, compress=False):
     """Writes model to Pickle file.
 
     :param model_object: Trained model (instance of `sklearn.linear_model`, for
         example).
     :param pickle_file_name: Path to output file.
+    :param compress: Boolean flag.  If True, will gzip the file.  For tree
+        ensembles, this makes the file several times smaller.
     """
 
     print('Writing model to: "{0:s}"...'.format(pickle_file_name))
     _create_directory(file_name=pickle_file_name)
 
-    file_handle = open(pickle_file_name, 'wb')
-    pickle.dump(model_object, file_handle)
+    if compress:
+        file_handle = gzip.open(pickle_file_name, 'wb')
+    else:
+        file_handle = open(pickle_file_name, 'wb')
+
+    pickle.dump(model_object, file_handle, protocol=pickle.HIGHEST_PROTOCOL)
+    file_handle.close()
+
+
+def read_model(pickle_file_name):
+    """Reads model from Pickle file.
+
+    :param pickle_file_name: Path to input file (created by `write_model`, with
+        or without compression).
+    :return: model_object: Trained model (instance of `sklearn.linear_model`,
+        for example).
+    """
+
+    file_handle = open(pickle_file_name, 'rb')
+    is_gzipped = file_handle.read(len(GZIP_MAGIC_BYTES)) == GZIP_MAGIC_BYTES
     file_handle.close()
 
+    if is_gzipped:
+        file_handle = gzip.open(pickle_file_name, 'rb')
+    else:
+        file_handle = open(pickle_file_name, 'rb')
+
+    model_object = pickle.load(file_handle)
+    file_handle.close()
+
+    return model_object
+
 
 def evaluate_regression(
         target_values, predicted_target_values, mean_training_target_value,
@@ -838,24 +1564,65 @@ def setup_logistic_regression(lambda1=0., lambda2=0.):
         fit_intercept=True, verbose=0, random_state=RANDOM_SEED)
 
 
-def train_logistic_regression(model_object, training_predictor_table,
-                              training_target_table):
+def train_logistic_regression(model_object, training_predictor_table=None,
+                              training_target_table=None,
+                              training_dataset_dict=None):
     """Trains logistic-regression model.
 
     :param model_object: Untrained model created by `setup_logistic_regression`.
     :param training_predictor_table: See doc for `read_feature_file`.
     :param training_target_table: Same.
+    :param training_dataset_dict: Dictionary created by `create_dataset`.  If
+        this is specified, `training_predictor_table` and
+        `training_target_table` will not be used.
     :return: model_object: Trained version of input.
     """
 
+    if training_dataset_dict is None:
+        training_dataset_dict = create_dataset(
+            predictor_table=training_predictor_table,
+            target_table=training_target_table)
+
     model_object.fit(
-        X=training_predictor_table.as_matrix(),
-        y=training_target_table[BINARIZED_TARGET_NAME].values
+        X=training_dataset_dict[PREDICTOR_MATRIX_KEY],
+        y=training_dataset_dict[BINARIZED_TARGET_VALUES_KEY]
     )
 
     return model_object
 
 
+def train_logistic_regression_streaming(
+        model_object, training_file_names, normalization_dict,
+        binarization_threshold, num_files_per_chunk=1,
+        num_epochs=DEFAULT_NUM_STREAMING_EPOCHS):
+    """Trains logistic-regression model without reading all data into memory.
+
+    The model is fit by stochastic gradient descent, one chunk of files at a
+    time.  Files are shuffled before each epoch, and examples are shuffled
+    within each chunk.
+
+    :param model_object: Untrained model created by
+        `setup_logistic_regression`.
+    :param training_file_names: 1-D list of paths to feature (CSV) files.
+    :param normalization_dict: See doc for `dataset_generator`.
+    :param binarization_threshold: Same.
+    :param num_files_per_chunk: Same.
+    :param num_epochs: Number of passes through the training data.
+    :return: model_object: Trained version of input.
+    :raises: ValueError: if `training_file_names` is empty or the files contain
+        no examples.
+    """
+
+    if len(training_file_names) == 0:
+        raise ValueError('`training_file_names` is empty.')
+
+    return _train_sgd_model_streaming(
+        model_object=model_object, training_file_names=training_file_names,
+        normalization_dict=normalization_dict,
+        binarization_threshold=binarization_threshold,
+        num_files_per_chunk=num_files_per_chunk, num_epochs=num_epochs)
+
+
 def eval_binary_classifn(
         observed_labels, forecast_probabilities, training_event_frequency,
         verbose=True, create_plots=True, dataset_name=None):
@@ -1015,19 +1782,28 @@ def setup_classification_tree(min_examples_at_split=30,
         min_samples_leaf=min_examples_at_leaf, random_state=RANDOM_SEED)
 
 
-def train_classification_tree(model_object, training_predictor_table,
-                              training_target_table):
+def train_classification_tree(model_object, training_predictor_table=None,
+                              training_target_table=None,
+                              training_dataset_dict=None):
     """Trains decision tree for classification.
 
     :param model_object: Untrained model created by `setup_classification_tree`.
     :param training_predictor_table: See doc for `read_feature_file`.
     :param training_target_table: Same.
+    :param training_dataset_dict: Dictionary created by `create_dataset`.  If
+        this is specified, `training_predictor_table` and
+        `training_target_table` will not be used.
     :return: model_object: Trained version of input.
     """
 
+    if training_dataset_dict is None:
+        training_dataset_dict = create_dataset(
+            predictor_table=training_predictor_table,
+            target_table=training_target_table)
+
     model_object.fit(
-        X=training_predictor_table.as_matrix(),
-        y=training_target_table[BINARIZED_TARGET_NAME].values
+        X=training_dataset_dict[PREDICTOR_MATRIX_KEY],
+        y=training_dataset_dict[BINARIZED_TARGET_VALUES_KEY]
     )
 
     return model_object
@@ -1035,7 +1811,8 @@ def train_classification_tree(model_object, training_predictor_table,
 
 def setup_classification_forest(
         max_predictors_per_split, num_trees=100, min_examples_at_split=30,
-        min_examples_at_leaf=30):
+        min_examples_at_leaf=30, max_depth=None, max_leaf_nodes=None,
+        num_cores=None):
     """Sets up (but does not train) random forest for classification.
 
     :param max_predictors_per_split: Max number of predictors to try at each
@@ -1043,73 +1820,663 @@ def setup_classification_forest(
     :param num_trees: Number of trees.
     :param min_examples_at_split: Minimum number of examples at split node.
     :param min_examples_at_leaf: Minimum number of examples at leaf node.
+    :param max_depth: Max depth of each tree.  If None, depth is limited only
+        by `min_examples_at_split` and `min_examples_at_leaf`.
+    :param max_leaf_nodes: Max number of leaf nodes in each tree.  If None,
+        there is no limit.  With large datasets, use `max_depth` or
+        `max_leaf_nodes` to bound the memory (and file size) of the forest.
+    :param num_cores: Number of cores used to train the trees and to predict
+        with them.  If None, will use all cores.
     :return: model_object: Instance of
         `sklearn.ensemble.RandomForestClassifier`.
     """
 
+    if num_cores is None:
+        num_cores = -1
+
     return sklearn.ensemble.RandomForestClassifier(
         n_estimators=num_trees, min_samples_split=min_examples_at_split,
         min_samples_leaf=min_examples_at_leaf,
-        max_features=max_predictors_per_split, bootstrap=True,
-        random_state=RANDOM_SEED, verbose=2)
+        max_features=max_predictors_per_split, max_depth=max_depth,
+        max_leaf_nodes=max_leaf_nodes, bootstrap=True, n_jobs=num_cores,
+        random_state=RANDOM_SEED, verbose=1)
 
 
-def train_classification_forest(model_object, training_predictor_table,
-                                training_target_table):
+def train_classification_forest(model_object, training_predictor_table=None,
+                                training_target_table=None,
+                                training_dataset_dict=None):
     """Trains random forest for classification.
 
     :param model_object: Untrained model created by
         `setup_classification_forest`.
     :param training_predictor_table: See doc for `read_feature_file`.
     :param training_target_table: Same.
+    :param training_dataset_dict: Dictionary created by `create_dataset`.  If
+        this is specified, `training_predictor_table` and
+        `training_target_table` will not be used.
     :return: model_object: Trained version of input.
     """
 
+    if training_dataset_dict is None:
+        training_dataset_dict = create_dataset(
+            predictor_table=training_predictor_table,
+            target_table=training_target_table)
+
+    # Trees are grown with float32 predictors (see doc for `create_dataset`).
     model_object.fit(
-        X=training_predictor_table.as_matrix(),
-        y=training_target_table[BINARIZED_TARGET_NAME].values
+        X=training_dataset_dict[PREDICTOR_MATRIX_KEY].astype(
+            numpy.float32, copy=False),
+        y=training_dataset_dict[BINARIZED_TARGET_VALUES_KEY]
     )
 
     return model_object
 
 
+def check_gbt_backend(backend_string):
+    """Error-checks backend for gradient-boosted trees.
+
+    :param backend_string: Backend (must be in `VALID_GBT_BACKEND_STRINGS`).
+    :raises: ValueError: if `backend_string not in VALID_GBT_BACKEND_STRINGS`.
+    :raises: ValueError: if backend is "histogram" and this version of
+        scikit-learn does not have histogram-based gradient boosting.
+    """
+
+    if backend_string not in VALID_GBT_BACKEND_STRINGS:
+        error_string = (
+            '\n{0:s}\nValid backends (listed above) do not include "{1:s}".'
+        ).format(str(VALID_GBT_BACKEND_STRINGS), backend_string)
+
+        raise ValueError(error_string)
+
+    if backend_string != HISTOGRAM_GBT_BACKEND_STRING:
+        return
+
+    if not hasattr(sklearn.ensemble, 'HistGradientBoostingClassifier'):
+        error_string = (
+            'This version of scikit-learn ({0:s}) does not have histogram-based'
+            ' gradient boosting.  Use backend "{1:s}" or scikit-learn >= 0.21.'
+        ).format(sklearn.__version__, EXACT_GBT_BACKEND_STRING)
+
+        raise ValueError(error_string)
+
+
 def setup_classification_gbt(
         max_predictors_per_split, num_trees=100, learning_rate=0.1,
-        min_examples_at_split=30, min_examples_at_leaf=30):
+        min_examples_at_split=30, min_examples_at_leaf=30,
+        backend_string=EXACT_GBT_BACKEND_STRING, num_predictors=None):
     """Sets up (but does not train) gradient-boosted trees for classification.
 
     :param max_predictors_per_split: Max number of predictors to try at each
-        split.
+        split.  With the histogram backend, this needs scikit-learn >= 1.4 (and
+        is not used with older versions).
     :param num_trees: Number of trees.
     :param learning_rate: Learning rate.
     :param min_examples_at_split: Minimum number of examples at split node.
+        Not used if `backend_string == "histogram"`.
     :param min_examples_at_leaf: Minimum number of examples at leaf node.
+    :param backend_string: Backend.  If "exact", will use
+        `sklearn.ensemble.GradientBoostingClassifier`, which considers every
+        possible split point and uses one core.  If "histogram", will use
+        `sklearn.ensemble.HistGradientBoostingClassifier`, which bins each
+        predictor into at most 256 values before training and uses all cores.
+        This is much faster for large datasets.  The histogram backend does not
+        support exponential loss, so it uses log loss.  Also, trees have the
+        same max depth as with the exact backend, and early stopping is
+        disabled so that the number of trees is `num_trees`.
+    :param num_predictors: Total number of predictors.  Used only if
+        `backend_string == "histogram"`, because the histogram backend takes
+        the fraction (not number) of predictors to try at each split.
     :return: model_object: Instance of
-        `sklearn.ensemble.GradientBoostingClassifier`.
+        `sklearn.ensemble.GradientBoostingClassifier` or
+        `sklearn.ensemble.HistGradientBoostingClassifier`.
+    :raises: ValueError: if `backend_string == "histogram"`, this version of
+        scikit-learn can subsample predictors at each split, and
+        `num_predictors is None`.
     """
 
-    return sklearn.ensemble.GradientBoostingClassifier(
-        loss='exponential', learning_rate=learning_rate, n_estimators=num_trees,
-        min_samples_split=min_examples_at_split,
-        min_samples_leaf=min_examples_at_leaf,
-        max_features=max_predictors_per_split, random_state=RANDOM_SEED,
-        verbose=2)
+    check_gbt_backend(backend_string)
+
+    if backend_string == EXACT_GBT_BACKEND_STRING:
+        return sklearn.ensemble.GradientBoostingClassifier(
+            loss='exponential', learning_rate=learning_rate,
+            n_estimators=num_trees, min_samples_split=min_examples_at_split,
+            min_samples_leaf=min_examples_at_leaf,
+            max_depth=DEFAULT_GBT_MAX_DEPTH,
+            max_features=max_predictors_per_split, random_state=RANDOM_SEED,
+            verbose=2)
+
+    model_object = sklearn.ensemble.HistGradientBoostingClassifier(
+        learning_rate=learning_rate, max_iter=num_trees,
+        max_leaf_nodes=None, max_depth=DEFAULT_GBT_MAX_DEPTH,
+        min_samples_leaf=min_examples_at_leaf, random_state=RANDOM_SEED,
+        verbose=1)
+
+    # In scikit-learn >= 0.23, early stopping is turned on by default for large
+    # datasets.
+    if 'early_stopping' in model_object.get_params():
+        model_object.set_params(early_stopping=False)
+
+    # In scikit-learn >= 1.4, predictors can be subsampled at each split.
+    # scikit-learn rounds the fraction times the number of predictors up, so
+    # the fraction is made half a predictor smaller to avoid rounding errors.
+    if 'max_features' in model_object.get_params():
+        if num_predictors is None:
+            raise ValueError(
+                'num_predictors must be given with the histogram backend.')
+
+        if max_predictors_per_split < num_predictors:
+            model_object.set_params(
+                max_features=(max_predictors_per_split - 0.5) / num_predictors
+            )
 
+    return model_object
 
-def train_classification_gbt(model_object, training_predictor_table,
-                             training_target_table):
+
+def train_classification_gbt(model_object, training_predictor_table=None,
+                             training_target_table=None,
+                             training_dataset_dict=None):
     """Trains gradient-boosted trees for classification.
 
     :param model_object: Untrained model created by
-        `setup_classification_gbt`.
+        `setup_classification_gbt` (with either backend).
     :param training_predictor_table: See doc for `read_feature_file`.
     :param training_target_table: Same.
+    :param training_dataset_dict: Dictionary created by `create_dataset`.  If
+        this is specified, `training_predictor_table` and
+        `training_target_table` will not be used.
     :return: model_object: Trained version of input.
     """
 
+    if training_dataset_dict is None:
+        training_dataset_dict = create_dataset(
+            predictor_table=training_predictor_table,
+            target_table=training_target_table)
+
     model_object.fit(
-        X=training_predictor_table.as_matrix(),
-        y=training_target_table[BINARIZED_TARGET_NAME].values
+        X=training_dataset_dict[PREDICTOR_MATRIX_KEY],
+        y=training_dataset_dict[BINARIZED_TARGET_VALUES_KEY]
     )
 
     return model_object
+
+
+def _train_one_tree(argument_tuple):
+    """Trains and validates one decision tree in grid search.
+
+    This method must be called in a worker process initialized by
+    `_init_grid_worker`.
+
+    :param argument_tuple: Tuple with the following elements.
+    argument_tuple[0]: min_examples_at_split: Minimum number of examples at
+        split node.
+    argument_tuple[1]: min_examples_at_leaf: Minimum number of examples at leaf
+        node.
+    :return: evaluation_dict: Dictionary created by `eval_binary_classifn`, for
+        validation data.
+    :return: fit_time_sec: Time taken to train tree.
+    """
+
+    min_examples_at_split, min_examples_at_leaf = argument_tuple
+    training_target_values = SHARED_GRID_ARRAY_DICT[TRAINING_TARGETS_KEY]
+
+    model_object = setup_classification_tree(
+        min_examples_at_split=min_examples_at_split,
+        min_examples_at_leaf=min_examples_at_leaf)
+
+    start_time_sec = time.time()
+    model_object.fit(
+        X=SHARED_GRID_ARRAY_DICT[TRAINING_PREDICTORS_KEY],
+        y=training_target_values
+    )
+    fit_time_sec = time.time() - start_time_sec
+
+    evaluation_dict = eval_binary_classifn(
+        observed_labels=SHARED_GRID_ARRAY_DICT[VALIDATION_TARGETS_KEY],
+        forecast_probabilities=model_object.predict_proba(
+            SHARED_GRID_ARRAY_DICT[VALIDATION_PREDICTORS_KEY]
+        )[:, 1],
+        training_event_frequency=numpy.mean(training_target_values),
+        verbose=False, create_plots=False)
+
+    return evaluation_dict, fit_time_sec
+
+
+def run_tree_grid_search(
+        training_dataset_dict, validation_dataset_dict, min_per_split_values,
+        min_per_leaf_values, num_processes=None):
+    """Trains decision trees on a grid of min examples per split/leaf.
+
+    Each combination where min per leaf < min per split is trained from
+    scratch.  Trees are trained in parallel, one per combination.  Training and
+    validation data are copied once to shared memory, which is read by all
+    worker processes.  Predictors are stored in single precision, which is what
+    scikit-learn uses for trees, so they are not converted again for each tree.
+
+    M = number of min-per-split values
+    N = number of min-per-leaf values
+
+    :param training_dataset_dict: Dictionary created by `create_dataset`.
+    :param validation_dataset_dict: Same.
+    :param min_per_split_values: length-M numpy array of minimum numbers of
+        examples at split node.
+    :param min_per_leaf_values: length-N numpy array of minimum numbers of
+        examples at leaf node.
+    :param num_processes: Number of worker processes.  If None, will use all
+        cores.
+    :return: grid_search_dict: Dictionary with the following keys, plus one key
+        for each score in the dictionary returned by `eval_binary_classifn`.
+        Each score is an M-by-N numpy array on validation data, with NaN where
+        min per leaf >= min per split.
+    grid_search_dict['min_per_split_values']: Same as input.
+    grid_search_dict['min_per_leaf_values']: Same as input.
+    grid_search_dict['fit_time_matrix_sec']: M-by-N numpy array of training
+        times.
+    """
+
+    num_split_values = len(min_per_split_values)
+    num_leaf_values = len(min_per_leaf_values)
+
+    shared_array_dict = {
+        TRAINING_PREDICTORS_KEY: _array_to_shared_memory(
+            training_dataset_dict[PREDICTOR_MATRIX_KEY].astype(numpy.float32)
+        ),
+        TRAINING_TARGETS_KEY: _array_to_shared_memory(
+            training_dataset_dict[BINARIZED_TARGET_VALUES_KEY]),
+        VALIDATION_PREDICTORS_KEY: _array_to_shared_memory(
+            validation_dataset_dict[PREDICTOR_MATRIX_KEY].astype(numpy.float32)
+        ),
+        VALIDATION_TARGETS_KEY: _array_to_shared_memory(
+            validation_dataset_dict[BINARIZED_TARGET_VALUES_KEY])
+    }
+
+    index_tuples = [
+        (i, j) for i in range(num_split_values) for j in range(num_leaf_values)
+        if min_per_leaf_values[j] < min_per_split_values[i]
+    ]
+
+    argument_tuples = [
+        (min_per_split_values[i], min_per_leaf_values[j])
+        for i, j in index_tuples
+    ]
+
+    print('Training {0:d} decision trees...'.format(len(argument_tuples)))
+
+    pool_object = multiprocessing.Pool(
+        processes=num_processes, initializer=_init_grid_worker,
+        initargs=(shared_array_dict,)
+    )
+
+    try:
+        list_of_results = pool_object.map(_train_one_tree, argument_tuples)
+    finally:
+        pool_object.close()
+        pool_object.join()
+
+    grid_search_dict = {
+        MIN_PER_SPLIT_VALUES_KEY: min_per_split_values,
+        MIN_PER_LEAF_VALUES_KEY: min_per_leaf_values,
+        FIT_TIME_MATRIX_KEY: numpy.full(
+            (num_split_values, num_leaf_values), numpy.nan)
+    }
+
+    for k in range(len(list_of_results)):
+        i, j = index_tuples[k]
+        this_evaluation_dict, this_fit_time_sec = list_of_results[k]
+
+        grid_search_dict[FIT_TIME_MATRIX_KEY][i, j] = this_fit_time_sec
+
+        for this_key in this_evaluation_dict:
+            if this_key not in grid_search_dict:
+                grid_search_dict[this_key] = numpy.full(
+                    (num_split_values, num_leaf_values), numpy.nan)
+
+            grid_search_dict[this_key][i, j] = this_evaluation_dict[this_key]
+
+        print((
+            'Min examples per split node = {0:d}, per leaf node = {1:d} ... '
+            'fit time = {2:.2f} s ... validation AUC = {3:.3f}'
+        ).format(
+            min_per_split_values[i], min_per_leaf_values[j], this_fit_time_sec,
+            this_evaluation_dict[AUC_KEY]
+        ))
+
+    return grid_search_dict
+
+
+def create_cv_folds(
+        metadata_table, predictor_table, target_table,
+        num_folds=DEFAULT_NUM_CV_FOLDS, binarization_threshold=None,
+        num_buffer_days=0, date_column_name=CV_DATE_COLUMN_NAME):
+    """Creates folds for time-blocked cross-validation.
+
+    Dates are split into `num_folds` contiguous blocks, and each block is the
+    validation set for one fold.  Storms on the same day (or neighbouring days)
+    are not independent, so random splitting would give overly optimistic
+    scores.  For each fold, predictors are normalized with means and standard
+    deviations from the training data only.
+
+    The folds can be cached with `write_cv_folds`, so that model selection does
+    not need to reread and renormalize the feature files.
+
+    :param metadata_table: See doc for `read_feature_file`.
+    :param predictor_table: Same.
+    :param target_table: Same.
+    :param num_folds: Number of folds.
+    :param binarization_threshold: Binarization threshold for target variable
+        (see doc for `binarize_target_values`).  If None, targets will not be
+        binarized, so the folds can be used only for regression.
+    :param num_buffer_days: Number of days on either side of the validation
+        block to exclude from training data.  This reduces leakage between
+        training and validation data, caused by weather systems that last for
+        more than one day.
+    :param date_column_name: Name of date column in `metadata_table` (one of
+        `METADATA_COLUMNS`).
+    :return: fold_dicts: 1-D list of dictionaries, each with the following
+        keys.
+    fold_dict['training_dataset_dict']: Dictionary created by `create_dataset`,
+        with normalized training data.
+    fold_dict['validation_dataset_dict']: Same but for validation data.
+    fold_dict['normalization_dict']: Dictionary created by
+        `normalize_predictors`, for training data.
+    fold_dict['validation_date_strings']: 1-D list of validation dates (format
+        "yyyymmdd").
+    :raises: ValueError: if there are fewer unique dates than folds.
+    :raises: ValueError: if any fold has no training examples (usually because
+        `num_buffer_days` is too large).
+    """
+
+    example_dates = pandas.to_datetime(
+        metadata_table[date_column_name].astype(str)
+    ).values.astype('datetime64[D]')
+
+    unique_dates = numpy.unique(example_dates)
+    if len(unique_dates) < num_folds:
+        error_string = (
+            'Cannot create {0:d} folds from {1:d} unique dates.'
+        ).format(num_folds, len(unique_dates))
+
+        raise ValueError(error_string)
+
+    if binarization_threshold is not None:
+        target_table = target_table.assign(**{
+            BINARIZED_TARGET_NAME: binarize_target_values(
+                target_values=target_table[TARGET_NAME].values,
+                binarization_threshold=binarization_threshold)
+        })
+
+    buffer_timedelta = numpy.timedelta64(num_buffer_days, 'D')
+    fold_dicts = []
+
+    for these_dates in numpy.array_split(unique_dates, num_folds):
+        these_validation_indices = numpy.where(numpy.logical_and(
+            example_dates >= these_dates[0], example_dates <= these_dates[-1]
+        ))[0]
+
+        these_training_indices = numpy.where(numpy.logical_or(
+            example_dates < these_dates[0] - buffer_timedelta,
+            example_dates > these_dates[-1] + buffer_timedelta
+        ))[0]
+
+        these_date_strings = [
+            pandas.Timestamp(d).strftime(DATE_FORMAT) for d in these_dates
+        ]
+
+        if len(these_training_indices) == 0:
+            error_string = (
+                'Fold {0:d} (validation dates {1:s}...{2:s}) has no training '
+                'examples with {3:d} buffer days.'
+            ).format(
+                len(fold_dicts) + 1, these_date_strings[0],
+                these_date_strings[-1], num_buffer_days
+            )
+
+            raise ValueError(error_string)
+
+        this_training_table, this_normalization_dict = normalize_predictors(
+            predictor_table.iloc[these_training_indices]
+        )
+        this_validation_table = normalize_predictors(
+            predictor_table=predictor_table.iloc[these_validation_indices],
+            normalization_dict=this_normalization_dict
+        )[0]
+
+        fold_dicts.append({
+            TRAINING_DATASET_KEY: create_dataset(
+                predictor_table=this_training_table,
+                target_table=target_table.iloc[these_training_indices]),
+            VALIDATION_DATASET_KEY: create_dataset(
+                predictor_table=this_validation_table,
+                target_table=target_table.iloc[these_validation_indices]),
+            NORMALIZATION_DICT_KEY: this_normalization_dict,
+            VALIDATION_DATE_STRINGS_KEY: these_date_strings
+        })
+
+        print((
+            'Fold {0:d}: validation dates {1:s}...{2:s} ({3:d} examples), '
+            '{4:d} training examples'
+        ).format(
+            len(fold_dicts), these_date_strings[0], these_date_strings[-1],
+            len(these_validation_indices), len(these_training_indices)
+        ))
+
+    return fold_dicts
+
+
+def write_cv_folds(fold_dicts, pickle_file_name):
+    """Writes cross-validation folds to Pickle file.
+
+    :param fold_dicts: 1-D list of dictionaries created by `create_cv_folds`.
+    :param pickle_file_name: Path to output file.
+    """
+
+    print('Writing {0:d} folds to: "{1:s}"...'.format(
+        len(fold_dicts), pickle_file_name
+    ))
+    _create_directory(file_name=pickle_file_name)
+
+    pickle_file_handle = open(pickle_file_name, 'wb')
+    pickle.dump(
+        fold_dicts, pickle_file_handle, protocol=pickle.HIGHEST_PROTOCOL)
+    pickle_file_handle.close()
+
+
+def read_cv_folds(pickle_file_name):
+    """Reads cross-validation folds from Pickle file.
+
+    :param pickle_file_name: Path to input file (created by `write_cv_folds`).
+    :return: fold_dicts: 1-D list of dictionaries created by `create_cv_folds`.
+    """
+
+    pickle_file_handle = open(pickle_file_name, 'rb')
+    fold_dicts = pickle.load(pickle_file_handle)
+    pickle_file_handle.close()
+
+    return fold_dicts
+
+
+def _run_one_cv_fold(argument_tuple):
+    """Trains and validates one model in cross-validation.
+
+    This method must be called in a worker process initialized by
+    `_init_grid_worker`.
+
+    :param argument_tuple: Tuple with the following elements.
+    argument_tuple[0]: fold_index: Index of fold.
+    argument_tuple[1]: setup_function: See doc for `run_cross_validation`.
+    argument_tuple[2]: setup_kwargs: Same.
+    argument_tuple[3]: train_function: Same.
+    argument_tuple[4]: classification: Same.
+    :return: evaluation_dict: Dictionary created by `evaluate_regression` or
+        `eval_binary_classifn`, for validation data.
+    :return: fit_time_sec: Time taken to train model.
+    """
+
+    (fold_index, setup_function, setup_kwargs, train_function, classification
+    ) = argument_tuple
+
+    training_target_values = SHARED_GRID_ARRAY_DICT[
+        (TRAINING_TARGETS_KEY, fold_index)
+    ]
+    validation_predictor_matrix = SHARED_GRID_ARRAY_DICT[
+        (VALIDATION_PREDICTORS_KEY, fold_index)
+    ]
+    validation_target_values = SHARED_GRID_ARRAY_DICT[
+        (VALIDATION_TARGETS_KEY, fold_index)
+    ]
+
+    training_dataset_dict = {
+        PREDICTOR_MATRIX_KEY: SHARED_GRID_ARRAY_DICT[
+            (TRAINING_PREDICTORS_KEY, fold_index)
+        ],
+        TARGET_VALUES_KEY: None if classification else training_target_values,
+        BINARIZED_TARGET_VALUES_KEY:
+            training_target_values if classification else None
+    }
+
+    model_object = setup_function(**setup_kwargs)
+
+    start_time_sec = time.time()
+    model_object = train_function(
+        model_object=model_object, training_dataset_dict=training_dataset_dict)
+    fit_time_sec = time.time() - start_time_sec
+
+    if classification:
+        evaluation_dict = eval_binary_classifn(
+            observed_labels=validation_target_values,
+            forecast_probabilities=model_object.predict_proba(
+                validation_predictor_matrix
+            )[:, 1],
+            training_event_frequency=numpy.mean(training_target_values),
+            verbose=False, create_plots=False)
+    else:
+        evaluation_dict = evaluate_regression(
+            target_values=validation_target_values,
+            predicted_target_values=model_object.predict(
+                validation_predictor_matrix),
+            mean_training_target_value=numpy.mean(training_target_values),
+            verbose=False, create_plots=False)
+
+    return evaluation_dict, fit_time_sec
+
+
+def run_cross_validation(
+        fold_dicts, setup_function, train_function, setup_kwargs=None,
+        classification=False, num_processes=None):
+    """Runs cross-validation for one model configuration.
+
+    Folds are trained in parallel, one per worker process.  Data for all folds
+    are copied once to shared memory, which is read by all worker processes.
+
+    The setup and training functions must be defined at the top level of a
+    module (not lambdas), so that they can be sent to worker processes.  Models
+    that use several cores themselves (e.g., a random forest with
+    `num_cores = None`) should be set up to use one core, to avoid running more
+    threads than cores.
+
+    K = number of folds
+
+    :param fold_dicts: length-K list of dictionaries created by
+        `create_cv_folds` or `read_cv_folds`.
+    :param setup_function: Function that creates an untrained model (e.g.,
+        `setup_classification_tree`).
+    :param train_function: Function that trains the model (e.g.,
+        `train_classification_tree`).  Must accept the keyword arguments
+        `model_object` and `training_dataset_dict`.
+    :param setup_kwargs: Dictionary of keyword arguments for `setup_function`.
+    :param classification: Boolean flag.  If True, the model will be trained to
+        predict the binarized target and evaluated by `eval_binary_classifn`.
+        If False, the model will be trained to predict the real-valued target
+        and evaluated by `evaluate_regression`.
+    :param num_processes: Number of worker processes.  If None, will use all
+        cores.
+    :return: cv_dict: Dictionary with the following keys.
+    cv_dict['fold_evaluation_dicts']: length-K list of dictionaries created by
+        `evaluate_regression` or `eval_binary_classifn`, for validation data.
+    cv_dict['mean_evaluation_dict']: Dictionary with the same keys, where each
+        value is the mean over folds.
+    cv_dict['fit_times_sec']: length-K numpy array of training times.
+    :raises: ValueError: if `classification == True` and folds have no
+        binarized target values.
+    """
+
+    if setup_kwargs is None:
+        setup_kwargs = {}
+
+    if classification:
+        target_key = BINARIZED_TARGET_VALUES_KEY
+    else:
+        target_key = TARGET_VALUES_KEY
+
+    num_folds = len(fold_dicts)
+    shared_array_dict = {}
+
+    for k in range(num_folds):
+        this_training_dict = fold_dicts[k][TRAINING_DATASET_KEY]
+        this_validation_dict = fold_dicts[k][VALIDATION_DATASET_KEY]
+
+        if this_training_dict[target_key] is None:
+            error_string = (
+                'Folds have no binarized target values.  To use folds for '
+                'classification, pass `binarization_threshold` to '
+                '`create_cv_folds`.')
+
+            raise ValueError(error_string)
+
+        shared_array_dict.update({
+            (TRAINING_PREDICTORS_KEY, k): _array_to_shared_memory(
+                this_training_dict[PREDICTOR_MATRIX_KEY]),
+            (TRAINING_TARGETS_KEY, k): _array_to_shared_memory(
+                this_training_dict[target_key]),
+            (VALIDATION_PREDICTORS_KEY, k): _array_to_shared_memory(
+                this_validation_dict[PREDICTOR_MATRIX_KEY]),
+            (VALIDATION_TARGETS_KEY, k): _array_to_shared_memory(
+                this_validation_dict[target_key])
+        })
+
+    argument_tuples = [
+        (k, setup_function, setup_kwargs, train_function, classification)
+        for k in range(num_folds)
+    ]
+
+    print('Training "{0:s}" on {1:d} folds...'.format(
+        setup_function.__name__, num_folds
+    ))
+
+    pool_object = multiprocessing.Pool(
+        processes=num_processes, initializer=_init_grid_worker,
+        initargs=(shared_array_dict,)
+    )
+
+    try:
+        list_of_results = pool_object.map(_run_one_cv_fold, argument_tuples)
+    finally:
+        pool_object.close()
+        pool_object.join()
+
+    fold_evaluation_dicts = [r[0] for r in list_of_results]
+    fit_times_sec = numpy.array([r[1] for r in list_of_results])
+
+    if classification:
+        score_key = AUC_KEY
+    else:
+        score_key = MAE_SKILL_SCORE_KEY
+
+    for k in range(num_folds):
+        print((
+            'Fold {0:d} ... fit time = {1:.2f} s ... validation {2:s} = {3:.3f}'
+        ).format(
+            k + 1, fit_times_sec[k], score_key,
+            fold_evaluation_dicts[k][score_key]
+        ))
+
+    mean_evaluation_dict = {}
+    for this_key in fold_evaluation_dicts[0]:
+        mean_evaluation_dict[this_key] = numpy.mean(
+            [d[this_key] for d in fold_evaluation_dicts]
+        )
+
+    return {
+        FOLD_EVALUATION_DICTS_KEY: fold_evaluation_dicts,
+        MEAN_EVALUATION_DICT_KEY: mean_evaluation_dict,
+        FIT_TIMES_KEY: fit_times_sec
+    }
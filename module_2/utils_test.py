@@ -0,0 +1,562 @@
+"""Unit tests for utils.py."""
+
+import shutil
+import tempfile
+import unittest
+import numpy
+import pandas
+from module_2 import utils
+
+TOLERANCE = 1e-6
+
+# The following constants are used to test run_l1l2_path and
+# run_tree_grid_search.
+RANDOM_STATE_OBJECT = numpy.random.RandomState(6695)
+NUM_TRAINING_EXAMPLES = 1000
+NUM_VALIDATION_EXAMPLES = 300
+NUM_PREDICTORS = 5
+
+
+def _create_classification_dataset(num_examples):
+    """Creates random dataset for binary classification.
+
+    :param num_examples: Number of examples.
+    :return: dataset_dict: See doc for `utils.create_dataset`.
+    """
+
+    predictor_matrix = RANDOM_STATE_OBJECT.normal(
+        size=(num_examples, NUM_PREDICTORS)
+    )
+
+    target_values = (
+        predictor_matrix[:, 0] - predictor_matrix[:, 1] +
+        RANDOM_STATE_OBJECT.normal(size=num_examples)
+    )
+
+    return {
+        utils.PREDICTOR_MATRIX_KEY: predictor_matrix,
+        utils.TARGET_VALUES_KEY: target_values,
+        utils.BINARIZED_TARGET_VALUES_KEY: (target_values > 1.).astype(int)
+    }
+
+
+TRAINING_DATASET_DICT = _create_classification_dataset(NUM_TRAINING_EXAMPLES)
+VALIDATION_DATASET_DICT = _create_classification_dataset(
+    NUM_VALIDATION_EXAMPLES)
+
+# Warm-started fits stop at a slightly different point than cold-started fits,
+# within the convergence tolerance of coordinate descent.
+LAMBDA1_VALUES = numpy.array([0., 1e-3, 1e-2])
+LAMBDA2_VALUES = numpy.array([1., 0., 1e-2])
+PATH_TOLERANCE = 1e-4
+
+MIN_PER_SPLIT_VALUES = numpy.array([10, 50], dtype=int)
+MIN_PER_LEAF_VALUES = numpy.array([5, 20, 50], dtype=int)
+
+# The following constants are used to test train_linear_regression_streaming.
+FEATURE_DATE_STRINGS = ['20100101', '20100102', '20100103']
+NUM_EXAMPLES_PER_FILE = 200
+PREDICTOR_NAMES = ['predictor{0:d}'.format(m) for m in range(NUM_PREDICTORS)]
+
+
+def _write_feature_files(output_dir_name):
+    """Writes random feature files, one per date in `FEATURE_DATE_STRINGS`.
+
+    :param output_dir_name: Name of output directory.
+    :return: csv_file_names: 1-D list of paths to feature files.
+    """
+
+    csv_file_names = []
+
+    for this_date_string in FEATURE_DATE_STRINGS:
+        this_predictor_matrix = RANDOM_STATE_OBJECT.normal(
+            size=(NUM_EXAMPLES_PER_FILE, NUM_PREDICTORS)
+        )
+
+        this_table = pandas.DataFrame(
+            this_predictor_matrix, columns=PREDICTOR_NAMES)
+
+        for this_column in utils.EXTRANEOUS_COLUMNS + utils.METADATA_COLUMNS:
+            this_table[this_column] = 0
+
+        this_table[utils.TARGET_NAME] = (
+            this_predictor_matrix[:, 0] - 2 * this_predictor_matrix[:, 1] +
+            RANDOM_STATE_OBJECT.normal(size=NUM_EXAMPLES_PER_FILE)
+        )
+
+        csv_file_names.append('{0:s}/features_{1:s}.csv'.format(
+            output_dir_name, this_date_string
+        ))
+        this_table.to_csv(csv_file_names[-1], index=False)
+
+    return csv_file_names
+
+
+# The following constants are used to test create_cv_folds.
+NUM_CV_DATES = 10
+NUM_EXAMPLES_PER_CV_DATE = 3
+NUM_CV_FOLDS = 5
+CV_DATE_STRINGS = ['201001{0:02d}'.format(k + 1) for k in range(NUM_CV_DATES)]
+
+CV_METADATA_TABLE = pandas.DataFrame({
+    utils.CV_DATE_COLUMN_NAME: numpy.repeat(
+        ['{0:s}-{1:s}-{2:s} 00:00:00'.format(d[:4], d[4:6], d[6:])
+         for d in CV_DATE_STRINGS],
+        NUM_EXAMPLES_PER_CV_DATE
+    )
+})
+
+CV_PREDICTOR_TABLE = pandas.DataFrame(
+    RANDOM_STATE_OBJECT.normal(
+        size=(NUM_CV_DATES * NUM_EXAMPLES_PER_CV_DATE, NUM_PREDICTORS)
+    ),
+    columns=PREDICTOR_NAMES
+)
+
+CV_TARGET_TABLE = pandas.DataFrame({
+    utils.TARGET_NAME: RANDOM_STATE_OBJECT.normal(
+        size=NUM_CV_DATES * NUM_EXAMPLES_PER_CV_DATE)
+})
+
+
+class UtilsTests(unittest.TestCase):
+    """Each method is a unit test for utils.py."""
+
+    def test_run_l1l2_path(self):
+        """Ensures correct output from run_l1l2_path.
+
+        Each model and score must be the same as for a model trained from
+        scratch with the same hyperparameters.  Lambda2 values are unsorted, to
+        make sure that results are put back in the input order.
+        """
+
+        this_path_dict = utils.run_l1l2_path(
+            training_dataset_dict=TRAINING_DATASET_DICT,
+            validation_dataset_dict=VALIDATION_DATASET_DICT,
+            lambda1_values=LAMBDA1_VALUES, lambda2_values=LAMBDA2_VALUES)
+
+        for i in range(len(LAMBDA1_VALUES)):
+            for j in range(len(LAMBDA2_VALUES)):
+                this_model_object = utils.train_linear_regression(
+                    model_object=utils.setup_linear_regression(
+                        lambda1=LAMBDA1_VALUES[i], lambda2=LAMBDA2_VALUES[j]),
+                    training_dataset_dict=TRAINING_DATASET_DICT)
+
+                this_path_model_object = this_path_dict[
+                    utils.MODEL_OBJECTS_KEY][i][j]
+
+                self.assertTrue(
+                    type(this_path_model_object) is type(this_model_object)
+                )
+                self.assertTrue(numpy.allclose(
+                    this_path_model_object.coef_, this_model_object.coef_,
+                    atol=PATH_TOLERANCE
+                ))
+
+                this_evaluation_dict = utils.evaluate_regression(
+                    target_values=VALIDATION_DATASET_DICT[
+                        utils.TARGET_VALUES_KEY],
+                    predicted_target_values=this_model_object.predict(
+                        VALIDATION_DATASET_DICT[utils.PREDICTOR_MATRIX_KEY]),
+                    mean_training_target_value=numpy.mean(
+                        TRAINING_DATASET_DICT[utils.TARGET_VALUES_KEY]),
+                    verbose=False, create_plots=False)
+
+                for this_key in this_evaluation_dict:
+                    self.assertTrue(numpy.isclose(
+                        this_path_dict[this_key][i, j],
+                        this_evaluation_dict[this_key], atol=PATH_TOLERANCE
+                    ))
+
+    def test_run_tree_grid_search(self):
+        """Ensures correct output from run_tree_grid_search.
+
+        Each score must be the same as for a tree trained directly with the
+        same hyperparameters.
+        """
+
+        this_grid_search_dict = utils.run_tree_grid_search(
+            training_dataset_dict=TRAINING_DATASET_DICT,
+            validation_dataset_dict=VALIDATION_DATASET_DICT,
+            min_per_split_values=MIN_PER_SPLIT_VALUES,
+            min_per_leaf_values=MIN_PER_LEAF_VALUES, num_processes=1)
+
+        for i in range(len(MIN_PER_SPLIT_VALUES)):
+            for j in range(len(MIN_PER_LEAF_VALUES)):
+                this_auc = this_grid_search_dict[utils.AUC_KEY][i, j]
+
+                if MIN_PER_LEAF_VALUES[j] >= MIN_PER_SPLIT_VALUES[i]:
+                    self.assertTrue(numpy.isnan(this_auc))
+                    continue
+
+                this_model_object = utils.train_classification_tree(
+                    model_object=utils.setup_classification_tree(
+                        min_examples_at_split=MIN_PER_SPLIT_VALUES[i],
+                        min_examples_at_leaf=MIN_PER_LEAF_VALUES[j]),
+                    training_dataset_dict=TRAINING_DATASET_DICT)
+
+                this_evaluation_dict = utils.eval_binary_classifn(
+                    observed_labels=VALIDATION_DATASET_DICT[
+                        utils.BINARIZED_TARGET_VALUES_KEY],
+                    forecast_probabilities=this_model_object.predict_proba(
+                        VALIDATION_DATASET_DICT[utils.PREDICTOR_MATRIX_KEY]
+                    )[:, 1],
+                    training_event_frequency=numpy.mean(
+                        TRAINING_DATASET_DICT[
+                            utils.BINARIZED_TARGET_VALUES_KEY]
+                    ),
+                    verbose=False, create_plots=False)
+
+                for this_key in this_evaluation_dict:
+                    self.assertTrue(numpy.isclose(
+                        this_grid_search_dict[this_key][i, j],
+                        this_evaluation_dict[this_key], atol=TOLERANCE
+                    ))
+
+    def test_setup_classification_gbt_histogram(self):
+        """Ensures correct output from setup_classification_gbt.
+
+        In this case, the backend is "histogram", so the max number of
+        predictors per split must be converted to a fraction, which
+        scikit-learn converts back to a number by rounding up.
+        """
+
+        for this_max_predictors in range(1, NUM_PREDICTORS + 1):
+            this_model_object = utils.setup_classification_gbt(
+                max_predictors_per_split=this_max_predictors,
+                backend_string=utils.HISTOGRAM_GBT_BACKEND_STRING,
+                num_predictors=NUM_PREDICTORS)
+
+            # Older versions of scikit-learn cannot subsample predictors.
+            if 'max_features' not in this_model_object.get_params():
+                return
+
+            this_fraction = this_model_object.get_params()['max_features']
+            self.assertTrue(
+                int(numpy.ceil(this_fraction * NUM_PREDICTORS)) ==
+                this_max_predictors
+            )
+
+        with self.assertRaises(ValueError):
+            utils.setup_classification_gbt(
+                max_predictors_per_split=1,
+                backend_string=utils.HISTOGRAM_GBT_BACKEND_STRING)
+
+    def _check_write_and_read_model(self, compress):
+        """Writes random forest to Pickle file and reads it back.
+
+        :param compress: See doc for `utils.write_model`.
+        """
+
+        model_object = utils.train_classification_forest(
+            model_object=utils.setup_classification_forest(
+                max_predictors_per_split=2, num_trees=10, num_cores=1),
+            training_dataset_dict=TRAINING_DATASET_DICT)
+        model_object.set_params(verbose=0)
+
+        output_dir_name = tempfile.mkdtemp()
+        pickle_file_name = '{0:s}/model.p'.format(output_dir_name)
+
+        try:
+            utils.write_model(
+                model_object=model_object, pickle_file_name=pickle_file_name,
+                compress=compress)
+
+            with open(pickle_file_name, 'rb') as this_file:
+                self.assertTrue(
+                    (this_file.read(2) == utils.GZIP_MAGIC_BYTES) == compress
+                )
+
+            new_model_object = utils.read_model(pickle_file_name)
+        finally:
+            shutil.rmtree(output_dir_name)
+
+        these_predictors = VALIDATION_DATASET_DICT[utils.PREDICTOR_MATRIX_KEY]
+        self.assertTrue(numpy.array_equal(
+            new_model_object.predict_proba(these_predictors),
+            model_object.predict_proba(these_predictors)
+        ))
+
+    def test_write_and_read_model_compressed(self):
+        """Ensures that read_model inverts write_model.
+
+        In this case, the Pickle file is compressed.
+        """
+
+        self._check_write_and_read_model(compress=True)
+
+    def test_write_and_read_model_uncompressed(self):
+        """Ensures that read_model inverts write_model.
+
+        In this case, the Pickle file is not compressed.
+        """
+
+        self._check_write_and_read_model(compress=False)
+
+    def _compare_streaming_and_direct(self, lambda2):
+        """Compares streaming and in-memory linear regression.
+
+        :param lambda2: L2-regularization weight.
+        """
+
+        output_dir_name = tempfile.mkdtemp()
+
+        try:
+            csv_file_names = _write_feature_files(output_dir_name)
+            _, predictor_table, target_table = utils.read_many_feature_files(
+                csv_file_names)
+
+            predictor_table, normalization_dict = utils.normalize_predictors(
+                predictor_table)
+
+            direct_model_object = utils.train_linear_regression(
+                model_object=utils.setup_linear_regression(
+                    lambda1=0., lambda2=lambda2),
+                training_dataset_dict=utils.create_dataset(
+                    predictor_table=predictor_table, target_table=target_table)
+            )
+
+            streaming_model_object = utils.train_linear_regression_streaming(
+                model_object=utils.setup_linear_regression(
+                    lambda1=0., lambda2=lambda2),
+                training_file_names=csv_file_names,
+                normalization_dict=normalization_dict)
+        finally:
+            shutil.rmtree(output_dir_name)
+
+        self.assertTrue(numpy.allclose(
+            streaming_model_object.coef_, direct_model_object.coef_,
+            atol=TOLERANCE
+        ))
+        self.assertTrue(numpy.isclose(
+            streaming_model_object.intercept_, direct_model_object.intercept_,
+            atol=TOLERANCE
+        ))
+
+    def test_train_linear_regression_streaming_plain(self):
+        """Ensures correct output from train_linear_regression_streaming.
+
+        In this case, the model is un-regularized.
+        """
+
+        self._compare_streaming_and_direct(lambda2=0.)
+
+    def test_train_linear_regression_streaming_ridge(self):
+        """Ensures correct output from train_linear_regression_streaming.
+
+        In this case, the model has L2 regularization only.
+        """
+
+        self._compare_streaming_and_direct(lambda2=10.)
+
+    def test_train_linear_regression_streaming_no_files(self):
+        """Ensures correct output from train_linear_regression_streaming.
+
+        In this case, there are no training files, so the method should raise
+        an error.
+        """
+
+        with self.assertRaises(ValueError):
+            utils.train_linear_regression_streaming(
+                model_object=utils.setup_linear_regression(
+                    lambda1=0., lambda2=0.),
+                training_file_names=[],
+                normalization_dict={})
+
+    def _check_cv_folds(self, num_buffer_days):
+        """Checks output from create_cv_folds.
+
+        :param num_buffer_days: See doc for `utils.create_cv_folds`.
+        """
+
+        these_fold_dicts = utils.create_cv_folds(
+            metadata_table=CV_METADATA_TABLE,
+            predictor_table=CV_PREDICTOR_TABLE, target_table=CV_TARGET_TABLE,
+            num_folds=NUM_CV_FOLDS, binarization_threshold=0.,
+            num_buffer_days=num_buffer_days)
+
+        self.assertTrue(len(these_fold_dicts) == NUM_CV_FOLDS)
+        num_dates_per_fold = NUM_CV_DATES // NUM_CV_FOLDS
+
+        for k in range(NUM_CV_FOLDS):
+            first_index = k * num_dates_per_fold
+            last_index = first_index + num_dates_per_fold - 1
+
+            self.assertTrue(
+                these_fold_dicts[k][utils.VALIDATION_DATE_STRINGS_KEY] ==
+                CV_DATE_STRINGS[first_index:(last_index + 1)]
+            )
+
+            # Training data exclude the validation block and buffer days.
+            num_training_dates = NUM_CV_DATES - num_dates_per_fold - (
+                min([num_buffer_days, first_index]) +
+                min([num_buffer_days, NUM_CV_DATES - 1 - last_index])
+            )
+
+            this_training_dict = these_fold_dicts[k][
+                utils.TRAINING_DATASET_KEY]
+            this_validation_dict = these_fold_dicts[k][
+                utils.VALIDATION_DATASET_KEY]
+
+            self.assertTrue(
+                len(this_training_dict[utils.TARGET_VALUES_KEY]) ==
+                num_training_dates * NUM_EXAMPLES_PER_CV_DATE
+            )
+            self.assertTrue(
+                len(this_validation_dict[utils.TARGET_VALUES_KEY]) ==
+                num_dates_per_fold * NUM_EXAMPLES_PER_CV_DATE
+            )
+
+            # Normalization params come from training data only.
+            self.assertTrue(numpy.allclose(
+                numpy.mean(
+                    this_training_dict[utils.PREDICTOR_MATRIX_KEY], axis=0
+                ),
+                0., atol=TOLERANCE
+            ))
+
+    def test_create_cv_folds_no_buffer(self):
+        """Ensures correct output from create_cv_folds.
+
+        In this case, there are no buffer days.
+        """
+
+        self._check_cv_folds(num_buffer_days=0)
+
+    def test_create_cv_folds_buffer(self):
+        """Ensures correct output from create_cv_folds.
+
+        In this case, there is one buffer day on either side of each validation
+        block.
+        """
+
+        self._check_cv_folds(num_buffer_days=1)
+
+    def test_create_cv_folds_no_training_data(self):
+        """Ensures correct output from create_cv_folds.
+
+        In this case, the buffer covers all dates outside the first validation
+        block, so the method should raise an error.
+        """
+
+        with self.assertRaises(ValueError):
+            utils.create_cv_folds(
+                metadata_table=CV_METADATA_TABLE,
+                predictor_table=CV_PREDICTOR_TABLE,
+                target_table=CV_TARGET_TABLE, num_folds=2,
+                num_buffer_days=NUM_CV_DATES)
+
+    def _check_cross_validation(self, classification):
+        """Compares run_cross_validation with serial training on each fold.
+
+        :param classification: See doc for `utils.run_cross_validation`.
+        """
+
+        these_fold_dicts = utils.create_cv_folds(
+            metadata_table=CV_METADATA_TABLE,
+            predictor_table=CV_PREDICTOR_TABLE, target_table=CV_TARGET_TABLE,
+            num_folds=NUM_CV_FOLDS, binarization_threshold=0.)
+
+        if classification:
+            this_setup_function = utils.setup_classification_tree
+            this_train_function = utils.train_classification_tree
+            these_setup_kwargs = {
+                'min_examples_at_split': 4, 'min_examples_at_leaf': 2
+            }
+        else:
+            this_setup_function = utils.setup_linear_regression
+            this_train_function = utils.train_linear_regression
+            these_setup_kwargs = {'lambda1': 0., 'lambda2': 1.}
+
+        this_cv_dict = utils.run_cross_validation(
+            fold_dicts=these_fold_dicts, setup_function=this_setup_function,
+            train_function=this_train_function,
+            setup_kwargs=these_setup_kwargs, classification=classification,
+            num_processes=1)
+
+        for k in range(NUM_CV_FOLDS):
+            this_training_dict = these_fold_dicts[k][
+                utils.TRAINING_DATASET_KEY]
+            this_validation_dict = these_fold_dicts[k][
+                utils.VALIDATION_DATASET_KEY]
+
+            this_model_object = this_train_function(
+                model_object=this_setup_function(**these_setup_kwargs),
+                training_dataset_dict=this_training_dict)
+
+            these_predictors = this_validation_dict[utils.PREDICTOR_MATRIX_KEY]
+
+            if classification:
+                this_evaluation_dict = utils.eval_binary_classifn(
+                    observed_labels=this_validation_dict[
+                        utils.BINARIZED_TARGET_VALUES_KEY],
+                    forecast_probabilities=this_model_object.predict_proba(
+                        these_predictors
+                    )[:, 1],
+                    training_event_frequency=numpy.mean(
+                        this_training_dict[utils.BINARIZED_TARGET_VALUES_KEY]
+                    ),
+                    verbose=False, create_plots=False)
+            else:
+                this_evaluation_dict = utils.evaluate_regression(
+                    target_values=this_validation_dict[
+                        utils.TARGET_VALUES_KEY],
+                    predicted_target_values=this_model_object.predict(
+                        these_predictors),
+                    mean_training_target_value=numpy.mean(
+                        this_training_dict[utils.TARGET_VALUES_KEY]
+                    ),
+                    verbose=False, create_plots=False)
+
+            this_fold_evaluation_dict = this_cv_dict[
+                utils.FOLD_EVALUATION_DICTS_KEY][k]
+            self.assertTrue(
+                set(this_fold_evaluation_dict.keys()) ==
+                set(this_evaluation_dict.keys())
+            )
+
+            for this_key in this_evaluation_dict:
+                self.assertTrue(numpy.isclose(
+                    this_fold_evaluation_dict[this_key],
+                    this_evaluation_dict[this_key], atol=TOLERANCE,
+                    equal_nan=True
+                ))
+
+    def test_run_cross_validation_regression(self):
+        """Ensures correct output from run_cross_validation.
+
+        In this case, the model is linear regression.
+        """
+
+        self._check_cross_validation(classification=False)
+
+    def test_run_cross_validation_classification(self):
+        """Ensures correct output from run_cross_validation.
+
+        In this case, the model is a decision tree for classification.
+        """
+
+        self._check_cross_validation(classification=True)
+
+    def test_run_cross_validation_no_binarization(self):
+        """Ensures correct output from run_cross_validation.
+
+        In this case, folds were created without binarized targets, so the
+        method should raise an error for classification.
+        """
+
+        these_fold_dicts = utils.create_cv_folds(
+            metadata_table=CV_METADATA_TABLE,
+            predictor_table=CV_PREDICTOR_TABLE, target_table=CV_TARGET_TABLE,
+            num_folds=NUM_CV_FOLDS)
+
+        with self.assertRaises(ValueError):
+            utils.run_cross_validation(
+                fold_dicts=these_fold_dicts,
+                setup_function=utils.setup_classification_tree,
+                train_function=utils.train_classification_tree,
+                classification=True, num_processes=1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -9,16 +9,17 @@ import time
 import calendar
 import json
 import pickle
+import heapq
+import weakref
 import netCDF4
 import numpy
 import keras
 from keras import backend as K
 import tensorflow
-from scipy.interpolate import (
-    UnivariateSpline, RectBivariateSpline, RegularGridInterpolator)
 import matplotlib.colors
 import matplotlib.pyplot as pyplot
 import sklearn.metrics
+import sklearn.neighbors
 from module_4 import keras_metrics
 from module_4 import roc_curves
 from module_4 import performance_diagrams
@@ -91,14 +92,60 @@ HIGHEST_COSTS_KEY = 'highest_cost_by_step'
 ORIGINAL_COST_KEY = 'original_cost'
 STEP1_PREDICTORS_KEY = 'predictor_names_step1'
 STEP1_COSTS_KEY = 'costs_step1'
+HIGHEST_COST_STDEVS_KEY = 'highest_cost_stdev_by_step'
+STEP1_COST_STDEVS_KEY = 'cost_stdevs_step1'
+PERMUTATION_INDICES_KEY = 'permutation_indices_by_step'
+RANDOM_STATE_KEY = 'random_state'
+NUM_REPEATS_KEY = 'num_repeats'
+STOPPING_COST_KEY = 'stopping_cost'
+IS_FINISHED_KEY = 'is_finished'
+GROUP_NAMES_KEY = 'predictor_group_names'
+BLOCK_IMPORTANCE_KEY = 'block_importance_matrix'
 
 EOF_MATRIX_KEY = 'eof_matrix'
 FEATURE_MEANS_KEY = 'feature_means'
 FEATURE_STDEVS_KEY = 'feature_standard_deviations'
+SINGULAR_VALUES_KEY = 'singular_values'
+ALL_EOFS_KEY = 'all_eof_matrix'
+TOTAL_VARIANCE_KEY = 'total_variance'
+
+EXACT_SVD_STRING = 'exact'
+COVARIANCE_SVD_STRING = 'covariance'
+RANDOMIZED_SVD_STRING = 'randomized'
+VALID_SVD_METHOD_STRINGS = [
+    EXACT_SVD_STRING, COVARIANCE_SVD_STRING, RANDOMIZED_SVD_STRING
+]
+
+# With B baseline examples and Z features, the covariance method is used if
+# B >= MIN_EXAMPLE_TO_FEATURE_RATIO_FOR_COV_SVD * Z.  Otherwise, the randomized
+# method is used if min(B, Z) >= MIN_DIMENSION_FOR_RANDOMIZED_SVD.
+MIN_EXAMPLE_TO_FEATURE_RATIO_FOR_COV_SVD = 4
+MIN_DIMENSION_FOR_RANDOMIZED_SVD = 2000
+INIT_NUM_MODES_FOR_RANDOMIZED_SVD = 100
+NUM_OVERSAMPLES_FOR_RANDOMIZED_SVD = 10
+NUM_POWER_ITERS_FOR_RANDOMIZED_SVD = 2
+RANDOM_SEED_FOR_RANDOMIZED_SVD = 6695
 
 NOVEL_IMAGES_ACTUAL_KEY = 'novel_image_matrix_actual'
 NOVEL_IMAGES_UPCONV_KEY = 'novel_image_matrix_upconv'
 NOVEL_IMAGES_UPCONV_SVD_KEY = 'novel_image_matrix_upconv_svd'
+NOVEL_INDICES_KEY = 'novel_test_indices'
+NOVELTY_SCORES_KEY = 'novelty_score_by_test_example'
+
+NOVEL_FILE_NAMES_KEY = 'novel_file_names'
+
+DEFAULT_NUM_NOVELTY_NEIGHBOURS = 10
+DEFAULT_NUM_CANDIDATES_PER_NOVEL_IMAGE = 5
+
+# Running sums of CNN features, used for streaming novelty detection.  Sums are
+# of deviations from a reference vector, to avoid catastrophic cancellation.
+REFERENCE_FEATURES_KEY = 'reference_feature_vector'
+NUM_BASELINE_EXAMPLES_KEY = 'num_baseline_examples'
+BASELINE_SUM_KEY = 'baseline_sum_vector'
+BASELINE_CROSS_PRODUCTS_KEY = 'baseline_cross_product_matrix'
+NUM_TEST_EXAMPLES_KEY = 'num_test_examples'
+TEST_SUM_KEY = 'test_sum_vector'
+TEST_SQUARED_SUM_KEY = 'test_squared_sum_vector'
 
 # Plotting constants.
 FIGURE_WIDTH_INCHES = 10
@@ -191,9 +238,36 @@ METRIC_FUNCTION_DICT = {
     'binary_focn': keras_metrics.binary_focn
 }
 
+DEFAULT_NUM_PERMUTATION_REPEATS = 1
+DEFAULT_NUM_EXAMPLES_PER_PERMUTATION_BATCH = 1000
+
+DEFAULT_NUM_EXAMPLES_PER_SALIENCY_BATCH = 100
+DEFAULT_NUM_EXAMPLES_PER_GRADCAM_BATCH = 100
+
 DEFAULT_NUM_BWO_ITERATIONS = 200
 DEFAULT_BWO_LEARNING_RATE = 0.01
 
+GRADIENT_DESCENT_STRING = 'gradient_descent'
+MOMENTUM_STRING = 'momentum'
+ADAM_STRING = 'adam'
+VALID_BWO_OPTIMIZER_STRINGS = [
+    GRADIENT_DESCENT_STRING, MOMENTUM_STRING, ADAM_STRING
+]
+
+BWO_MOMENTUM_COEFF = 0.9
+ADAM_FIRST_MOMENT_DECAY = 0.9
+ADAM_SECOND_MOMENT_DECAY = 0.999
+ADAM_EPSILON = 1e-8
+
+# Physically plausible range for each predictor, in original (denormalized)
+# units.  Can be passed to `bwo_for_class` as `physical_limits_dict`.
+DEFAULT_PHYSICAL_LIMITS_DICT = {
+    REFLECTIVITY_NAME: numpy.array([0., 75.]),
+    TEMPERATURE_NAME: numpy.array([220., 325.]),
+    U_WIND_NAME: numpy.array([-60., 60.]),
+    V_WIND_NAME: numpy.array([-60., 60.])
+}
+
 # Misc constants.
 SEPARATOR_STRING = '\n\n' + '*' * 50 + '\n\n'
 MINOR_SEPARATOR_STRING = '\n\n' + '-' * 50 + '\n\n'
@@ -207,6 +281,20 @@ MIN_PROBABILITY = 1e-15
 MAX_PROBABILITY = 1. - MIN_PROBABILITY
 METRES_PER_SECOND_TO_KT = 3.6 / 1.852
 
+# Compiled Keras functions for interpretation methods, reused across calls.
+# Keyed by model object, so entries are dropped when the model is
+# garbage-collected.  Each value is a dictionary created by
+# `_get_compiled_function_dict`.
+COMPILED_FUNCTION_CACHE = weakref.WeakKeyDictionary()
+
+SALIENCY_FUNCTION_TYPE_STRING = 'saliency'
+GRADCAM_FUNCTION_TYPE_STRING = 'gradcam'
+BWO_FUNCTION_TYPE_STRING = 'bwo'
+
+# Interpolation weights for upsampling CAMs, keyed by (original spatial
+# dimensions, new spatial dimensions).
+UPSAMPLING_WEIGHT_CACHE = {}
+
 
 def time_string_to_unix(time_string, time_format):
     """Converts time from string to Unix format.
@@ -1635,13 +1723,505 @@ def _negative_auc_function(target_values, class_probabilities):
     )
 
 
+def _apply_cnn_to_permuted_data(
+        cnn_model_object, predictor_matrix, channel_indices_by_candidate,
+        permutation_index_matrix, grid_slices_by_candidate=None,
+        num_examples_per_batch=DEFAULT_NUM_EXAMPLES_PER_PERMUTATION_BATCH,
+        verbose=True):
+    """Applies CNN to many permuted versions of the same data.
+
+    Each "candidate" is one version of the data, with one or more channels
+    (optionally only within a spatial block) permuted over the example axis.
+    Rather than copying the full predictor matrix for each candidate, this
+    method swaps the permuted channels into one working buffer, applies the
+    CNN, and then swaps the original values back.
+
+    If E < `num_examples_per_batch`, the working buffer holds G copies of the
+    data, where G = floor(`num_examples_per_batch` / E), so that G candidates
+    share each forward pass.  Otherwise, the working buffer is
+    `predictor_matrix` itself.
+
+    K = number of candidates
+    E = number of examples (storm objects)
+    M = number of rows in each storm-centered grid
+    N = number of columns in each storm-centered grid
+    C = number of channels (predictor variables)
+
+    :param cnn_model_object: Trained instance of `keras.models.Model`.
+    :param predictor_matrix: E-by-M-by-N-by-C numpy array of predictor values.
+        Values may be swapped in place, but the array is restored before this
+        method returns (even if an error occurs).
+    :param channel_indices_by_candidate: length-K list, where the [k]th element
+        is a 1-D numpy array with indices of channels permuted for the [k]th
+        candidate.
+    :param permutation_index_matrix: K-by-E numpy array of example indices.
+        For the [k]th candidate, values in the [i]th example are taken from the
+        [j]th example, where j = permutation_index_matrix[k, i].
+    :param grid_slices_by_candidate: length-K list, where the [k]th element is
+        a tuple (row slice, column slice) with the part of the grid permuted for
+        the [k]th candidate.  If None, the whole grid will be permuted for each
+        candidate.
+    :param num_examples_per_batch: Number of examples per forward pass,
+        counting each candidate separately.
+    :param verbose: Boolean flag.  If True, progress messages will be printed.
+    :return: forecast_probability_matrix: K-by-E numpy array of forecast
+        probabilities (of the positive class).
+    """
+
+    num_candidates = len(channel_indices_by_candidate)
+    num_examples = predictor_matrix.shape[0]
+    num_slots = max([
+        min([num_examples_per_batch // num_examples, num_candidates]), 1
+    ])
+
+    if grid_slices_by_candidate is None:
+        grid_slices_by_candidate = [
+            (slice(None), slice(None))
+        ] * num_candidates
+
+    if num_slots == 1:
+        working_matrix = predictor_matrix
+    else:
+        working_matrix = numpy.concatenate(
+            [predictor_matrix] * num_slots, axis=0)
+
+    forecast_probability_matrix = numpy.full(
+        (num_candidates, num_examples), numpy.nan)
+
+    for k in range(0, num_candidates, num_slots):
+        this_last_index = min([k + num_slots, num_candidates]) - 1
+        these_candidate_indices = numpy.linspace(
+            k, this_last_index, num=this_last_index - k + 1, dtype=int)
+
+        if verbose:
+            print((
+                'Applying model to permuted versions {0:d}-{1:d} of {2:d}...'
+            ).format(
+                these_candidate_indices[0] + 1,
+                these_candidate_indices[-1] + 1, num_candidates
+            ))
+
+        # Each element is (example slice, row slice, column slice, channel
+        # index, original values).
+        swapped_tuples = []
+
+        try:
+            for j in range(len(these_candidate_indices)):
+                this_candidate_index = these_candidate_indices[j]
+                this_example_slice = slice(
+                    j * num_examples, (j + 1) * num_examples)
+                this_row_slice, this_column_slice = grid_slices_by_candidate[
+                    this_candidate_index]
+                these_example_indices = permutation_index_matrix[
+                    this_candidate_index, :]
+
+                for m in channel_indices_by_candidate[this_candidate_index]:
+                    swapped_tuples.append((
+                        this_example_slice, this_row_slice, this_column_slice,
+                        m,
+                        working_matrix[
+                            this_example_slice, this_row_slice,
+                            this_column_slice, m
+                        ] + 0.
+                    ))
+
+                    working_matrix[
+                        this_example_slice, this_row_slice, this_column_slice,
+                        m
+                    ] = predictor_matrix[
+                        these_example_indices, this_row_slice,
+                        this_column_slice, m
+                    ]
+
+            these_probabilities = cnn_model_object.predict(
+                working_matrix[:(len(these_candidate_indices) * num_examples)],
+                batch_size=num_examples_per_batch
+            )[:, -1]
+        finally:
+            for this_tuple in swapped_tuples[::-1]:
+                working_matrix[this_tuple[:4]] = this_tuple[4]
+
+        forecast_probability_matrix[these_candidate_indices, :] = (
+            numpy.reshape(these_probabilities, (-1, num_examples))
+        )
+
+    return forecast_probability_matrix
+
+
+def _write_permutation_checkpoint(checkpoint_dict, pickle_file_name):
+    """Writes checkpoint for permutation test to Pickle file.
+
+    The checkpoint is first written to a temporary file, which then replaces
+    the old checkpoint.  Thus, if the process dies while writing, the old
+    checkpoint is still intact.
+
+    :param checkpoint_dict: Dictionary created by
+        `_run_multipass_permutation_test`.
+    :param pickle_file_name: Path to output file.
+    """
+
+    _create_directory(file_name=pickle_file_name)
+    temp_file_name = '{0:s}.tmp'.format(pickle_file_name)
+
+    file_handle = open(temp_file_name, 'wb')
+    pickle.dump(checkpoint_dict, file_handle)
+    file_handle.close()
+
+    os.replace(temp_file_name, pickle_file_name)
+
+
+def read_permutation_checkpoint(pickle_file_name):
+    """Reads checkpoint for permutation test from Pickle file.
+
+    :param pickle_file_name: Path to input file.
+    :return: checkpoint_dict: Dictionary with the following keys.
+    checkpoint_dict['permuted_predictor_name_by_step']: See doc for
+        `permutation_test_for_cnn`.
+    checkpoint_dict['highest_cost_by_step']: Same.
+    checkpoint_dict['highest_cost_stdev_by_step']: Same.
+    checkpoint_dict['original_cost']: Same.
+    checkpoint_dict['predictor_names_step1']: Same.
+    checkpoint_dict['costs_step1']: Same.
+    checkpoint_dict['cost_stdevs_step1']: Same.
+    checkpoint_dict['permutation_indices_by_step']: List, where the [s]th
+        element is a numpy array with the example indices used to permute
+        permuted_predictor_name_by_step[s].  These are needed to reconstruct the
+        permuted data upon resuming.
+    checkpoint_dict['random_state']: State of the random-number generator at
+        the end of the last step (from `numpy.random.RandomState.get_state`).
+    checkpoint_dict['num_repeats']: See doc for `permutation_test_for_cnn`.
+    checkpoint_dict['stopping_cost']: Same.
+    checkpoint_dict['is_finished']: Boolean flag, indicating whether or not the
+        test is finished.
+    """
+
+    file_handle = open(pickle_file_name, 'rb')
+    checkpoint_dict = pickle.load(file_handle)
+    file_handle.close()
+
+    return checkpoint_dict
+
+
+def _permute_candidate_in_place(
+        predictor_matrix, channel_indices, grid_slices, example_indices):
+    """Permutes one candidate (predictor or group of predictors) in place.
+
+    :param predictor_matrix: See doc for `_apply_cnn_to_permuted_data`.
+    :param channel_indices: 1-D numpy array with indices of channels to
+        permute.
+    :param grid_slices: Tuple (row slice, column slice) with part of grid to
+        permute.
+    :param example_indices: 1-D numpy array of example indices, defining the
+        permutation.  Values in the [i]th example will be taken from the [j]th
+        example, where j = example_indices[i].
+    """
+
+    this_row_slice, this_column_slice = grid_slices
+
+    for m in channel_indices:
+        predictor_matrix[:, this_row_slice, this_column_slice, m] = (
+            predictor_matrix[
+                example_indices, this_row_slice, this_column_slice, m]
+        )
+
+
+def _run_multipass_permutation_test(
+        cnn_model_object, predictor_matrix, target_values, candidate_names,
+        channel_indices_by_candidate, cost_function, num_repeats,
+        num_examples_per_batch, random_state, grid_slices_by_candidate=None,
+        stopping_cost=None, max_num_steps=None, checkpoint_file_name=None,
+        checkpoint_dict=None):
+    """Runs multi-pass (Lakshmanan) permutation test.
+
+    This method also returns results of the single-pass (Breiman) test, which
+    is the first step of the multi-pass test.
+
+    E = number of examples (storm objects)
+    P = number of candidates (predictors or groups of predictors that can be
+        permuted)
+
+    :param cnn_model_object: Trained instance of `keras.models.Model`.
+    :param predictor_matrix: numpy array of normalized predictor values (see
+        doc for `_apply_cnn_to_permuted_data`).  This array will be modified in
+        place, since it is used as the working buffer: after each step, the
+        chosen candidate is left permuted.
+    :param target_values: length-E numpy array of target values (integers in
+        0...1).
+    :param candidate_names: length-P list of candidate names.
+    :param channel_indices_by_candidate: length-P list, where the [j]th element
+        is a 1-D numpy array with indices of channels in the [j]th candidate.
+    :param cost_function: See doc for `permutation_test_for_cnn`.
+    :param num_repeats: Same.
+    :param num_examples_per_batch: Same.
+    :param random_state: Instance of `numpy.random.RandomState`, used to create
+        permutations.
+    :param grid_slices_by_candidate: length-P list, where the [j]th element is a
+        tuple (row slice, column slice) with the part of the grid permuted for
+        the [j]th candidate.  If None, each candidate covers the whole grid.
+    :param stopping_cost: See doc for `permutation_test_for_cnn`.
+    :param max_num_steps: Max number of steps (including those already done,
+        if resuming from a checkpoint).  If None, will run until all
+        candidates are permuted (or `stopping_cost` is reached).  Stopping at
+        this limit does not mark the test as finished, so it can still be
+        resumed.
+    :param checkpoint_file_name: See doc for `permutation_test_for_cnn`.
+    :param checkpoint_dict: Dictionary created by `read_permutation_checkpoint`.
+        If specified, will resume from this checkpoint.  If None, will start
+        from scratch.
+    :return: result_dict: See doc for `permutation_test_for_cnn`.
+    """
+
+    num_examples = predictor_matrix.shape[0]
+
+    if grid_slices_by_candidate is None:
+        grid_slices_by_candidate = [
+            (slice(None), slice(None))
+        ] * len(candidate_names)
+
+    if checkpoint_dict is None:
+        these_probabilities = apply_cnn(
+            cnn_model_object=cnn_model_object,
+            predictor_matrix=predictor_matrix)
+        print(MINOR_SEPARATOR_STRING)
+
+        original_cost = cost_function(target_values, these_probabilities)
+        print('Original cost (no permutation): {0:.4e}\n'.format(
+            original_cost))
+
+        checkpoint_dict = {
+            PERMUTED_PREDICTORS_KEY: [],
+            HIGHEST_COSTS_KEY: [],
+            HIGHEST_COST_STDEVS_KEY: [],
+            ORIGINAL_COST_KEY: original_cost,
+            STEP1_PREDICTORS_KEY: [],
+            STEP1_COSTS_KEY: numpy.array([]),
+            STEP1_COST_STDEVS_KEY: numpy.array([]),
+            PERMUTATION_INDICES_KEY: [],
+            RANDOM_STATE_KEY: random_state.get_state(),
+            NUM_REPEATS_KEY: num_repeats,
+            STOPPING_COST_KEY: stopping_cost,
+            IS_FINISHED_KEY: False
+        }
+    else:
+        random_state.set_state(checkpoint_dict[RANDOM_STATE_KEY])
+
+        # Reconstruct permuted data from previous steps.
+        for this_name, these_example_indices in zip(
+                checkpoint_dict[PERMUTED_PREDICTORS_KEY],
+                checkpoint_dict[PERMUTATION_INDICES_KEY]
+        ):
+            _permute_candidate_in_place(
+                predictor_matrix=predictor_matrix,
+                channel_indices=channel_indices_by_candidate[
+                    candidate_names.index(this_name)
+                ],
+                grid_slices=grid_slices_by_candidate[
+                    candidate_names.index(this_name)
+                ],
+                example_indices=these_example_indices)
+
+        print('Resuming permutation test after step {0:d}...\n'.format(
+            len(checkpoint_dict[PERMUTED_PREDICTORS_KEY])
+        ))
+
+    remaining_candidate_names = [
+        n for n in candidate_names
+        if n not in checkpoint_dict[PERMUTED_PREDICTORS_KEY]
+    ]
+
+    if max_num_steps is None:
+        max_num_steps = len(candidate_names)
+
+    while (
+            len(remaining_candidate_names) > 0 and
+            not checkpoint_dict[IS_FINISHED_KEY] and
+            len(checkpoint_dict[PERMUTED_PREDICTORS_KEY]) < max_num_steps
+    ):
+        current_step_num = 1 + len(checkpoint_dict[PERMUTED_PREDICTORS_KEY])
+
+        print((
+            'Trying {0:d} predictors ({1:d} repeats each) at step {2:d} of '
+            'permutation test...\n'
+        ).format(
+            len(remaining_candidate_names), num_repeats, current_step_num
+        ))
+
+        these_candidate_indices = numpy.repeat(
+            numpy.array(
+                [candidate_names.index(n) for n in remaining_candidate_names],
+                dtype=int
+            ),
+            repeats=num_repeats
+        )
+
+        this_permutation_matrix = numpy.vstack([
+            random_state.permutation(num_examples)
+            for _ in these_candidate_indices
+        ])
+
+        this_probability_matrix = _apply_cnn_to_permuted_data(
+            cnn_model_object=cnn_model_object,
+            predictor_matrix=predictor_matrix,
+            channel_indices_by_candidate=[
+                channel_indices_by_candidate[j]
+                for j in these_candidate_indices
+            ],
+            permutation_index_matrix=this_permutation_matrix,
+            grid_slices_by_candidate=[
+                grid_slices_by_candidate[j] for j in these_candidate_indices
+            ],
+            num_examples_per_batch=num_examples_per_batch)
+
+        this_cost_matrix = numpy.reshape(
+            numpy.array([
+                cost_function(target_values, p)
+                for p in this_probability_matrix
+            ]),
+            (len(remaining_candidate_names), num_repeats)
+        )
+
+        these_mean_costs = numpy.mean(this_cost_matrix, axis=1)
+        these_cost_stdevs = numpy.std(
+            this_cost_matrix, axis=1, ddof=min([num_repeats - 1, 1])
+        )
+
+        for j in range(len(remaining_candidate_names)):
+            print('Resulting cost for "{0:s}" = {1:.4e} +/- {2:.4e}'.format(
+                remaining_candidate_names[j], these_mean_costs[j],
+                these_cost_stdevs[j]
+            ))
+
+        if current_step_num == 1:
+            checkpoint_dict[STEP1_PREDICTORS_KEY] = (
+                remaining_candidate_names + [])
+            checkpoint_dict[STEP1_COSTS_KEY] = these_mean_costs + 0.
+            checkpoint_dict[STEP1_COST_STDEVS_KEY] = these_cost_stdevs + 0.
+
+        # If several predictors are tied, the last one wins.
+        this_best_index = (
+            len(these_mean_costs) - 1 -
+            numpy.argmax(these_mean_costs[::-1])
+        )
+        best_predictor_name = remaining_candidate_names[this_best_index]
+        highest_cost = these_mean_costs[this_best_index]
+
+        # Remove best predictor from list.
+        remaining_candidate_names.remove(best_predictor_name)
+
+        # Leave values of best predictor permuted (with the first repeat).
+        these_example_indices = this_permutation_matrix[
+            this_best_index * num_repeats, ...]
+
+        _permute_candidate_in_place(
+            predictor_matrix=predictor_matrix,
+            channel_indices=channel_indices_by_candidate[
+                candidate_names.index(best_predictor_name)
+            ],
+            grid_slices=grid_slices_by_candidate[
+                candidate_names.index(best_predictor_name)
+            ],
+            example_indices=these_example_indices)
+
+        checkpoint_dict[PERMUTED_PREDICTORS_KEY].append(best_predictor_name)
+        checkpoint_dict[HIGHEST_COSTS_KEY].append(highest_cost)
+        checkpoint_dict[HIGHEST_COST_STDEVS_KEY].append(
+            these_cost_stdevs[this_best_index]
+        )
+        checkpoint_dict[PERMUTATION_INDICES_KEY].append(these_example_indices)
+        checkpoint_dict[RANDOM_STATE_KEY] = random_state.get_state()
+
+        print('\nBest predictor = "{0:s}" ... new cost = {1:.4e}'.format(
+            best_predictor_name, highest_cost
+        ))
+
+        if stopping_cost is not None and highest_cost >= stopping_cost:
+            print((
+                'Cost has reached {0:.4e}, so permuting the {1:d} remaining '
+                'predictors cannot change the ranking.  Stopping early.'
+            ).format(stopping_cost, len(remaining_candidate_names)))
+
+            checkpoint_dict[IS_FINISHED_KEY] = True
+
+        if len(remaining_candidate_names) == 0:
+            checkpoint_dict[IS_FINISHED_KEY] = True
+
+        if checkpoint_file_name is not None:
+            print('Writing checkpoint to: "{0:s}"...'.format(
+                checkpoint_file_name))
+            _write_permutation_checkpoint(
+                checkpoint_dict=checkpoint_dict,
+                pickle_file_name=checkpoint_file_name)
+
+        print(MINOR_SEPARATOR_STRING)
+
+    return {
+        PERMUTED_PREDICTORS_KEY: checkpoint_dict[PERMUTED_PREDICTORS_KEY],
+        HIGHEST_COSTS_KEY: numpy.array(checkpoint_dict[HIGHEST_COSTS_KEY]),
+        HIGHEST_COST_STDEVS_KEY: numpy.array(
+            checkpoint_dict[HIGHEST_COST_STDEVS_KEY]
+        ),
+        ORIGINAL_COST_KEY: checkpoint_dict[ORIGINAL_COST_KEY],
+        STEP1_PREDICTORS_KEY: checkpoint_dict[STEP1_PREDICTORS_KEY],
+        STEP1_COSTS_KEY: checkpoint_dict[STEP1_COSTS_KEY],
+        STEP1_COST_STDEVS_KEY: checkpoint_dict[STEP1_COST_STDEVS_KEY]
+    }
+
+
+def _prep_data_for_permutation_test(image_dict, cnn_metadata_dict):
+    """Prepares data for permutation test.
+
+    :param image_dict: See doc for `permutation_test_for_cnn`.
+    :param cnn_metadata_dict: Same.
+    :return: predictor_matrix: numpy array of normalized predictor values (see
+        doc for `_apply_cnn_to_permuted_data`).
+    :return: target_values: See doc for `_run_multipass_permutation_test`.
+    """
+
+    predictor_matrix, _ = normalize_images(
+        predictor_matrix=image_dict[PREDICTOR_MATRIX_KEY] + 0.,
+        predictor_names=image_dict[PREDICTOR_NAMES_KEY],
+        normalization_dict=cnn_metadata_dict[NORMALIZATION_DICT_KEY])
+    predictor_matrix = predictor_matrix.astype('float32')
+
+    target_values = binarize_target_images(
+        target_matrix=image_dict[TARGET_MATRIX_KEY],
+        binarization_threshold=cnn_metadata_dict[BINARIZATION_THRESHOLD_KEY])
+
+    return predictor_matrix, target_values
+
+
+def _write_permutation_results(result_dict, pickle_file_name):
+    """Writes results of permutation test to Pickle file.
+
+    :param result_dict: Dictionary created by `permutation_test_for_cnn`.
+    :param pickle_file_name: Path to output file.
+    """
+
+    _create_directory(file_name=pickle_file_name)
+
+    print('Writing results to: "{0:s}"...'.format(pickle_file_name))
+    file_handle = open(pickle_file_name, 'wb')
+    pickle.dump(result_dict, file_handle)
+    file_handle.close()
+
+
 def permutation_test_for_cnn(
         cnn_model_object, image_dict, cnn_metadata_dict,
-        output_pickle_file_name, cost_function=_negative_auc_function):
+        output_pickle_file_name, cost_function=_negative_auc_function,
+        num_repeats=DEFAULT_NUM_PERMUTATION_REPEATS,
+        num_examples_per_batch=DEFAULT_NUM_EXAMPLES_PER_PERMUTATION_BATCH,
+        random_seed=None, stopping_cost=None, checkpoint_file_name=None):
     """Runs permutation test on CNN (convolutional neural net).
 
+    The normalized predictor matrix is created only once and used as a working
+    buffer.  At each step, each remaining predictor (and each repeat) is
+    evaluated by swapping only the permuted channel into the buffer, and
+    several predictors share each forward pass when there are few examples.
+    See `_apply_cnn_to_permuted_data` for details.
+
     E = number of examples (storm objects)
     C = number of channels (predictor variables)
+    S = number of steps completed (C, unless the test stopped early)
 
     :param cnn_model_object: Trained instance of `keras.models.Model`.
     :param image_dict: Dictionary created by `read_image_file` or
@@ -1662,12 +2242,30 @@ def permutation_test_for_cnn(
         probabilities of positive class (target value = 1).
     Output: cost: Scalar value.
 
+    :param num_repeats: Number of times to permute each predictor at each step.
+        The cost for each predictor is averaged over repeats.
+    :param num_examples_per_batch: Number of examples per forward pass through
+        the CNN.  If there are fewer examples than this, several predictors (or
+        repeats) tried at the current step share each forward pass.
+    :param random_seed: Seed for random-number generator (used to create
+        permutations).  If None, results will not be reproducible.
+    :param stopping_cost: If the cost reaches this value, the test will stop
+        early.  This should be the cost of a model with no skill (e.g., -0.5 for
+        the default cost function, which is negative AUC), since beyond this
+        point, permuting the remaining predictors cannot change the ranking.
+        If None, all steps will be run.
+    :param checkpoint_file_name: Path to checkpoint file.  If specified, a
+        checkpoint will be written here after each step, and the test can be
+        resumed with `resume_permutation_test_for_cnn`.
+
     :return: result_dict: Dictionary with the following keys.
-    result_dict['permuted_predictor_name_by_step']: length-C list with name of
+    result_dict['permuted_predictor_name_by_step']: length-S list with name of
         predictor permuted at each step.
-    result_dict['highest_cost_by_step']: length-C numpy array with corresponding
+    result_dict['highest_cost_by_step']: length-S numpy array with corresponding
         cost at each step.  highest_cost_by_step[m] = cost after permuting
         permuted_predictor_name_by_step[m].
+    result_dict['highest_cost_stdev_by_step']: length-S numpy array with
+        standard deviation (over repeats) of highest_cost_by_step.
     result_dict['original_cost']: Original cost (before any permutation).
     result_dict['predictor_names_step1']: length-C list of predictor names.
     result_dict['costs_step1']: length-C numpy array of corresponding costs.
@@ -1675,110 +2273,263 @@ def permutation_test_for_cnn(
         This key and "predictor_names_step1" correspond to the Breiman version
         of the permutation test, while "permuted_predictor_name_by_step" and
         "highest_cost_by_step" correspond to the Lakshmanan version.
+    result_dict['cost_stdevs_step1']: length-C numpy array with standard
+        deviation (over repeats) of costs_step1.
     """
 
+    num_repeats = int(numpy.round(num_repeats))
+    num_examples_per_batch = int(numpy.round(num_examples_per_batch))
+    assert num_repeats > 0
+    assert num_examples_per_batch > 0
+
     predictor_names = image_dict[PREDICTOR_NAMES_KEY]
+    predictor_matrix, target_values = _prep_data_for_permutation_test(
+        image_dict=image_dict, cnn_metadata_dict=cnn_metadata_dict)
+
+    result_dict = _run_multipass_permutation_test(
+        cnn_model_object=cnn_model_object, predictor_matrix=predictor_matrix,
+        target_values=target_values, candidate_names=predictor_names,
+        channel_indices_by_candidate=[
+            numpy.array([m], dtype=int) for m in range(len(predictor_names))
+        ],
+        cost_function=cost_function, num_repeats=num_repeats,
+        num_examples_per_batch=num_examples_per_batch,
+        random_state=numpy.random.RandomState(seed=random_seed),
+        stopping_cost=stopping_cost,
+        checkpoint_file_name=checkpoint_file_name)
 
-    predictor_matrix, _ = normalize_images(
-        predictor_matrix=image_dict[PREDICTOR_MATRIX_KEY] + 0.,
-        predictor_names=image_dict[PREDICTOR_NAMES_KEY],
-        normalization_dict=cnn_metadata_dict[NORMALIZATION_DICT_KEY])
-    predictor_matrix = predictor_matrix.astype('float32')
+    _write_permutation_results(
+        result_dict=result_dict, pickle_file_name=output_pickle_file_name)
+    return result_dict
 
-    target_values = binarize_target_images(
-        target_matrix=image_dict[TARGET_MATRIX_KEY],
-        binarization_threshold=cnn_metadata_dict[BINARIZATION_THRESHOLD_KEY])
 
-    # Get original cost (before permutation).
-    these_probabilities = apply_cnn(cnn_model_object=cnn_model_object,
-                                    predictor_matrix=predictor_matrix)
-    print(MINOR_SEPARATOR_STRING)
+def resume_permutation_test_for_cnn(
+        cnn_model_object, image_dict, cnn_metadata_dict,
+        checkpoint_file_name, output_pickle_file_name,
+        cost_function=_negative_auc_function,
+        num_examples_per_batch=DEFAULT_NUM_EXAMPLES_PER_PERMUTATION_BATCH):
+    """Resumes permutation test from checkpoint.
+
+    The inputs must be the same as in the original call to
+    `permutation_test_for_cnn`.  The number of repeats and stopping cost are
+    read from the checkpoint.  Because the random state is also saved, the
+    results are the same as if the test had never been interrupted.
+
+    :param cnn_model_object: See doc for `permutation_test_for_cnn`.
+    :param image_dict: Same.
+    :param cnn_metadata_dict: Same.
+    :param checkpoint_file_name: Same.
+    :param output_pickle_file_name: Same.
+    :param cost_function: Same.
+    :param num_examples_per_batch: Same.
+    :return: result_dict: Same.
+    """
 
-    original_cost = cost_function(target_values, these_probabilities)
-    print('Original cost (no permutation): {0:.4e}\n'.format(original_cost))
+    print('Reading checkpoint from: "{0:s}"...'.format(checkpoint_file_name))
+    checkpoint_dict = read_permutation_checkpoint(checkpoint_file_name)
 
-    remaining_predictor_names = predictor_names + []
-    current_step_num = 0
+    predictor_names = image_dict[PREDICTOR_NAMES_KEY]
+    predictor_matrix, target_values = _prep_data_for_permutation_test(
+        image_dict=image_dict, cnn_metadata_dict=cnn_metadata_dict)
+
+    result_dict = _run_multipass_permutation_test(
+        cnn_model_object=cnn_model_object, predictor_matrix=predictor_matrix,
+        target_values=target_values, candidate_names=predictor_names,
+        channel_indices_by_candidate=[
+            numpy.array([m], dtype=int) for m in range(len(predictor_names))
+        ],
+        cost_function=cost_function,
+        num_repeats=checkpoint_dict[NUM_REPEATS_KEY],
+        num_examples_per_batch=num_examples_per_batch,
+        random_state=numpy.random.RandomState(),
+        stopping_cost=checkpoint_dict[STOPPING_COST_KEY],
+        checkpoint_file_name=checkpoint_file_name,
+        checkpoint_dict=checkpoint_dict)
 
-    permuted_predictor_name_by_step = []
-    highest_cost_by_step = []
-    predictor_names_step1 = []
-    costs_step1 = []
+    _write_permutation_results(
+        result_dict=result_dict, pickle_file_name=output_pickle_file_name)
+    return result_dict
 
-    while len(remaining_predictor_names) > 0:
-        current_step_num += 1
 
-        highest_cost = -numpy.inf
-        best_predictor_name = None
-        best_predictor_permuted_values = None
+def _get_spatial_blocks(num_grid_rows, num_grid_columns, num_rows_per_block,
+                        num_columns_per_block):
+    """Splits grid into rectangular blocks.
 
-        for this_predictor_name in remaining_predictor_names:
-            message_string = (
-                'Trying predictor "{0:s}" at step {1:d} of permutation test...'
-                '\n'
-            ).format(this_predictor_name, current_step_num)
-            print(message_string)
+    If the grid size is not divisible by the block size, the last row (column)
+    of blocks will be smaller.
 
-            this_predictor_index = predictor_names.index(this_predictor_name)
-            this_predictor_matrix = predictor_matrix + 0.
+    :param num_grid_rows: Number of rows in grid.
+    :param num_grid_columns: Number of columns in grid.
+    :param num_rows_per_block: Number of rows in each block.
+    :param num_columns_per_block: Number of columns in each block.
+    :return: row_slices: 1-D list of slices, one for each row of blocks.
+    :return: column_slices: 1-D list of slices, one for each column of blocks.
+    """
 
-            this_predictor_matrix[..., this_predictor_index] = numpy.take(
-                this_predictor_matrix[..., this_predictor_index],
-                indices=numpy.random.permutation(
-                    this_predictor_matrix.shape[0]),
-                axis=0
-            )
+    row_slices = [
+        slice(i, min([i + num_rows_per_block, num_grid_rows]))
+        for i in range(0, num_grid_rows, num_rows_per_block)
+    ]
 
-            these_probabilities = apply_cnn(
-                cnn_model_object=cnn_model_object,
-                predictor_matrix=this_predictor_matrix)
+    column_slices = [
+        slice(j, min([j + num_columns_per_block, num_grid_columns]))
+        for j in range(0, num_grid_columns, num_columns_per_block)
+    ]
 
-            this_cost = cost_function(target_values, these_probabilities)
-            print('\nResulting cost = {0:.4e}'.format(this_cost))
-            print(MINOR_SEPARATOR_STRING)
+    return row_slices, column_slices
 
-            if current_step_num == 1:
-                predictor_names_step1.append(this_predictor_name)
-                costs_step1.append(this_cost)
 
-            if this_cost < highest_cost:
-                continue
+def grouped_permutation_test_for_cnn(
+        cnn_model_object, image_dict, cnn_metadata_dict,
+        output_pickle_file_name, predictor_groups=None,
+        num_rows_per_block=None, num_columns_per_block=None,
+        do_multipass=True, cost_function=_negative_auc_function,
+        num_repeats=DEFAULT_NUM_PERMUTATION_REPEATS,
+        num_examples_per_batch=DEFAULT_NUM_EXAMPLES_PER_PERMUTATION_BATCH,
+        random_seed=None, stopping_cost=None):
+    """Runs permutation test with groups of predictors and spatial blocks.
+
+    Each candidate for permutation is one group of predictors (e.g., u-wind and
+    v-wind together) in one spatial block of the grid.  The same permutation is
+    used for all predictors in the group, so relationships between them are
+    preserved.  Candidates tried at the same step are evaluated as in
+    `permutation_test_for_cnn` (see `_apply_cnn_to_permuted_data`).
 
-            highest_cost = this_cost + 0.
-            best_predictor_name = this_predictor_name + ''
-            best_predictor_permuted_values = this_predictor_matrix[
-                ..., this_predictor_index]
+    C = number of predictors
+    G = number of predictor groups
+    J = number of rows of spatial blocks
+    K = number of columns of spatial blocks
+
+    :param cnn_model_object: See doc for `permutation_test_for_cnn`.
+    :param image_dict: Same.
+    :param cnn_metadata_dict: Same.
+    :param output_pickle_file_name: Same.
+    :param predictor_groups: length-G list, where each element is a list of
+        predictor names.  If None, each predictor will be its own group.
+    :param num_rows_per_block: Number of grid rows in each spatial block.  If
+        None, each block will contain all rows.
+    :param num_columns_per_block: Same but for columns.
+    :param do_multipass: Boolean flag.  If True, will run the multi-pass
+        (Lakshmanan) test.  If False, will run only the single-pass (Breiman)
+        test, which is the first step of the multi-pass test.
+    :param cost_function: See doc for `permutation_test_for_cnn`.
+    :param num_repeats: Same.
+    :param num_examples_per_batch: Number of examples per forward pass through
+        the CNN, counting each candidate and repeat separately (see doc for
+        `permutation_test_for_cnn`).
+    :param random_seed: See doc for `permutation_test_for_cnn`.
+    :param stopping_cost: Same.
+
+    :return: result_dict: Dictionary with keys listed in doc for
+        `permutation_test_for_cnn`, where each "predictor" is one candidate
+        (group in one spatial block), plus the following.
+    result_dict['predictor_group_names']: length-G list of group names.
+    result_dict['block_importance_matrix']: G-by-J-by-K numpy array.
+        block_importance_matrix[g, j, k] is the increase in cost (over the
+        original cost) when only the [g]th group is permuted, and only in the
+        spatial block at the [j]th row and [k]th column.
+    :raises: ValueError: if any predictor group is empty, or any predictor is in
+        more than one group.
+    """
 
-        permuted_predictor_name_by_step.append(best_predictor_name)
-        highest_cost_by_step.append(highest_cost)
+    num_repeats = int(numpy.round(num_repeats))
+    num_examples_per_batch = int(numpy.round(num_examples_per_batch))
+    assert num_repeats > 0
+    assert num_examples_per_batch > 0
 
-        # Remove best predictor from list.
-        remaining_predictor_names.remove(best_predictor_name)
+    predictor_names = image_dict[PREDICTOR_NAMES_KEY]
+    if predictor_groups is None:
+        predictor_groups = [[n] for n in predictor_names]
 
-        # Leave values of best predictor permuted.
-        this_predictor_index = predictor_names.index(best_predictor_name)
-        predictor_matrix[
-            ..., this_predictor_index] = best_predictor_permuted_values
+    if any([len(g) == 0 for g in predictor_groups]):
+        raise ValueError('Each predictor group must be non-empty.')
 
-        print('\nBest predictor = "{0:s}" ... new cost = {1:.4e}\n'.format(
-            best_predictor_name, highest_cost
-        ))
+    all_grouped_names = [n for g in predictor_groups for n in g]
+    repeated_names = sorted(set([
+        n for n in all_grouped_names if all_grouped_names.count(n) > 1
+    ]))
 
-    result_dict = {
-        PERMUTED_PREDICTORS_KEY: permuted_predictor_name_by_step,
-        HIGHEST_COSTS_KEY: numpy.array(highest_cost_by_step),
-        ORIGINAL_COST_KEY: original_cost,
-        STEP1_PREDICTORS_KEY: predictor_names_step1,
-        STEP1_COSTS_KEY: numpy.array(costs_step1)
-    }
+    if len(repeated_names) > 0:
+        error_string = (
+            'Predictor groups must be disjoint.  These predictors are in more '
+            'than one group:\n{0:s}'
+        ).format(str(repeated_names))
 
-    _create_directory(file_name=output_pickle_file_name)
+        raise ValueError(error_string)
 
-    print('Writing results to: "{0:s}"...'.format(output_pickle_file_name))
-    file_handle = open(output_pickle_file_name, 'wb')
-    pickle.dump(result_dict, file_handle)
-    file_handle.close()
+    predictor_matrix, target_values = _prep_data_for_permutation_test(
+        image_dict=image_dict, cnn_metadata_dict=cnn_metadata_dict)
+
+    num_grid_rows = predictor_matrix.shape[1]
+    num_grid_columns = predictor_matrix.shape[2]
+
+    if num_rows_per_block is None:
+        num_rows_per_block = num_grid_rows
+    if num_columns_per_block is None:
+        num_columns_per_block = num_grid_columns
+
+    row_slices, column_slices = _get_spatial_blocks(
+        num_grid_rows=num_grid_rows, num_grid_columns=num_grid_columns,
+        num_rows_per_block=num_rows_per_block,
+        num_columns_per_block=num_columns_per_block)
+
+    is_grid_split = len(row_slices) * len(column_slices) > 1
+    group_names = ['+'.join(g) for g in predictor_groups]
+
+    candidate_names = []
+    channel_indices_by_candidate = []
+    grid_slices_by_candidate = []
+
+    for this_group_name, this_group in zip(group_names, predictor_groups):
+        these_channel_indices = numpy.array(
+            [predictor_names.index(n) for n in this_group], dtype=int
+        )
+
+        for this_row_slice in row_slices:
+            for this_column_slice in column_slices:
+                if is_grid_split:
+                    this_candidate_name = (
+                        '{0:s} (rows {1:d}-{2:d}, columns {3:d}-{4:d})'
+                    ).format(
+                        this_group_name, this_row_slice.start,
+                        this_row_slice.stop - 1, this_column_slice.start,
+                        this_column_slice.stop - 1
+                    )
+                else:
+                    this_candidate_name = this_group_name + ''
+
+                candidate_names.append(this_candidate_name)
+                channel_indices_by_candidate.append(these_channel_indices)
+                grid_slices_by_candidate.append(
+                    (this_row_slice, this_column_slice)
+                )
+
+    result_dict = _run_multipass_permutation_test(
+        cnn_model_object=cnn_model_object, predictor_matrix=predictor_matrix,
+        target_values=target_values, candidate_names=candidate_names,
+        channel_indices_by_candidate=channel_indices_by_candidate,
+        cost_function=cost_function, num_repeats=num_repeats,
+        num_examples_per_batch=num_examples_per_batch,
+        random_state=numpy.random.RandomState(seed=random_seed),
+        grid_slices_by_candidate=grid_slices_by_candidate,
+        stopping_cost=stopping_cost,
+        max_num_steps=None if do_multipass else 1)
+
+    these_indices = numpy.array([
+        result_dict[STEP1_PREDICTORS_KEY].index(n) for n in candidate_names
+    ], dtype=int)
+
+    block_importance_matrix = numpy.reshape(
+        result_dict[STEP1_COSTS_KEY][these_indices] -
+        result_dict[ORIGINAL_COST_KEY],
+        (len(group_names), len(row_slices), len(column_slices))
+    )
+
+    result_dict[GROUP_NAMES_KEY] = group_names
+    result_dict[BLOCK_IMPORTANCE_KEY] = block_importance_matrix
 
+    _write_permutation_results(
+        result_dict=result_dict, pickle_file_name=output_pickle_file_name)
     return result_dict
 
 
@@ -1863,6 +2614,10 @@ def plot_lakshmanan_results(
         result_dict, output_file_name, plot_percent_increase=False):
     """Plots results of Lakshmanan (multi-pass) permutation test.
 
+    If the test stopped early (see `stopping_cost` in
+    `permutation_test_for_cnn`), only predictors permuted before stopping are
+    shown, and the number of unranked predictors is given in the title.
+
     :param result_dict: See doc for `plot_breiman_results`.
     :param output_file_name: Same.
     :param plot_percent_increase: Same.
@@ -1897,6 +2652,17 @@ def plot_lakshmanan_results(
     else:
         pyplot.xlabel('Cost')
 
+    num_unranked_predictors = (
+        len(result_dict[STEP1_PREDICTORS_KEY]) -
+        len(result_dict[PERMUTED_PREDICTORS_KEY])
+    )
+
+    if num_unranked_predictors > 0:
+        pyplot.title(
+            'Stopped early ({0:d} predictors not ranked)'.format(
+                num_unranked_predictors)
+        )
+
     _label_bars_in_graph(
         axes_object=axes_object, y_coords=y_coords, y_strings=y_strings)
     pyplot.show()
@@ -1907,92 +2673,162 @@ def plot_lakshmanan_results(
     pyplot.close()
 
 
-def _do_saliency_calculations(
-        cnn_model_object, loss_tensor, list_of_input_matrices):
-    """Does the nitty-gritty part of computing saliency maps.
+def _get_compiled_function_dict(model_object):
+    """Returns dictionary of compiled interpretation functions for one model.
 
-    T = number of input tensors to the model
-    E = number of examples (storm objects)
+    :param model_object: Trained instance of `keras.models.Model` or
+        `keras.models.Sequential`.
+    :return: function_dict: Dictionary.  Each key is a tuple, starting with the
+        function type (for example, `SALIENCY_FUNCTION_TYPE_STRING`) and
+        followed by the other arguments that determine the function.  Each value
+        is a function created by `K.function`.
+    """
+
+    try:
+        return COMPILED_FUNCTION_CACHE[model_object]
+    except KeyError:
+        COMPILED_FUNCTION_CACHE[model_object] = {}
+        return COMPILED_FUNCTION_CACHE[model_object]
+
+
+def _get_loss_tensor_for_class(cnn_model_object, target_class):
+    """Creates loss tensor for probability of given class.
+
+    The loss is computed separately for each example, so the gradient of the
+    summed loss with respect to one example does not depend on other examples
+    in the same batch.
 
     :param cnn_model_object: Trained instance of `keras.models.Model`.
-    :param loss_tensor: Keras tensor defining the loss function.
-    :param list_of_input_matrices: length-T list of numpy arrays, comprising one
-        or more examples (storm objects).  list_of_input_matrices[i] must have
-        the same dimensions as the [i]th input tensor to the model.
-    :return: list_of_saliency_matrices: length-T list of numpy arrays,
-        comprising the saliency map for each example.
-        list_of_saliency_matrices[i] has the same dimensions as
-        list_of_input_matrices[i] and defines the "saliency" of each value x,
-        which is the gradient of the loss function with respect to x.
+    :param target_class: Loss will be based on probability of this class.
+    :return: loss_tensor: Keras tensor with one loss value per example.
+    """
+
+    target_class = int(numpy.round(target_class))
+    assert target_class >= 0
+
+    num_output_neurons = (
+        cnn_model_object.layers[-1].output.get_shape().as_list()[-1]
+    )
+
+    if num_output_neurons == 1:
+        assert target_class <= 1
+
+        if target_class == 1:
+            return (cnn_model_object.layers[-1].output[..., 0] - 1) ** 2
+
+        return cnn_model_object.layers[-1].output[..., 0] ** 2
+
+    assert target_class < num_output_neurons
+
+    return (cnn_model_object.layers[-1].output[..., target_class] - 1) ** 2
+
+
+def _get_saliency_function(cnn_model_object, target_class):
+    """Returns compiled function that computes saliency maps.
+
+    The function is compiled only once for each (model, target class) and stored
+    in `COMPILED_FUNCTION_CACHE`.
+
+    :param cnn_model_object: Trained instance of `keras.models.Model`.
+    :param target_class: Saliency maps will be created for probability of this
+        class.
+    :return: saliency_function: Function created by `K.function`.  Inputs are
+        the model's input matrices followed by the learning phase (0 for
+        inference), and outputs are normalized gradients, one per input tensor.
     """
 
+    target_class = int(numpy.round(target_class))
+    this_key = (SALIENCY_FUNCTION_TYPE_STRING, target_class)
+    function_dict = _get_compiled_function_dict(cnn_model_object)
+
+    if this_key in function_dict:
+        return function_dict[this_key]
+
     if isinstance(cnn_model_object.input, list):
         list_of_input_tensors = cnn_model_object.input
     else:
         list_of_input_tensors = [cnn_model_object.input]
 
+    loss_tensor = K.sum(_get_loss_tensor_for_class(
+        cnn_model_object=cnn_model_object, target_class=target_class
+    ))
     list_of_gradient_tensors = K.gradients(loss_tensor, list_of_input_tensors)
-    num_input_tensors = len(list_of_input_tensors)
 
-    for i in range(num_input_tensors):
+    for i in range(len(list_of_gradient_tensors)):
+        these_axes = list(range(1, K.ndim(list_of_gradient_tensors[i])))
+
         list_of_gradient_tensors[i] /= K.maximum(
-            K.std(list_of_gradient_tensors[i]), K.epsilon()
+            K.std(list_of_gradient_tensors[i], axis=these_axes, keepdims=True),
+            K.epsilon()
         )
 
-    inputs_to_gradients_function = K.function(
+    saliency_function = K.function(
         list_of_input_tensors + [K.learning_phase()],
         list_of_gradient_tensors
     )
 
-    list_of_saliency_matrices = inputs_to_gradients_function(
-        list_of_input_matrices + [0]
-    )
+    function_dict[this_key] = saliency_function
+    return saliency_function
 
-    for i in range(num_input_tensors):
-        list_of_saliency_matrices[i] *= -1
 
-    return list_of_saliency_matrices
+def get_saliency_for_class(
+        cnn_model_object, target_class, list_of_input_matrices,
+        num_examples_per_batch=DEFAULT_NUM_EXAMPLES_PER_SALIENCY_BATCH):
+    """For each input example, creates saliency map for prob of given class.
 
+    T = number of input tensors to the model
+    E = number of examples (storm objects)
 
-def get_saliency_for_class(cnn_model_object, target_class,
-                           list_of_input_matrices):
-    """For each input example, creates saliency map for prob of given class.
+    Each saliency map is normalized by its own standard deviation, so results
+    for one example do not depend on which other examples are in the batch.
 
     :param cnn_model_object: Trained instance of `keras.models.Model`.
     :param target_class: Saliency maps will be created for probability of this
         class.
-    :param list_of_input_matrices: See doc for `_do_saliency_calculations`.
-    :return: list_of_saliency_matrices: Same.
+    :param list_of_input_matrices: length-T list of numpy arrays, comprising one
+        or more examples (storm objects).  list_of_input_matrices[i] must have
+        the same dimensions as the [i]th input tensor to the model.
+    :param num_examples_per_batch: Number of examples passed through the model
+        at once.  This bounds memory usage, not the total number of examples.
+    :return: list_of_saliency_matrices: length-T list of numpy arrays,
+        comprising the saliency map for each example.
+        list_of_saliency_matrices[i] has the same dimensions as
+        list_of_input_matrices[i] and defines the "saliency" of each value x,
+        which is the gradient of the loss function with respect to x.
     """
 
-    target_class = int(numpy.round(target_class))
-    assert target_class >= 0
+    num_examples_per_batch = int(numpy.round(num_examples_per_batch))
+    assert num_examples_per_batch > 0
 
-    num_output_neurons = (
-        cnn_model_object.layers[-1].output.get_shape().as_list()[-1]
-    )
+    saliency_function = _get_saliency_function(
+        cnn_model_object=cnn_model_object, target_class=target_class)
 
-    if num_output_neurons == 1:
-        assert target_class <= 1
+    num_examples = list_of_input_matrices[0].shape[0]
+    list_of_saliency_matrices = [
+        numpy.full(m.shape, numpy.nan, dtype=K.floatx())
+        for m in list_of_input_matrices
+    ]
 
-        if target_class == 1:
-            loss_tensor = K.mean(
-                (cnn_model_object.layers[-1].output[..., 0] - 1) ** 2
-            )
-        else:
-            loss_tensor = K.mean(
-                cnn_model_object.layers[-1].output[..., 0] ** 2
-            )
-    else:
-        assert target_class < num_output_neurons
+    for i in range(0, num_examples, num_examples_per_batch):
+        this_first_index = i
+        this_last_index = min(
+            [i + num_examples_per_batch - 1, num_examples - 1]
+        )
 
-        loss_tensor = K.mean(
-            (cnn_model_object.layers[-1].output[..., target_class] - 1) ** 2
+        these_indices = numpy.linspace(
+            this_first_index, this_last_index,
+            num=this_last_index - this_first_index + 1, dtype=int)
+
+        these_saliency_matrices = saliency_function(
+            [m[these_indices, ...] for m in list_of_input_matrices] + [0]
         )
 
-    return _do_saliency_calculations(
-        cnn_model_object=cnn_model_object, loss_tensor=loss_tensor,
-        list_of_input_matrices=list_of_input_matrices)
+        for j in range(len(list_of_saliency_matrices)):
+            list_of_saliency_matrices[j][these_indices, ...] = (
+                -1 * these_saliency_matrices[j]
+            )
+
+    return list_of_saliency_matrices
 
 
 def plot_saliency_2d(
@@ -2115,121 +2951,165 @@ def _compute_gradients(loss_tensor, list_of_input_tensors):
     return list_of_gradient_tensors
 
 
-def _normalize_tensor(input_tensor):
-    """Normalizes tensor by its L2 norm.
+def _normalize_tensor_by_example(input_tensor):
+    """Normalizes each example in tensor by its own L2 norm.
 
-    :param input_tensor: Unnormalized tensor.
+    :param input_tensor: Unnormalized tensor.  The first axis must be the
+        example axis.
     :return: output_tensor: Normalized tensor.
     """
 
-    rms_tensor = K.sqrt(K.mean(K.square(input_tensor)))
+    these_axes = list(range(1, K.ndim(input_tensor)))
+    rms_tensor = K.sqrt(
+        K.mean(K.square(input_tensor), axis=these_axes, keepdims=True)
+    )
+
     return input_tensor / (rms_tensor + K.epsilon())
 
 
-def _upsample_cam(class_activation_matrix, new_dimensions):
-    """Upsamples class-activation matrix (CAM).
+def _get_linear_interp_weights(num_points_orig, num_points_new):
+    """Creates weight matrix for linear interpolation along one axis.
+
+    Both grids span the same interval, with the first and last points aligned.
 
-    CAM may be 1-D, 2-D, or 3-D.
+    m = number of points in original grid
+    n = number of points in new grid
 
-    :param class_activation_matrix: numpy array containing 1-D, 2-D, or 3-D
-        class-activation matrix.
-    :param new_dimensions: numpy array of new dimensions.  If matrix is
-        {1D, 2D, 3D}, this must be a length-{1, 2, 3} array, respectively.
-    :return: class_activation_matrix: Upsampled version of input.
+    :param num_points_orig: m in the above discussion.
+    :param num_points_new: n in the above discussion.
+    :return: weight_matrix: n-by-m numpy array.  Multiplying this matrix by a
+        length-m vector of original values gives the length-n vector of
+        interpolated values.
     """
 
-    num_rows_new = new_dimensions[0]
-    row_indices_new = numpy.linspace(
-        1, num_rows_new, num=num_rows_new, dtype=float)
-    row_indices_orig = numpy.linspace(
-        1, num_rows_new, num=class_activation_matrix.shape[0], dtype=float)
+    weight_matrix = numpy.zeros((num_points_new, num_points_orig))
 
-    if len(new_dimensions) == 1:
-        interp_object = UnivariateSpline(
-            x=row_indices_orig, y=numpy.ravel(class_activation_matrix),
-            k=1, s=0
-        )
+    if num_points_orig == 1:
+        weight_matrix[:, 0] = 1.
+        return weight_matrix
+
+    orig_coords = numpy.linspace(0, 1, num=num_points_orig, dtype=float)
+    new_coords = numpy.linspace(0, 1, num=num_points_new, dtype=float)
 
-        return interp_object(row_indices_new)
+    left_indices = numpy.searchsorted(orig_coords, new_coords, side='right') - 1
+    left_indices = numpy.clip(left_indices, 0, num_points_orig - 2)
 
-    num_columns_new = new_dimensions[1]
-    column_indices_new = numpy.linspace(
-        1, num_columns_new, num=num_columns_new, dtype=float)
-    column_indices_orig = numpy.linspace(
-        1, num_columns_new, num=class_activation_matrix.shape[1],
-        dtype=float
+    right_weights = (
+        (new_coords - orig_coords[left_indices]) /
+        (orig_coords[left_indices + 1] - orig_coords[left_indices])
     )
 
-    if len(new_dimensions) == 2:
-        interp_object = RectBivariateSpline(
-            x=row_indices_orig, y=column_indices_orig,
-            z=class_activation_matrix, kx=1, ky=1, s=0)
+    new_indices = numpy.linspace(
+        0, num_points_new - 1, num=num_points_new, dtype=int)
+    weight_matrix[new_indices, left_indices] = 1. - right_weights
+    weight_matrix[new_indices, left_indices + 1] = right_weights
 
-        return interp_object(x=row_indices_new, y=column_indices_new, grid=True)
+    return weight_matrix
 
-    num_heights_new = new_dimensions[2]
-    height_indices_new = numpy.linspace(
-        1, num_heights_new, num=num_heights_new, dtype=float)
-    height_indices_orig = numpy.linspace(
-        1, num_heights_new, num=class_activation_matrix.shape[2],
-        dtype=float)
 
-    interp_object = RegularGridInterpolator(
-        points=(row_indices_orig, column_indices_orig, height_indices_orig),
-        values=class_activation_matrix, method='linear'
-    )
+def _get_upsampling_weights(orig_dimensions, new_dimensions):
+    """Returns interpolation weights for upsampling CAMs.
 
-    row_index_matrix, column_index_matrix, height_index_matrix = (
-        numpy.meshgrid(row_indices_new, column_indices_new, height_indices_new)
-    )
-    query_point_matrix = numpy.stack(
-        (row_index_matrix, column_index_matrix, height_index_matrix), axis=-1
+    D = number of spatial dimensions
+
+    Weights are computed only once for each (original dimensions, new
+    dimensions) and stored in `UPSAMPLING_WEIGHT_CACHE`.
+
+    :param orig_dimensions: length-D numpy array of original dimensions.
+    :param new_dimensions: length-D numpy array of new dimensions.
+    :return: list_of_weight_matrices: length-D list of weight matrices, created
+        by `_get_linear_interp_weights`.  These are read-only.
+    """
+
+    this_key = (
+        tuple(int(d) for d in orig_dimensions),
+        tuple(int(d) for d in new_dimensions)
     )
 
-    return interp_object(query_point_matrix)
+    if this_key in UPSAMPLING_WEIGHT_CACHE:
+        return UPSAMPLING_WEIGHT_CACHE[this_key]
 
+    list_of_weight_matrices = []
 
-def run_gradcam(model_object, list_of_input_matrices, target_class,
-                target_layer_name):
-    """Runs Grad-CAM.
+    for k in range(len(new_dimensions)):
+        this_weight_matrix = _get_linear_interp_weights(
+            num_points_orig=this_key[0][k], num_points_new=this_key[1][k])
+        this_weight_matrix.setflags(write=False)
+        list_of_weight_matrices.append(this_weight_matrix)
 
-    T = number of input tensors to the model
+    UPSAMPLING_WEIGHT_CACHE[this_key] = list_of_weight_matrices
+    return list_of_weight_matrices
 
-    :param model_object: Trained instance of `keras.models.Model` or
-        `keras.models.Sequential`.
-    :param list_of_input_matrices: length-T list of numpy arrays, containing
-        only one example (storm object).  list_of_input_matrices[i] must have
-        the same dimensions as the [i]th input tensor to the model.
-    :param target_class: Activation maps will be created for this class.  Must
-        be an integer in 0...(K - 1), where K = number of classes.
-    :param target_layer_name: Name of target layer.  Neuron-importance weights
-        will be based on activations in this layer.
-    :return: class_activation_matrix: Class-activation matrix.  Dimensions of
-        this numpy array will be the spatial dimensions of whichever input
-        tensor feeds into the target layer.  For example, if the given input
-        tensor is 2-dimensional with M rows and N columns, this array will be
-        M x N.
+
+def _upsample_cams(class_activation_matrix, new_dimensions):
+    """Upsamples class-activation matrices (CAMs).
+
+    E = number of examples
+
+    Each CAM may be 1-D, 2-D, or 3-D, and interpolation is linear, bilinear, or
+    trilinear, respectively.  All CAMs are interpolated at once, by contracting
+    the stack with one weight matrix per spatial axis.
+
+    :param class_activation_matrix: numpy array of CAMs.  The first axis must
+        have length E, and the remaining 1, 2, or 3 axes are spatial.
+    :param new_dimensions: numpy array of new spatial dimensions.  If each CAM
+        is {1D, 2D, 3D}, this must be a length-{1, 2, 3} array, respectively.
+    :return: class_activation_matrix: Upsampled version of input.  The first
+        axis has length E, and the remaining axes have lengths given by
+        `new_dimensions`.
+    """
+
+    num_spatial_dim = len(new_dimensions)
+    assert class_activation_matrix.ndim == num_spatial_dim + 1
+
+    list_of_weight_matrices = _get_upsampling_weights(
+        orig_dimensions=class_activation_matrix.shape[1:],
+        new_dimensions=new_dimensions)
+
+    # Each contraction removes spatial axis 1 and appends its upsampled
+    # version at the end, so after D contractions the axes are back in order.
+    for this_weight_matrix in list_of_weight_matrices:
+        class_activation_matrix = numpy.tensordot(
+            class_activation_matrix, this_weight_matrix, axes=([1], [1])
+        )
+
+    return class_activation_matrix
+
+
+def _get_gradcam_function(model_object, target_class, target_layer_name):
+    """Returns compiled function that computes Grad-CAM inputs.
+
+    The function is compiled only once for each (model, target layer, target
+    class) and stored in `COMPILED_FUNCTION_CACHE`.
+
+    :param model_object: See doc for `run_gradcam_for_many_examples`.
+    :param target_class: Same.
+    :param target_layer_name: Same.
+    :return: gradcam_function: Function created by `K.function`.  Inputs are
+        the model's input matrices, and outputs are activations in the target
+        layer and the gradient of the class score with respect to these
+        activations, normalized separately for each example.
     """
 
-    for q in range(len(list_of_input_matrices)):
-        if list_of_input_matrices[q].shape[0] != 1:
-            list_of_input_matrices[q] = numpy.expand_dims(
-                list_of_input_matrices[q], axis=0)
+    target_class = int(numpy.round(target_class))
+    this_key = (GRADCAM_FUNCTION_TYPE_STRING, target_layer_name, target_class)
+    function_dict = _get_compiled_function_dict(model_object)
+
+    if this_key in function_dict:
+        return function_dict[this_key]
 
-    # Create loss tensor.
+    # Create loss tensor.  Summing over examples keeps gradients separate for
+    # each example.
     output_layer_object = model_object.layers[-1].output
     num_output_neurons = output_layer_object.get_shape().as_list()[-1]
 
     if num_output_neurons == 1:
         if target_class == 1:
-            # loss_tensor = model_object.layers[-1].output[..., 0]
-            loss_tensor = model_object.layers[-1].input[..., 0]
+            loss_tensor = K.sum(model_object.layers[-1].input[..., 0])
         else:
-            # loss_tensor = -1 * model_object.layers[-1].output[..., 0]
-            loss_tensor = -1 * model_object.layers[-1].input[..., 0]
+            loss_tensor = -1 * K.sum(model_object.layers[-1].input[..., 0])
     else:
-        # loss_tensor = model_object.layers[-1].output[..., target_class]
-        loss_tensor = model_object.layers[-1].input[..., target_class]
+        loss_tensor = K.sum(model_object.layers[-1].input[..., target_class])
 
     # Create gradient function.
     target_layer_activation_tensor = model_object.get_layer(
@@ -2239,55 +3119,307 @@ def run_gradcam(model_object, list_of_input_matrices, target_class,
     gradient_tensor = _compute_gradients(
         loss_tensor, [target_layer_activation_tensor]
     )[0]
-    gradient_tensor = _normalize_tensor(gradient_tensor)
+    gradient_tensor = _normalize_tensor_by_example(gradient_tensor)
 
     if isinstance(model_object.input, list):
         list_of_input_tensors = model_object.input
     else:
         list_of_input_tensors = [model_object.input]
 
-    gradient_function = K.function(
+    gradcam_function = K.function(
         list_of_input_tensors, [target_layer_activation_tensor, gradient_tensor]
     )
 
-    # Evaluate gradient function.
-    target_layer_activation_matrix, gradient_matrix = gradient_function(
-        list_of_input_matrices)
-    target_layer_activation_matrix = target_layer_activation_matrix[0, ...]
-    gradient_matrix = gradient_matrix[0, ...]
-
-    # Compute class-activation matrix.
-    mean_weight_by_filter = numpy.mean(gradient_matrix, axis=(0, 1))
-    class_activation_matrix = numpy.ones(
-        target_layer_activation_matrix.shape[:-1])
-
-    num_filters = len(mean_weight_by_filter)
-    for m in range(num_filters):
-        class_activation_matrix += (
-            mean_weight_by_filter[m] * target_layer_activation_matrix[..., m]
-        )
+    function_dict[this_key] = gradcam_function
+    return gradcam_function
+
+
+def run_gradcam_for_many_examples(
+        model_object, list_of_input_matrices, target_class, target_layer_name,
+        num_examples_per_batch=DEFAULT_NUM_EXAMPLES_PER_GRADCAM_BATCH):
+    """Runs Grad-CAM for many examples.
+
+    T = number of input tensors to the model
+    E = number of examples (storm objects)
+
+    :param model_object: Trained instance of `keras.models.Model` or
+        `keras.models.Sequential`.
+    :param list_of_input_matrices: length-T list of numpy arrays, comprising one
+        or more examples (storm objects).  list_of_input_matrices[i] must have
+        the same dimensions as the [i]th input tensor to the model.
+    :param target_class: Activation maps will be created for this class.  Must
+        be an integer in 0...(K - 1), where K = number of classes.
+    :param target_layer_name: Name of target layer.  Neuron-importance weights
+        will be based on activations in this layer.
+    :param num_examples_per_batch: Number of examples passed through the model
+        at once.
+    :return: class_activation_matrix: numpy array of class-activation maps.  The
+        first axis has length E, and the remaining axes are the spatial
+        dimensions of the first input tensor.  For example, if the first input
+        tensor is 2-dimensional with M rows and N columns, this array will be
+        E x M x N.
+    """
 
+    num_examples_per_batch = int(numpy.round(num_examples_per_batch))
+    assert num_examples_per_batch > 0
+
+    gradcam_function = _get_gradcam_function(
+        model_object=model_object, target_class=target_class,
+        target_layer_name=target_layer_name)
+
+    num_examples = list_of_input_matrices[0].shape[0]
     spatial_dimensions = numpy.array(
         list_of_input_matrices[0].shape[1:-1], dtype=int)
-    class_activation_matrix = _upsample_cam(
-        class_activation_matrix=class_activation_matrix,
-        new_dimensions=spatial_dimensions)
+    class_activation_matrix = numpy.full(
+        (num_examples,) + tuple(spatial_dimensions), numpy.nan)
 
-    class_activation_matrix[class_activation_matrix < 0.] = 0.
-    # denominator = numpy.maximum(numpy.max(class_activation_matrix), K.epsilon())
-    # return class_activation_matrix / denominator
+    for i in range(0, num_examples, num_examples_per_batch):
+        this_first_index = i
+        this_last_index = min(
+            [i + num_examples_per_batch - 1, num_examples - 1]
+        )
 
+        these_indices = numpy.linspace(
+            this_first_index, this_last_index,
+            num=this_last_index - this_first_index + 1, dtype=int)
+
+        this_activation_matrix, this_gradient_matrix = gradcam_function(
+            [m[these_indices, ...] for m in list_of_input_matrices]
+        )
+
+        # Weight for each filter is its mean gradient over the spatial grid.
+        these_spatial_axes = tuple(range(1, this_gradient_matrix.ndim - 1))
+        this_weight_matrix = numpy.mean(
+            this_gradient_matrix, axis=these_spatial_axes)
+
+        this_cam_matrix = 1. + numpy.einsum(
+            'e...f,ef->e...', this_activation_matrix, this_weight_matrix)
+
+        class_activation_matrix[these_indices, ...] = _upsample_cams(
+            class_activation_matrix=this_cam_matrix,
+            new_dimensions=spatial_dimensions)
+
+    class_activation_matrix[class_activation_matrix < 0.] = 0.
     return class_activation_matrix
 
 
+def run_gradcam(model_object, list_of_input_matrices, target_class,
+                target_layer_name):
+    """Runs Grad-CAM for one example.
+
+    T = number of input tensors to the model
+
+    :param model_object: See doc for `run_gradcam_for_many_examples`.
+    :param list_of_input_matrices: length-T list of numpy arrays, containing
+        only one example (storm object).  list_of_input_matrices[i] must have
+        the same dimensions as the [i]th input tensor to the model, with or
+        without the example axis.
+    :param target_class: See doc for `run_gradcam_for_many_examples`.
+    :param target_layer_name: Same.
+    :return: class_activation_matrix: Class-activation matrix.  Dimensions of
+        this numpy array will be the spatial dimensions of whichever input
+        tensor feeds into the target layer.  For example, if the given input
+        tensor is 2-dimensional with M rows and N columns, this array will be
+        M x N.
+    """
+
+    list_of_input_matrices = [
+        m if m.shape[0] == 1 else numpy.expand_dims(m, axis=0)
+        for m in list_of_input_matrices
+    ]
+
+    return run_gradcam_for_many_examples(
+        model_object=model_object,
+        list_of_input_matrices=list_of_input_matrices,
+        target_class=target_class, target_layer_name=target_layer_name
+    )[0, ...]
+
+
+def _get_total_variation_tensor(input_tensor):
+    """Computes total variation of each example.
+
+    :param input_tensor: Keras tensor.  The first axis is the example axis, the
+        last is the channel axis, and the others are spatial.
+    :return: total_variation_tensor: Keras tensor with mean absolute difference
+        between adjacent grid points, one value per example.
+    """
+
+    num_dimensions = K.ndim(input_tensor)
+    total_variation_tensor = 0.
+
+    for k in range(1, num_dimensions - 1):
+        these_first_slices = (
+            (slice(None),) * k + (slice(1, None),) + (Ellipsis,)
+        )
+        these_second_slices = (
+            (slice(None),) * k + (slice(None, -1),) + (Ellipsis,)
+        )
+
+        total_variation_tensor += K.mean(
+            K.abs(
+                input_tensor[these_first_slices] -
+                input_tensor[these_second_slices]
+            ),
+            axis=list(range(1, num_dimensions))
+        )
+
+    return total_variation_tensor
+
+
+def _get_bwo_function(cnn_model_object, target_class, regularize=False):
+    """Returns compiled function that computes loss and gradients for BWO.
+
+    The function is compiled only once for each (model, target class,
+    regularization flag) and stored in `COMPILED_FUNCTION_CACHE`.
+
+    C = number of channels (predictor variables) in first input tensor
+
+    :param cnn_model_object: Trained instance of `keras.models.Model`.
+    :param target_class: Synthetic input data will be created to maximize
+        probability of this class.
+    :param regularize: Boolean flag.  If True, the loss will include the L2 and
+        total-variation terms described in `bwo_for_class`, computed for the
+        first input tensor in denormalized units.  Regularization weights are
+        inputs to the function, so the same function serves all weights.
+    :return: bwo_function: Function created by `K.function`.
+
+    If `regularize = False`, inputs are the model's input matrices followed by
+    the learning phase (0 for inference).
+
+    If `regularize = True`, inputs are the model's input matrices; the initial
+    values of the first input matrix; a length-C numpy array of standard
+    deviations used for normalization; the L2 weight; the total-variation
+    weight; and the learning phase.
+
+    The first output is a numpy array with one loss value per example, and the
+    remaining outputs are gradients (one per input tensor), each normalized by
+    its root mean square over each example.
+    """
+
+    target_class = int(numpy.round(target_class))
+    this_key = (BWO_FUNCTION_TYPE_STRING, target_class, regularize)
+    function_dict = _get_compiled_function_dict(cnn_model_object)
+
+    if this_key in function_dict:
+        return function_dict[this_key]
+
+    if isinstance(cnn_model_object.input, list):
+        list_of_input_tensors = cnn_model_object.input
+    else:
+        list_of_input_tensors = [cnn_model_object.input]
+
+    loss_tensor = _get_loss_tensor_for_class(
+        cnn_model_object=cnn_model_object, target_class=target_class)
+    list_of_extra_input_tensors = []
+
+    if regularize:
+        first_input_tensor = list_of_input_tensors[0]
+        initial_input_tensor = K.placeholder(
+            shape=K.int_shape(first_input_tensor))
+        stdev_tensor = K.placeholder(
+            shape=(K.int_shape(first_input_tensor)[-1],))
+        l2_weight_tensor = K.placeholder(shape=())
+        tv_weight_tensor = K.placeholder(shape=())
+
+        list_of_extra_input_tensors = [
+            initial_input_tensor, stdev_tensor, l2_weight_tensor,
+            tv_weight_tensor
+        ]
+
+        these_axes = list(range(1, K.ndim(first_input_tensor)))
+        loss_tensor += l2_weight_tensor * K.mean(
+            K.square(
+                (first_input_tensor - initial_input_tensor) * stdev_tensor
+            ),
+            axis=these_axes
+        )
+        loss_tensor += tv_weight_tensor * _get_total_variation_tensor(
+            first_input_tensor * stdev_tensor)
+
+    list_of_gradient_tensors = K.gradients(
+        K.sum(loss_tensor), list_of_input_tensors)
+
+    for i in range(len(list_of_gradient_tensors)):
+        these_axes = list(range(1, K.ndim(list_of_gradient_tensors[i])))
+
+        list_of_gradient_tensors[i] /= K.maximum(
+            K.sqrt(K.mean(
+                list_of_gradient_tensors[i] ** 2, axis=these_axes,
+                keepdims=True
+            )),
+            K.epsilon()
+        )
+
+    bwo_function = K.function(
+        list_of_input_tensors + list_of_extra_input_tensors +
+        [K.learning_phase()],
+        [loss_tensor] + list_of_gradient_tensors
+    )
+
+    function_dict[this_key] = bwo_function
+    return bwo_function
+
+
+def _get_bwo_constraints(
+        normalization_dict, predictor_names, physical_limits_dict):
+    """Converts physical limits on predictors to normalized units.
+
+    C = number of channels (predictor variables)
+
+    :param normalization_dict: See doc for `normalize_images`.
+    :param predictor_names: length-C list of predictor names.
+    :param physical_limits_dict: Dictionary.  Each key is the name of a
+        predictor, and the corresponding value is a length-2 numpy array with
+        [min, max] in original units.  Predictors missing from this dictionary
+        are unbounded.  If None, all predictors are unbounded.
+    :return: stdev_by_predictor: length-C numpy array of standard deviations.
+    :return: min_value_by_predictor: length-C numpy array of minimum values
+        (normalized).
+    :return: max_value_by_predictor: length-C numpy array of max values
+        (normalized).
+    """
+
+    num_predictors = len(predictor_names)
+    stdev_by_predictor = numpy.full(num_predictors, numpy.nan)
+    min_value_by_predictor = numpy.full(num_predictors, -numpy.inf)
+    max_value_by_predictor = numpy.full(num_predictors, numpy.inf)
+
+    for m in range(num_predictors):
+        this_mean = normalization_dict[predictor_names[m]][0]
+        stdev_by_predictor[m] = normalization_dict[predictor_names[m]][1]
+
+        if physical_limits_dict is None:
+            continue
+        if predictor_names[m] not in physical_limits_dict:
+            continue
+
+        these_limits = physical_limits_dict[predictor_names[m]]
+        assert these_limits[0] < these_limits[1]
+
+        min_value_by_predictor[m] = (
+            (these_limits[0] - this_mean) / stdev_by_predictor[m]
+        )
+        max_value_by_predictor[m] = (
+            (these_limits[1] - this_mean) / stdev_by_predictor[m]
+        )
+
+    return stdev_by_predictor, min_value_by_predictor, max_value_by_predictor
+
+
 def _gradient_descent_for_bwo(
-        cnn_model_object, loss_tensor, init_function_or_matrices,
-        num_iterations, learning_rate):
+        cnn_model_object, target_class, init_function_or_matrices,
+        num_iterations, learning_rate, optimizer_type_string,
+        convergence_tolerance, num_starting_points, l2_weight=0.,
+        tv_weight=0., stdev_by_predictor=None, min_value_by_predictor=None,
+        max_value_by_predictor=None, verbose=True):
     """Does gradient descent (the nitty-gritty part) for backwards optimization.
 
+    All examples (starting points) are optimized together.  At each iteration,
+    the model is applied once to all examples that have not yet converged.
+
     :param cnn_model_object: Trained instance of `keras.models.Model`.
-    :param loss_tensor: Keras tensor, defining the loss function to be
-        minimized.
+    :param target_class: Synthetic input data will be created to maximize
+        probability of this class.
     :param init_function_or_matrices: Either a function or list of numpy arrays.
 
     If function, will be used to initialize input matrices.  See
@@ -2297,13 +3429,33 @@ def _gradient_descent_for_bwo(
     should be processed in the exact same way that training data were processed
     (e.g., normalization method).  Matrices must also be in the same order as
     training matrices, and the [q]th matrix in this list must have the same
-    shape as the [q]th training matrix.
+    shape as the [q]th training matrix.  The first axis of each matrix is the
+    example axis, and each example is a separate starting point.
 
-    :param num_iterations: Number of gradient-descent iterations (number of
-        times that the input matrices are adjusted).
+    :param num_iterations: Max number of iterations (number of times that the
+        input matrices are adjusted).
     :param learning_rate: Learning rate.  At each iteration, each input value x
-        will be decremented by `learning_rate * gradient`, where `gradient` is
-        the gradient of the loss function with respect to x.
+        will be decremented by `learning_rate * update`.  For plain gradient
+        descent, `update` is the gradient of the loss function with respect to
+        x.
+    :param optimizer_type_string: Optimizer type (must be accepted by
+        `_check_bwo_optimizer_type`).
+    :param convergence_tolerance: Convergence tolerance.  Once the loss for an
+        example changes by <= `convergence_tolerance` in one iteration, that
+        example stops being adjusted.  Once all examples have converged,
+        optimization ends early.  If None, all examples are adjusted for the
+        full `num_iterations`.
+    :param num_starting_points: Number of starting points to create if
+        `init_function_or_matrices` is a function.  Ignored otherwise.
+    :param l2_weight: See doc for `bwo_for_class`.
+    :param tv_weight: Same.
+    :param stdev_by_predictor: See doc for `_get_bwo_constraints`.  Needed only
+        if `l2_weight > 0` or `tv_weight > 0`.
+    :param min_value_by_predictor: See doc for `_get_bwo_constraints`.  After
+        each iteration, values in the first input matrix are clipped to these
+        limits.  If None, there is no clipping.
+    :param max_value_by_predictor: Same.
+    :param verbose: Boolean flag.  If True, progress messages will be printed.
     :return: list_of_optimized_input_matrices: length-T list of optimized input
         matrices (numpy arrays), where T = number of input tensors to the model.
         If the input arg `init_function_or_matrices` is a list of numpy arrays
@@ -2317,18 +3469,10 @@ def _gradient_descent_for_bwo(
         list_of_input_tensors = [cnn_model_object.input]
 
     num_input_tensors = len(list_of_input_tensors)
-    list_of_gradient_tensors = K.gradients(loss_tensor, list_of_input_tensors)
-
-    for i in range(num_input_tensors):
-        list_of_gradient_tensors[i] /= K.maximum(
-            K.sqrt(K.mean(list_of_gradient_tensors[i] ** 2)),
-            K.epsilon()
-        )
-
-    inputs_to_loss_and_gradients = K.function(
-        list_of_input_tensors + [K.learning_phase()],
-        ([loss_tensor] + list_of_gradient_tensors)
-    )
+    regularize = l2_weight > 0 or tv_weight > 0
+    bwo_function = _get_bwo_function(
+        cnn_model_object=cnn_model_object, target_class=target_class,
+        regularize=regularize)
 
     if isinstance(init_function_or_matrices, list):
         list_of_optimized_input_matrices = copy.deepcopy(
@@ -2338,84 +3482,350 @@ def _gradient_descent_for_bwo(
 
         for i in range(num_input_tensors):
             these_dimensions = numpy.array(
-                [1] + list_of_input_tensors[i].get_shape().as_list()[1:],
+                [num_starting_points] +
+                list_of_input_tensors[i].get_shape().as_list()[1:],
                 dtype=int
             )
 
             list_of_optimized_input_matrices[i] = init_function_or_matrices(
                 these_dimensions)
 
-    for j in range(num_iterations):
-        these_outputs = inputs_to_loss_and_gradients(
-            list_of_optimized_input_matrices + [0]
-        )
+    num_examples = list_of_optimized_input_matrices[0].shape[0]
 
-        if numpy.mod(j, 100) == 0:
-            print('Loss after {0:d} of {1:d} iterations: {2:.2e}'.format(
-                j, num_iterations, these_outputs[0]
+    if min_value_by_predictor is not None:
+        list_of_optimized_input_matrices[0] = numpy.clip(
+            list_of_optimized_input_matrices[0], min_value_by_predictor,
+            max_value_by_predictor)
+
+    if regularize:
+        initial_input_matrix = list_of_optimized_input_matrices[0] + 0.
+
+    # Optimizer state.
+    list_of_first_moment_matrices = [None] * num_input_tensors
+    list_of_second_moment_matrices = [None] * num_input_tensors
+
+    for i in range(num_input_tensors):
+        if optimizer_type_string != GRADIENT_DESCENT_STRING:
+            list_of_first_moment_matrices[i] = numpy.zeros(
+                list_of_optimized_input_matrices[i].shape)
+
+        if optimizer_type_string == ADAM_STRING:
+            list_of_second_moment_matrices[i] = numpy.zeros(
+                list_of_optimized_input_matrices[i].shape)
+
+    loss_by_example = numpy.full(num_examples, numpy.nan)
+    num_updates_by_example = numpy.full(num_examples, 0, dtype=int)
+    active_indices = numpy.linspace(
+        0, num_examples - 1, num=num_examples, dtype=int)
+
+    for j in range(num_iterations):
+        these_inputs = [
+            m[active_indices, ...] for m in list_of_optimized_input_matrices
+        ]
+
+        if regularize:
+            these_inputs += [
+                initial_input_matrix[active_indices, ...], stdev_by_predictor,
+                l2_weight, tv_weight
+            ]
+
+        these_outputs = bwo_function(these_inputs + [0])
+
+        these_prev_losses = loss_by_example[active_indices]
+        loss_by_example[active_indices] = these_outputs[0]
+
+        if verbose and numpy.mod(j, 100) == 0:
+            print((
+                'Mean loss after {0:d} of {1:d} iterations: {2:.2e} '
+                '({3:d} of {4:d} examples still being optimized)'
+            ).format(
+                j, num_iterations, numpy.mean(loss_by_example),
+                len(active_indices), num_examples
             ))
 
+        if convergence_tolerance is not None:
+            these_converged_flags = (
+                numpy.absolute(these_outputs[0] - these_prev_losses) <=
+                convergence_tolerance
+            )
+
+            if numpy.any(these_converged_flags):
+                these_keep_flags = numpy.invert(these_converged_flags)
+                active_indices = active_indices[these_keep_flags]
+                these_outputs = [
+                    o[these_keep_flags, ...] for o in these_outputs
+                ]
+
+            if len(active_indices) == 0:
+                break
+
+        num_updates_by_example[active_indices] += 1
+
         for i in range(num_input_tensors):
-            list_of_optimized_input_matrices[i] -= (
-                these_outputs[i + 1] * learning_rate
+            this_gradient_matrix = these_outputs[i + 1]
+
+            if optimizer_type_string == GRADIENT_DESCENT_STRING:
+                this_update_matrix = this_gradient_matrix
+
+            elif optimizer_type_string == MOMENTUM_STRING:
+                this_update_matrix = (
+                    BWO_MOMENTUM_COEFF *
+                    list_of_first_moment_matrices[i][active_indices, ...] +
+                    this_gradient_matrix
+                )
+
+                list_of_first_moment_matrices[i][active_indices, ...] = (
+                    this_update_matrix
+                )
+
+            else:
+                this_first_moment_matrix = (
+                    ADAM_FIRST_MOMENT_DECAY *
+                    list_of_first_moment_matrices[i][active_indices, ...] +
+                    (1. - ADAM_FIRST_MOMENT_DECAY) * this_gradient_matrix
+                )
+                this_second_moment_matrix = (
+                    ADAM_SECOND_MOMENT_DECAY *
+                    list_of_second_moment_matrices[i][active_indices, ...] +
+                    (1. - ADAM_SECOND_MOMENT_DECAY) * this_gradient_matrix ** 2
+                )
+
+                list_of_first_moment_matrices[i][active_indices, ...] = (
+                    this_first_moment_matrix
+                )
+                list_of_second_moment_matrices[i][active_indices, ...] = (
+                    this_second_moment_matrix
+                )
+
+                # Bias correction depends on number of updates to each example.
+                these_num_updates = numpy.reshape(
+                    num_updates_by_example[active_indices],
+                    (len(active_indices),) +
+                    (1,) * (this_gradient_matrix.ndim - 1)
+                )
+
+                this_update_matrix = (
+                    this_first_moment_matrix /
+                    (1. - ADAM_FIRST_MOMENT_DECAY ** these_num_updates)
+                ) / (
+                    numpy.sqrt(
+                        this_second_moment_matrix /
+                        (1. - ADAM_SECOND_MOMENT_DECAY ** these_num_updates)
+                    ) + ADAM_EPSILON
+                )
+
+            list_of_optimized_input_matrices[i][active_indices, ...] -= (
+                learning_rate * this_update_matrix
             )
 
-    print('Loss after {0:d} iterations: {1:.2e}'.format(
-        num_iterations, these_outputs[0]
-    ))
+        if min_value_by_predictor is not None:
+            list_of_optimized_input_matrices[0][active_indices, ...] = (
+                numpy.clip(
+                    list_of_optimized_input_matrices[0][active_indices, ...],
+                    min_value_by_predictor, max_value_by_predictor)
+            )
+
+    if verbose:
+        print((
+            'Mean loss after {0:d} iterations: {1:.2e} ({2:d} of {3:d} '
+            'examples converged)'
+        ).format(
+            numpy.max(num_updates_by_example), numpy.mean(loss_by_example),
+            num_examples - len(active_indices), num_examples
+        ))
 
     return list_of_optimized_input_matrices
 
 
+def _check_bwo_optimizer_type(optimizer_type_string):
+    """Error-checks optimizer type for backwards optimization.
+
+    :param optimizer_type_string: Optimizer type.
+    :raises: ValueError: if
+        `optimizer_type_string not in VALID_BWO_OPTIMIZER_STRINGS`.
+    """
+
+    if optimizer_type_string not in VALID_BWO_OPTIMIZER_STRINGS:
+        error_string = (
+            '\n{0:s}\nValid optimizer types (listed above) do not include '
+            '"{1:s}".'
+        ).format(str(VALID_BWO_OPTIMIZER_STRINGS), optimizer_type_string)
+
+        raise ValueError(error_string)
+
+
 def bwo_for_class(
         cnn_model_object, target_class, init_function_or_matrices,
         num_iterations=DEFAULT_NUM_BWO_ITERATIONS,
-        learning_rate=DEFAULT_BWO_LEARNING_RATE):
+        learning_rate=DEFAULT_BWO_LEARNING_RATE,
+        optimizer_type_string=GRADIENT_DESCENT_STRING,
+        convergence_tolerance=None, num_starting_points=1,
+        normalization_dict=None, predictor_names=None, l2_weight=0.,
+        tv_weight=0., physical_limits_dict=None, verbose=True):
     """Does backwards optimization to maximize probability of target class.
 
+    The last 5 input args constrain the synthetic data to be physically
+    plausible.  They apply to the first input matrix, whose last axis must
+    correspond to `predictor_names`, and all terms are computed in original
+    (denormalized) units.
+
     :param cnn_model_object: Trained instance of `keras.models.Model`.
     :param target_class: Synthetic input data will be created to maximize
         probability of this class.
     :param init_function_or_matrices: See doc for `_gradient_descent_for_bwo`.
     :param num_iterations: Same.
     :param learning_rate: Same.
+    :param optimizer_type_string: Same.
+    :param convergence_tolerance: Same.
+    :param num_starting_points: Same.
+    :param normalization_dict: See doc for `normalize_images`.  Needed only if
+        `l2_weight > 0`, `tv_weight > 0`, or `physical_limits_dict` is given.
+    :param predictor_names: Same.
+    :param l2_weight: Weight for L2 penalty (mean squared difference between
+        the initial and optimized inputs).
+    :param tv_weight: Weight for total-variation penalty (mean absolute
+        difference between adjacent grid points), which favours smooth fields.
+    :param physical_limits_dict: See doc for `_get_bwo_constraints`.  After each
+        iteration, synthetic values are clipped to these limits.
+        `DEFAULT_PHYSICAL_LIMITS_DICT` is a reasonable choice.
+    :param verbose: See doc for `_gradient_descent_for_bwo`.
     :return: list_of_optimized_input_matrices: Same.
     """
 
     target_class = int(numpy.round(target_class))
     num_iterations = int(numpy.round(num_iterations))
+    num_starting_points = int(numpy.round(num_starting_points))
 
     assert target_class >= 0
     assert num_iterations > 0
     assert learning_rate > 0.
     assert learning_rate < 1.
+    assert num_starting_points > 0
+    assert l2_weight >= 0.
+    assert tv_weight >= 0.
+    if convergence_tolerance is not None:
+        assert convergence_tolerance >= 0.
 
-    num_output_neurons = (
-        cnn_model_object.layers[-1].output.get_shape().as_list()[-1]
-    )
+    _check_bwo_optimizer_type(optimizer_type_string)
 
-    if num_output_neurons == 1:
-        assert target_class <= 1
+    stdev_by_predictor = None
+    min_value_by_predictor = None
+    max_value_by_predictor = None
 
-        if target_class == 1:
-            loss_tensor = K.mean(
-                (cnn_model_object.layers[-1].output[..., 0] - 1) ** 2
-            )
-        else:
-            loss_tensor = K.mean(
-                cnn_model_object.layers[-1].output[..., 0] ** 2
-            )
-    else:
-        assert target_class < num_output_neurons
+    if l2_weight > 0 or tv_weight > 0 or physical_limits_dict is not None:
+        assert normalization_dict is not None
+        assert predictor_names is not None
 
-        loss_tensor = K.mean(
-            (cnn_model_object.layers[-1].output[..., target_class] - 1) ** 2
-        )
+        (stdev_by_predictor, min_value_by_predictor, max_value_by_predictor
+        ) = _get_bwo_constraints(
+            normalization_dict=normalization_dict,
+            predictor_names=predictor_names,
+            physical_limits_dict=physical_limits_dict)
+
+        if physical_limits_dict is None:
+            min_value_by_predictor = None
+            max_value_by_predictor = None
 
     return _gradient_descent_for_bwo(
-        cnn_model_object=cnn_model_object, loss_tensor=loss_tensor,
+        cnn_model_object=cnn_model_object, target_class=target_class,
         init_function_or_matrices=init_function_or_matrices,
-        num_iterations=num_iterations, learning_rate=learning_rate)
+        num_iterations=num_iterations, learning_rate=learning_rate,
+        optimizer_type_string=optimizer_type_string,
+        convergence_tolerance=convergence_tolerance,
+        num_starting_points=num_starting_points, l2_weight=l2_weight,
+        tv_weight=tv_weight, stdev_by_predictor=stdev_by_predictor,
+        min_value_by_predictor=min_value_by_predictor,
+        max_value_by_predictor=max_value_by_predictor, verbose=verbose)
+
+
+class InterpretationSession(object):
+    """Interpretation methods (saliency, Grad-CAM, BWO) bound to one model.
+
+    Each gradient function is compiled the first time it is needed and then
+    reused by every later call, whether through this object or through the
+    module-level functions, since both use `COMPILED_FUNCTION_CACHE`.  Thus,
+    repeated calls do not add ops to the TensorFlow graph.
+    """
+
+    def __init__(self, model_object):
+        """Creates session.
+
+        :param model_object: Trained instance of `keras.models.Model` or
+            `keras.models.Sequential`.
+        """
+
+        self.model_object = model_object
+        self.function_dict = _get_compiled_function_dict(model_object)
+
+    def get_num_compiled_functions(self):
+        """Returns number of compiled functions currently held for the model.
+
+        :return: num_functions: Number of compiled functions.
+        """
+
+        return len(self.function_dict)
+
+    def clear(self):
+        """Discards all compiled functions for the model.
+
+        The next call to each method will compile its function again.  Ops
+        already added to the TensorFlow graph remain there until the graph
+        itself is reset (e.g., with `K.clear_session`).
+        """
+
+        self.function_dict.clear()
+
+    def get_saliency_for_class(
+            self, target_class, list_of_input_matrices,
+            num_examples_per_batch=DEFAULT_NUM_EXAMPLES_PER_SALIENCY_BATCH):
+        """See doc for module-level method `get_saliency_for_class`."""
+
+        return get_saliency_for_class(
+            cnn_model_object=self.model_object, target_class=target_class,
+            list_of_input_matrices=list_of_input_matrices,
+            num_examples_per_batch=num_examples_per_batch)
+
+    def run_gradcam_for_many_examples(
+            self, list_of_input_matrices, target_class, target_layer_name,
+            num_examples_per_batch=DEFAULT_NUM_EXAMPLES_PER_GRADCAM_BATCH):
+        """See doc for module-level method `run_gradcam_for_many_examples`."""
+
+        return run_gradcam_for_many_examples(
+            model_object=self.model_object,
+            list_of_input_matrices=list_of_input_matrices,
+            target_class=target_class, target_layer_name=target_layer_name,
+            num_examples_per_batch=num_examples_per_batch)
+
+    def run_gradcam(self, list_of_input_matrices, target_class,
+                    target_layer_name):
+        """See doc for module-level method `run_gradcam`."""
+
+        return run_gradcam(
+            model_object=self.model_object,
+            list_of_input_matrices=list_of_input_matrices,
+            target_class=target_class, target_layer_name=target_layer_name)
+
+    def bwo_for_class(
+            self, target_class, init_function_or_matrices,
+            num_iterations=DEFAULT_NUM_BWO_ITERATIONS,
+            learning_rate=DEFAULT_BWO_LEARNING_RATE,
+            optimizer_type_string=GRADIENT_DESCENT_STRING,
+            convergence_tolerance=None, num_starting_points=1,
+            normalization_dict=None, predictor_names=None, l2_weight=0.,
+            tv_weight=0., physical_limits_dict=None, verbose=True):
+        """See doc for module-level method `bwo_for_class`."""
+
+        return bwo_for_class(
+            cnn_model_object=self.model_object, target_class=target_class,
+            init_function_or_matrices=init_function_or_matrices,
+            num_iterations=num_iterations, learning_rate=learning_rate,
+            optimizer_type_string=optimizer_type_string,
+            convergence_tolerance=convergence_tolerance,
+            num_starting_points=num_starting_points,
+            normalization_dict=normalization_dict,
+            predictor_names=predictor_names, l2_weight=l2_weight,
+            tv_weight=tv_weight, physical_limits_dict=physical_limits_dict,
+            verbose=verbose)
 
 
 def _create_smoothing_filter(
@@ -2861,14 +4271,154 @@ def _normalize_features(feature_matrix, feature_means=None,
     return feature_matrix, feature_means, feature_standard_deviations
 
 
+def _get_num_modes_to_keep(singular_values, percent_variance_to_keep,
+                           total_variance=None):
+    """Returns number of SVD modes needed to explain given variance.
+
+    :param singular_values: 1-D numpy array of singular values, sorted in
+        descending order.
+    :param percent_variance_to_keep: Percentage of variance to keep.
+    :param total_variance: Total variance (sum of all squared singular values).
+        If None, `singular_values` are assumed to be complete.
+    :return: num_modes_to_keep: Number of modes (top eigenvectors) to keep.  If
+        the given singular values do not explain enough variance, this is the
+        number of given singular values.
+    """
+
+    eigenvalues = singular_values ** 2
+    if total_variance is None:
+        total_variance = numpy.sum(eigenvalues)
+
+    cumulative_explained_variances = numpy.cumsum(eigenvalues) / total_variance
+    fraction_of_variance_to_keep = 0.01 * percent_variance_to_keep
+
+    these_indices = numpy.where(
+        cumulative_explained_variances >= fraction_of_variance_to_keep
+    )[0]
+
+    if len(these_indices) == 0:
+        num_modes_to_keep = len(singular_values)
+    else:
+        num_modes_to_keep = 1 + these_indices[0]
+
+    message_string = (
+        'Number of modes required to explain {0:f}% of variance: {1:d}'
+    ).format(percent_variance_to_keep, num_modes_to_keep)
+    print(message_string)
+
+    return num_modes_to_keep
+
+
+def _get_svd_from_gram_matrix(gram_matrix):
+    """Computes singular values and EOFs from Gram matrix.
+
+    Z = number of features
+
+    :param gram_matrix: Z-by-Z numpy array, equal to A^T A for the feature
+        matrix A.
+    :return: singular_values: length-Z numpy array of singular values of A,
+        sorted in descending order.
+    :return: eof_matrix: Z-by-Z numpy array, where each column is an EOF.
+    """
+
+    eigenvalues, eof_matrix = numpy.linalg.eigh(gram_matrix)
+
+    singular_values = numpy.sqrt(numpy.maximum(eigenvalues[::-1], 0.))
+    return singular_values, eof_matrix[:, ::-1]
+
+
+def _do_covariance_svd(feature_matrix):
+    """Does SVD by eigendecomposition of the covariance (Gram) matrix.
+
+    E = number of examples
+    Z = number of features
+
+    This is efficient when E >> Z, because only a Z-by-Z matrix is decomposed.
+
+    :param feature_matrix: E-by-Z numpy array of features.
+    :return: singular_values: See doc for `_get_svd_from_gram_matrix`.
+    :return: eof_matrix: Same.
+    """
+
+    return _get_svd_from_gram_matrix(
+        numpy.dot(numpy.transpose(feature_matrix), feature_matrix)
+    )
+
+
+def _do_randomized_svd(feature_matrix, percent_variance_to_keep):
+    """Does randomized truncated SVD (Halko et al., 2011).
+
+    E = number of examples
+    Z = number of features
+    R = number of modes returned
+
+    The rank starts at `INIT_NUM_MODES_FOR_RANDOMIZED_SVD` and is doubled until
+    the modes explain `percent_variance_to_keep` of the total variance, which is
+    known exactly from the Frobenius norm.
+
+    :param feature_matrix: E-by-Z numpy array of features.
+    :param percent_variance_to_keep: See doc for `_fit_svd`.
+    :return: singular_values: length-R numpy array of singular values, sorted
+        in descending order.
+    :return: eof_matrix: Z-by-R numpy array, where each column is an EOF.
+    :return: total_variance: Total variance (squared Frobenius norm of
+        `feature_matrix`).
+    """
+
+    max_num_modes = min(feature_matrix.shape)
+    total_variance = numpy.sum(feature_matrix ** 2)
+    random_state = numpy.random.RandomState(
+        seed=RANDOM_SEED_FOR_RANDOMIZED_SVD)
+
+    num_modes = min([INIT_NUM_MODES_FOR_RANDOMIZED_SVD, max_num_modes])
+
+    while True:
+        num_columns = min(
+            [num_modes + NUM_OVERSAMPLES_FOR_RANDOMIZED_SVD, max_num_modes]
+        )
+
+        # Find orthonormal basis for range of feature matrix, with power
+        # iterations to sharpen the decay of singular values.
+        basis_matrix = numpy.linalg.qr(numpy.dot(
+            feature_matrix,
+            random_state.normal(size=(feature_matrix.shape[1], num_columns))
+        ))[0]
+
+        for _ in range(NUM_POWER_ITERS_FOR_RANDOMIZED_SVD):
+            basis_matrix = numpy.linalg.qr(numpy.dot(
+                numpy.transpose(feature_matrix), basis_matrix
+            ))[0]
+            basis_matrix = numpy.linalg.qr(
+                numpy.dot(feature_matrix, basis_matrix)
+            )[0]
+
+        singular_values, eof_matrix = numpy.linalg.svd(
+            numpy.dot(numpy.transpose(basis_matrix), feature_matrix),
+            full_matrices=False
+        )[1:]
+
+        singular_values = singular_values[:num_modes]
+        eof_matrix = numpy.transpose(eof_matrix[:num_modes, ...])
+
+        this_fraction = numpy.sum(singular_values ** 2) / total_variance
+        if (this_fraction >= 0.01 * percent_variance_to_keep or
+                num_modes == max_num_modes):
+            break
+
+        num_modes = min([2 * num_modes, max_num_modes])
+
+    return singular_values, eof_matrix, total_variance
+
+
 def _fit_svd(baseline_feature_matrix, test_feature_matrix,
-             percent_variance_to_keep):
+             percent_variance_to_keep, method_string=None):
     """Fits SVD (singular-value decomposition) model.
 
     B = number of baseline examples (storm objects)
     T = number of testing examples (storm objects)
     Z = number of scalar features (produced by dense layer of a CNN)
     K = number of modes (top eigenvectors) retained
+    R = number of modes computed (min(B, Z) unless method is "randomized")
 
     The SVD model will be fit only to the baseline set, but both the baseline
     and testing sets will be used to compute normalization parameters (means and
@@ -2881,6 +4431,13 @@ def _fit_svd(baseline_feature_matrix, test_feature_matrix,
     :param percent_variance_to_keep: Percentage of variance to keep.  Determines
         how many eigenvectors (K in the above discussion) will be used in the
         SVD model.
+    :param method_string: SVD method (must be in `VALID_SVD_METHOD_STRINGS`).
+        "exact" is a thin SVD of the baseline matrix; "covariance" is an
+        eigendecomposition of the Z-by-Z covariance matrix; and "randomized"
+        computes only as many modes as needed.  If None, the method will be
+        chosen from the shape of the baseline matrix (see
+        `MIN_EXAMPLE_TO_FEATURE_RATIO_FOR_COV_SVD` and
+        `MIN_DIMENSION_FOR_RANDOMIZED_SVD`).
     :return: svd_dictionary: Dictionary with the following keys.
     svd_dictionary['eof_matrix']: Z-by-K numpy array, where each column is an
         EOF (empirical orthogonal function).
@@ -2888,6 +4445,15 @@ def _fit_svd(baseline_feature_matrix, test_feature_matrix,
         each feature (before transformation).
     svd_dictionary['feature_standard_deviations']: length-Z numpy array with
         standard deviation of each feature (before transformation).
+    svd_dictionary['singular_values']: length-R numpy array of singular values,
+        sorted in descending order.
+    svd_dictionary['all_eof_matrix']: Z-by-R numpy array with all computed EOFs,
+        not only the top K.  Needed by `_update_svd`.
+    svd_dictionary['total_variance']: Total variance in the normalized baseline
+        matrix (sum of all squared singular values, including those not
+        computed).
+
+    :raises: ValueError: if `method_string not in VALID_SVD_METHOD_STRINGS`.
     """
 
     combined_feature_matrix = numpy.concatenate(
@@ -2899,59 +4465,189 @@ def _fit_svd(baseline_feature_matrix, test_feature_matrix,
     )
 
     num_baseline_examples = baseline_feature_matrix.shape[0]
+    num_features = baseline_feature_matrix.shape[1]
     baseline_feature_matrix = combined_feature_matrix[
         :num_baseline_examples, ...]
 
-    eigenvalues, eof_matrix = numpy.linalg.svd(baseline_feature_matrix)[1:]
-    eigenvalues = eigenvalues ** 2
+    if method_string is None:
+        if (num_baseline_examples >=
+                MIN_EXAMPLE_TO_FEATURE_RATIO_FOR_COV_SVD * num_features):
+            method_string = COVARIANCE_SVD_STRING
+        elif (min([num_baseline_examples, num_features]) >=
+              MIN_DIMENSION_FOR_RANDOMIZED_SVD):
+            method_string = RANDOMIZED_SVD_STRING
+        else:
+            method_string = EXACT_SVD_STRING
 
-    explained_variances = eigenvalues / numpy.sum(eigenvalues)
-    cumulative_explained_variances = numpy.cumsum(explained_variances)
+    if method_string not in VALID_SVD_METHOD_STRINGS:
+        error_string = (
+            '\n{0:s}\nValid SVD methods (listed above) do not include '
+            '"{1:s}".'
+        ).format(str(VALID_SVD_METHOD_STRINGS), method_string)
 
-    fraction_of_variance_to_keep = 0.01 * percent_variance_to_keep
-    num_modes_to_keep = 1 + numpy.where(
-        cumulative_explained_variances >= fraction_of_variance_to_keep
-    )[0][0]
+        raise ValueError(error_string)
 
-    message_string = (
-        'Number of modes required to explain {0:f}% of variance: {1:d}'
-    ).format(percent_variance_to_keep, num_modes_to_keep)
-    print(message_string)
+    if method_string == RANDOMIZED_SVD_STRING:
+        singular_values, eof_matrix, total_variance = _do_randomized_svd(
+            feature_matrix=baseline_feature_matrix,
+            percent_variance_to_keep=percent_variance_to_keep)
+    else:
+        if method_string == COVARIANCE_SVD_STRING:
+            singular_values, eof_matrix = _do_covariance_svd(
+                baseline_feature_matrix)
+        else:
+            singular_values, eof_matrix = numpy.linalg.svd(
+                baseline_feature_matrix, full_matrices=False
+            )[1:]
+            eof_matrix = numpy.transpose(eof_matrix)
+
+        num_modes = min([num_baseline_examples, num_features])
+        singular_values = singular_values[:num_modes]
+        eof_matrix = eof_matrix[:, :num_modes]
+        total_variance = numpy.sum(singular_values ** 2)
+
+    num_modes_to_keep = _get_num_modes_to_keep(
+        singular_values=singular_values,
+        percent_variance_to_keep=percent_variance_to_keep,
+        total_variance=total_variance)
 
     return {
-        EOF_MATRIX_KEY: numpy.transpose(eof_matrix)[..., :num_modes_to_keep],
+        EOF_MATRIX_KEY: eof_matrix[..., :num_modes_to_keep],
         FEATURE_MEANS_KEY: feature_means,
-        FEATURE_STDEVS_KEY: feature_standard_deviations
+        FEATURE_STDEVS_KEY: feature_standard_deviations,
+        SINGULAR_VALUES_KEY: singular_values,
+        ALL_EOFS_KEY: eof_matrix,
+        TOTAL_VARIANCE_KEY: total_variance
     }
 
 
-def _apply_svd(feature_vector, svd_dictionary):
-    """Applies SVD (singular-value decomposition) model to new example.
+def _update_svd(svd_dictionary, new_feature_vector, percent_variance_to_keep):
+    """Updates SVD model with one new baseline example.
 
     Z = number of features
+    R = number of singular values in the existing model
 
-    :param feature_vector: length-Z numpy array with feature values for one
-        example (storm object).
-    :param svd_dictionary: Dictionary created by `_fit_svd`.
-    :return: reconstructed_feature_vector: Reconstructed version of input.
+    This is a rank-one update (Brand, 2006).  If A is the normalized baseline
+    matrix, with A^T = V S U^T, appending the normalized example x to A gives
+
+    [A^T x] = [V j] [[S, p], [0, rho]] [[U^T, 0], [0, 1]],
+
+    where p = V^T x, rho = ||x - V p||, and j = (x - V p) / rho.  Only the small
+    (R + 1)-by-(R + 1) middle matrix must be decomposed, which costs much less
+    than a new SVD of the whole baseline matrix.
+
+    If the model came from the randomized method, only the computed modes are
+    updated, so the result is an approximation.  Otherwise it is exact.
+
+    Normalization parameters are not changed.  They are computed from the
+    baseline and testing sets combined (see `_fit_svd`), and moving an example
+    from the testing to the baseline set does not change the combined set.
+
+    :param svd_dictionary: Dictionary created by `_fit_svd` or `_update_svd`.
+    :param new_feature_vector: length-Z numpy array of features (not
+        normalized) for new baseline example.
+    :param percent_variance_to_keep: See doc for `_fit_svd`.
+    :return: svd_dictionary: Same as input but updated with the new example.
     """
 
-    this_matrix = numpy.dot(
-        svd_dictionary[EOF_MATRIX_KEY],
-        numpy.transpose(svd_dictionary[EOF_MATRIX_KEY])
+    singular_values = svd_dictionary[SINGULAR_VALUES_KEY]
+    eof_matrix = svd_dictionary[ALL_EOFS_KEY]
+    num_singular_values = len(singular_values)
+
+    new_feature_vector_norm = (
+        (new_feature_vector - svd_dictionary[FEATURE_MEANS_KEY]) /
+        svd_dictionary[FEATURE_STDEVS_KEY]
+    )
+
+    projection_vector = numpy.dot(
+        numpy.transpose(eof_matrix), new_feature_vector_norm)
+    residual_vector = (
+        new_feature_vector_norm - numpy.dot(eof_matrix, projection_vector)
+    )
+    residual_norm = numpy.linalg.norm(residual_vector)
+
+    # If the new example lies in the span of existing EOFs, the rank does not
+    # grow and the middle matrix is R x (R + 1).
+    min_residual_norm = 1e-10 * max(
+        [numpy.linalg.norm(new_feature_vector_norm), 1.]
+    )
+    add_eof = (
+        residual_norm > min_residual_norm and
+        num_singular_values < len(new_feature_vector_norm)
+    )
+
+    if add_eof:
+        middle_matrix = numpy.zeros(
+            (num_singular_values + 1, num_singular_values + 1)
+        )
+        middle_matrix[-1, -1] = residual_norm
+        eof_matrix = numpy.concatenate(
+            (eof_matrix, numpy.expand_dims(residual_vector / residual_norm, 1)),
+            axis=1
+        )
+    else:
+        middle_matrix = numpy.zeros(
+            (num_singular_values, num_singular_values + 1)
+        )
+
+    middle_matrix[:num_singular_values, :num_singular_values] = numpy.diag(
+        singular_values)
+    middle_matrix[:num_singular_values, -1] = projection_vector
+
+    rotation_matrix, singular_values = numpy.linalg.svd(
+        middle_matrix, full_matrices=False
+    )[:2]
+    eof_matrix = numpy.dot(eof_matrix, rotation_matrix)
+
+    total_variance = (
+        svd_dictionary[TOTAL_VARIANCE_KEY] +
+        numpy.sum(new_feature_vector_norm ** 2)
     )
 
-    feature_vector_norm = (
-        (feature_vector - svd_dictionary[FEATURE_MEANS_KEY]) /
+    num_modes_to_keep = _get_num_modes_to_keep(
+        singular_values=singular_values,
+        percent_variance_to_keep=percent_variance_to_keep,
+        total_variance=total_variance)
+
+    return {
+        EOF_MATRIX_KEY: eof_matrix[..., :num_modes_to_keep],
+        FEATURE_MEANS_KEY: svd_dictionary[FEATURE_MEANS_KEY],
+        FEATURE_STDEVS_KEY: svd_dictionary[FEATURE_STDEVS_KEY],
+        SINGULAR_VALUES_KEY: singular_values,
+        ALL_EOFS_KEY: eof_matrix,
+        TOTAL_VARIANCE_KEY: total_variance
+    }
+
+
+def _apply_svd(feature_matrix, svd_dictionary):
+    """Applies SVD (singular-value decomposition) model to new examples.
+
+    E = number of examples (storm objects)
+    Z = number of features
+    K = number of modes (top eigenvectors) retained
+
+    Reconstruction uses the low-rank form (X * EOF) * EOF^T, where X is the
+    normalized E-by-Z feature matrix and EOF is the Z-by-K EOF matrix, so the
+    Z-by-Z projection matrix is never created.
+
+    :param feature_matrix: E-by-Z numpy array with feature values.
+    :param svd_dictionary: Dictionary created by `_fit_svd`.
+    :return: reconstructed_feature_matrix: Reconstructed version of input.
+    """
+
+    feature_matrix_norm = (
+        (feature_matrix - svd_dictionary[FEATURE_MEANS_KEY]) /
         svd_dictionary[FEATURE_STDEVS_KEY]
     )
 
-    reconstructed_feature_vector_norm = numpy.dot(
-        this_matrix, feature_vector_norm)
+    reconstructed_feature_matrix_norm = numpy.dot(
+        numpy.dot(feature_matrix_norm, svd_dictionary[EOF_MATRIX_KEY]),
+        numpy.transpose(svd_dictionary[EOF_MATRIX_KEY])
+    )
 
     return (
         svd_dictionary[FEATURE_MEANS_KEY] +
-        reconstructed_feature_vector_norm * svd_dictionary[FEATURE_STDEVS_KEY]
+        reconstructed_feature_matrix_norm * svd_dictionary[FEATURE_STDEVS_KEY]
     )
 
 
@@ -2999,6 +4695,8 @@ def do_novelty_detection(
     novelty_dict['novel_image_matrix_upconv_svd']: Same as
         "novel_image_matrix_actual" but reconstructed by SVD (singular-value
         decomposition) and the upconvnet.
+    novelty_dict['novel_test_indices']: length-Q numpy array with indices of
+        novel test images, from most to least novel.
 
     :raises: TypeError: if `image_normalization_dict is None`.
     """
@@ -3031,74 +4729,575 @@ def do_novelty_detection(
         output_layer_name=cnn_feature_layer_name)
 
     novel_indices = []
-    novel_image_matrix_upconv = None
-    novel_image_matrix_upconv_svd = None
+    novel_feature_matrix_svd = numpy.full(
+        (num_novel_test_images, test_feature_matrix.shape[1]), numpy.nan)
+
+    svd_dictionary = _fit_svd(
+        baseline_feature_matrix=baseline_feature_matrix,
+        test_feature_matrix=test_feature_matrix,
+        percent_variance_to_keep=percent_svd_variance_to_keep)
 
     for k in range(num_novel_test_images):
         print('Finding {0:d}th of {1:d} novel test images...'.format(
             k + 1, num_novel_test_images
         ))
 
-        if len(novel_indices) == 0:
-            this_baseline_feature_matrix = baseline_feature_matrix + 0.
-            this_test_feature_matrix = test_feature_matrix + 0.
-        else:
-            novel_indices_numpy = numpy.array(novel_indices, dtype=int)
-            this_baseline_feature_matrix = numpy.concatenate(
-                (baseline_feature_matrix,
-                 test_feature_matrix[novel_indices_numpy, ...]),
-                axis=0
-            )
-
-            this_test_feature_matrix = numpy.delete(
-                test_feature_matrix, obj=novel_indices_numpy, axis=0)
-
-        svd_dictionary = _fit_svd(
-            baseline_feature_matrix=this_baseline_feature_matrix,
-            test_feature_matrix=this_test_feature_matrix,
-            percent_variance_to_keep=percent_svd_variance_to_keep)
+        # Absorb the last novel example into the baseline set.
+        if len(novel_indices) > 0:
+            svd_dictionary = _update_svd(
+                svd_dictionary=svd_dictionary,
+                new_feature_vector=test_feature_matrix[novel_indices[-1], ...],
+                percent_variance_to_keep=percent_svd_variance_to_keep)
 
         svd_errors = numpy.full(num_test_examples, numpy.nan)
         test_feature_matrix_svd = numpy.full(
             test_feature_matrix.shape, numpy.nan)
 
-        for i in range(num_test_examples):
-            print(i)
-            if i in novel_indices:
-                continue
+        these_indices = numpy.delete(
+            numpy.linspace(
+                0, num_test_examples - 1, num=num_test_examples, dtype=int),
+            novel_indices
+        )
 
-            test_feature_matrix_svd[i, ...] = _apply_svd(
-                feature_vector=test_feature_matrix[i, ...],
-                svd_dictionary=svd_dictionary)
+        test_feature_matrix_svd[these_indices, ...] = _apply_svd(
+            feature_matrix=test_feature_matrix[these_indices, ...],
+            svd_dictionary=svd_dictionary)
 
-            svd_errors[i] = numpy.linalg.norm(
-                test_feature_matrix_svd[i, ...] - test_feature_matrix[i, ...]
-            )
+        svd_errors[these_indices] = numpy.linalg.norm(
+            test_feature_matrix_svd[these_indices, ...] -
+            test_feature_matrix[these_indices, ...],
+            axis=1
+        )
 
         new_novel_index = numpy.nanargmax(svd_errors)
         novel_indices.append(new_novel_index)
+        novel_feature_matrix_svd[k, ...] = test_feature_matrix_svd[
+            new_novel_index, ...]
+
+    # Decode all novel examples at once.
+    novel_indices = numpy.array(novel_indices, dtype=int)
+
+    novel_image_matrix_upconv = ucn_model_object.predict(
+        test_feature_matrix[novel_indices, ...],
+        batch_size=num_novel_test_images)
+
+    novel_image_matrix_upconv_svd = ucn_model_object.predict(
+        novel_feature_matrix_svd, batch_size=num_novel_test_images)
+
+    novel_image_matrix_upconv = denormalize_images(
+        predictor_matrix=novel_image_matrix_upconv,
+        predictor_names=predictor_names,
+        normalization_dict=image_normalization_dict)
+
+    novel_image_matrix_upconv_svd = denormalize_images(
+        predictor_matrix=novel_image_matrix_upconv_svd,
+        predictor_names=predictor_names,
+        normalization_dict=image_normalization_dict)
+
+    return {
+        NOVEL_IMAGES_ACTUAL_KEY: test_image_matrix[novel_indices, ...],
+        NOVEL_IMAGES_UPCONV_KEY: novel_image_matrix_upconv,
+        NOVEL_IMAGES_UPCONV_SVD_KEY: novel_image_matrix_upconv_svd,
+        NOVEL_INDICES_KEY: novel_indices
+    }
+
+
+def do_knn_novelty_detection(
+        baseline_image_matrix, test_image_matrix, image_normalization_dict,
+        predictor_names, cnn_model_object, cnn_feature_layer_name,
+        ucn_model_object, num_novel_test_images,
+        num_neighbours=DEFAULT_NUM_NOVELTY_NEIGHBOURS):
+    """Does novelty detection with k-nearest neighbours.
+
+    This is an alternative to `do_novelty_detection`.  Baseline features are
+    indexed in a ball tree, and the novelty score for each test example is its
+    mean distance to the k nearest baseline examples in feature space.  All test
+    examples are scored with one batched query, so the cost does not grow with
+    the number of novel images requested.
+
+    Features are normalized to z-scores, using the baseline and test sets
+    combined (as in `_fit_svd`), before distances are computed.
+
+    NOTE: Both input and output images are (assumed to be) denormalized.
+
+    T = number of test examples (storm objects)
 
-        new_image_matrix_upconv = ucn_model_object.predict(
-            test_feature_matrix[[new_novel_index], ...], batch_size=1
+    :param baseline_image_matrix: See doc for `do_novelty_detection`.
+    :param test_image_matrix: Same.
+    :param image_normalization_dict: Same.
+    :param predictor_names: Same.
+    :param cnn_model_object: Same.
+    :param cnn_feature_layer_name: Same.  The flatten layer (see
+        `get_cnn_flatten_layer`) is a good choice.
+    :param ucn_model_object: Same.
+    :param num_novel_test_images: Same.
+    :param num_neighbours: Number of nearest neighbours (k in the above
+        discussion).
+
+    :return: novelty_dict: Dictionary with the keys listed in
+        `do_novelty_detection`, plus the one listed below.  Here
+        "novel_image_matrix_upconv_svd" contains, for each novel example, the
+        upconvnet reconstruction of the mean features of its k nearest baseline
+        neighbours.  This plays the role of the SVD reconstruction (what the
+        example "should" look like given the baseline set).
+    novelty_dict['novelty_score_by_test_example']: length-T numpy array of
+        novelty scores.
+
+    :raises: TypeError: if `image_normalization_dict is None`.
+    """
+
+    if image_normalization_dict is None:
+        error_string = (
+            'image_normalization_dict cannot be None.  Must be specified.')
+        raise TypeError(error_string)
+
+    num_baseline_examples = baseline_image_matrix.shape[0]
+    num_neighbours = int(numpy.round(num_neighbours))
+    assert num_neighbours > 0
+    assert num_neighbours <= num_baseline_examples
+
+    baseline_image_matrix_norm, _ = normalize_images(
+        predictor_matrix=baseline_image_matrix + 0.,
+        predictor_names=predictor_names,
+        normalization_dict=image_normalization_dict)
+
+    test_image_matrix_norm, _ = normalize_images(
+        predictor_matrix=test_image_matrix + 0.,
+        predictor_names=predictor_names,
+        normalization_dict=image_normalization_dict)
+
+    baseline_feature_matrix = apply_cnn(
+        cnn_model_object=cnn_model_object,
+        predictor_matrix=baseline_image_matrix_norm, verbose=False,
+        output_layer_name=cnn_feature_layer_name)
+
+    test_feature_matrix = apply_cnn(
+        cnn_model_object=cnn_model_object,
+        predictor_matrix=test_image_matrix_norm, verbose=False,
+        output_layer_name=cnn_feature_layer_name)
+
+    combined_feature_matrix_norm = _normalize_features(
+        numpy.concatenate(
+            (baseline_feature_matrix, test_feature_matrix), axis=0
         )
+    )[0]
+
+    print('Finding {0:d} nearest baseline neighbours of {1:d} test '
+          'examples...'.format(num_neighbours, test_feature_matrix.shape[0]))
+
+    ball_tree_object = sklearn.neighbors.BallTree(
+        combined_feature_matrix_norm[:num_baseline_examples, ...]
+    )
+    distance_matrix, neighbour_index_matrix = ball_tree_object.query(
+        combined_feature_matrix_norm[num_baseline_examples:, ...],
+        k=num_neighbours)
+
+    novelty_scores = numpy.mean(distance_matrix, axis=1)
+    novel_indices = numpy.argsort(-1 * novelty_scores)[:num_novel_test_images]
+
+    # Decode all novel examples and their neighbourhood means at once.
+    neighbour_feature_matrix = numpy.mean(
+        baseline_feature_matrix[neighbour_index_matrix[novel_indices, ...]],
+        axis=1
+    )
+
+    novel_image_matrix_upconv = ucn_model_object.predict(
+        test_feature_matrix[novel_indices, ...],
+        batch_size=len(novel_indices))
+
+    novel_image_matrix_upconv_knn = ucn_model_object.predict(
+        neighbour_feature_matrix, batch_size=len(novel_indices))
+
+    novel_image_matrix_upconv = denormalize_images(
+        predictor_matrix=novel_image_matrix_upconv,
+        predictor_names=predictor_names,
+        normalization_dict=image_normalization_dict)
+
+    novel_image_matrix_upconv_knn = denormalize_images(
+        predictor_matrix=novel_image_matrix_upconv_knn,
+        predictor_names=predictor_names,
+        normalization_dict=image_normalization_dict)
+
+    return {
+        NOVEL_IMAGES_ACTUAL_KEY: test_image_matrix[novel_indices, ...],
+        NOVEL_IMAGES_UPCONV_KEY: novel_image_matrix_upconv,
+        NOVEL_IMAGES_UPCONV_SVD_KEY: novel_image_matrix_upconv_knn,
+        NOVEL_INDICES_KEY: novel_indices,
+        NOVELTY_SCORES_KEY: novelty_scores
+    }
+
+
+def _read_features_from_file(
+        netcdf_file_name, image_normalization_dict, cnn_model_object,
+        cnn_feature_layer_name):
+    """Reads images from one file and turns them into CNN features.
+
+    E = number of examples (storm objects) in file
+    Z = number of features
+
+    :param netcdf_file_name: Path to input file (will be read by
+        `read_image_file`).
+    :param image_normalization_dict: See doc for `do_novelty_detection`.
+    :param cnn_model_object: Same.
+    :param cnn_feature_layer_name: Same.
+    :return: feature_matrix: E-by-Z numpy array of features.
+    :return: image_dict: Dictionary created by `read_image_file`, without the
+        predictor matrix.
+    """
+
+    print('Reading data from: "{0:s}"...'.format(netcdf_file_name))
+    image_dict = read_image_file(netcdf_file_name)
+
+    predictor_matrix_norm, _ = normalize_images(
+        predictor_matrix=image_dict.pop(PREDICTOR_MATRIX_KEY),
+        predictor_names=image_dict[PREDICTOR_NAMES_KEY],
+        normalization_dict=image_normalization_dict)
 
-        new_image_matrix_upconv_svd = ucn_model_object.predict(
-            test_feature_matrix_svd[[new_novel_index], ...], batch_size=1
+    feature_matrix = apply_cnn(
+        cnn_model_object=cnn_model_object,
+        predictor_matrix=predictor_matrix_norm, verbose=False,
+        output_layer_name=cnn_feature_layer_name)
+
+    return feature_matrix, image_dict
+
+
+def _update_feature_moments(moment_dict, feature_matrix, is_baseline):
+    """Updates running sums of CNN features.
+
+    E = number of new examples
+    Z = number of features
+
+    :param moment_dict: Dictionary with keys listed at top of file (e.g.,
+        `BASELINE_CROSS_PRODUCTS_KEY`).  If None, a new dictionary will be
+        created.
+    :param feature_matrix: E-by-Z numpy array of features.
+    :param is_baseline: Boolean flag.  If True, new examples are in the
+        baseline set, for which cross-products are needed to fit the SVD.  If
+        False, they are in the testing set, for which only squared sums are
+        needed (for normalization).
+    :return: moment_dict: Same as input but with updated values.
+    """
+
+    if moment_dict is None:
+        num_features = feature_matrix.shape[1]
+
+        moment_dict = {
+            REFERENCE_FEATURES_KEY: numpy.mean(
+                feature_matrix, axis=0, dtype=numpy.float64),
+            NUM_BASELINE_EXAMPLES_KEY: 0,
+            BASELINE_SUM_KEY: numpy.zeros(num_features),
+            BASELINE_CROSS_PRODUCTS_KEY: numpy.zeros(
+                (num_features, num_features)
+            ),
+            NUM_TEST_EXAMPLES_KEY: 0,
+            TEST_SUM_KEY: numpy.zeros(num_features),
+            TEST_SQUARED_SUM_KEY: numpy.zeros(num_features)
+        }
+
+    deviation_matrix = (
+        feature_matrix.astype(numpy.float64) -
+        moment_dict[REFERENCE_FEATURES_KEY]
+    )
+
+    if is_baseline:
+        moment_dict[NUM_BASELINE_EXAMPLES_KEY] += feature_matrix.shape[0]
+        moment_dict[BASELINE_SUM_KEY] += numpy.sum(deviation_matrix, axis=0)
+        moment_dict[BASELINE_CROSS_PRODUCTS_KEY] += numpy.dot(
+            numpy.transpose(deviation_matrix), deviation_matrix)
+    else:
+        moment_dict[NUM_TEST_EXAMPLES_KEY] += feature_matrix.shape[0]
+        moment_dict[TEST_SUM_KEY] += numpy.sum(deviation_matrix, axis=0)
+        moment_dict[TEST_SQUARED_SUM_KEY] += numpy.sum(
+            deviation_matrix ** 2, axis=0)
+
+    return moment_dict
+
+
+def _fit_svd_from_moments(moment_dict, percent_variance_to_keep):
+    """Fits SVD model from running sums of CNN features.
+
+    This is the streaming equivalent of `_fit_svd` with the "covariance"
+    method.  As in `_fit_svd`, normalization params come from the baseline and
+    testing sets combined, and the SVD is fit to the baseline set only.
+
+    :param moment_dict: Dictionary created by `_update_feature_moments`.
+    :param percent_variance_to_keep: See doc for `_fit_svd`.
+    :return: svd_dictionary: Same.
+    """
+
+    num_baseline_examples = moment_dict[NUM_BASELINE_EXAMPLES_KEY]
+    num_examples = num_baseline_examples + moment_dict[NUM_TEST_EXAMPLES_KEY]
+    baseline_sum_vector = moment_dict[BASELINE_SUM_KEY]
+    cross_product_matrix = moment_dict[BASELINE_CROSS_PRODUCTS_KEY]
+
+    # Offset of combined mean from reference vector.
+    mean_offsets = (
+        (baseline_sum_vector + moment_dict[TEST_SUM_KEY]) / num_examples
+    )
+    feature_means = moment_dict[REFERENCE_FEATURES_KEY] + mean_offsets
+
+    squared_sum_vector = (
+        numpy.diag(cross_product_matrix) + moment_dict[TEST_SQUARED_SUM_KEY]
+    )
+    feature_standard_deviations = numpy.sqrt(numpy.maximum(
+        (squared_sum_vector - num_examples * mean_offsets ** 2) /
+        (num_examples - 1),
+        0.
+    ))
+
+    # Gram matrix of normalized baseline features, centered at combined mean.
+    gram_matrix = (
+        cross_product_matrix -
+        numpy.outer(baseline_sum_vector, mean_offsets) -
+        numpy.outer(mean_offsets, baseline_sum_vector) +
+        num_baseline_examples * numpy.outer(mean_offsets, mean_offsets)
+    )
+    gram_matrix /= numpy.outer(
+        feature_standard_deviations, feature_standard_deviations)
+
+    singular_values, eof_matrix = _get_svd_from_gram_matrix(gram_matrix)
+
+    num_modes = min([num_baseline_examples, len(feature_means)])
+    singular_values = singular_values[:num_modes]
+    eof_matrix = eof_matrix[:, :num_modes]
+
+    num_modes_to_keep = _get_num_modes_to_keep(
+        singular_values=singular_values,
+        percent_variance_to_keep=percent_variance_to_keep)
+
+    return {
+        EOF_MATRIX_KEY: eof_matrix[..., :num_modes_to_keep],
+        FEATURE_MEANS_KEY: feature_means,
+        FEATURE_STDEVS_KEY: feature_standard_deviations,
+        SINGULAR_VALUES_KEY: singular_values,
+        ALL_EOFS_KEY: eof_matrix,
+        TOTAL_VARIANCE_KEY: numpy.sum(singular_values ** 2)
+    }
+
+
+def do_streaming_novelty_detection(
+        baseline_file_names, test_file_names, image_normalization_dict,
+        cnn_model_object, cnn_feature_layer_name, ucn_model_object,
+        num_novel_test_images, percent_svd_variance_to_keep=97.5,
+        num_candidates=None):
+    """Does novelty detection one file at a time.
+
+    This is the streaming version of `do_novelty_detection`, for date ranges
+    too long to hold in memory.  Only one file of images is in memory at a
+    time.
+
+    [1] Read each baseline and test file, turn images into CNN features, and
+        accumulate running sums of features.
+    [2] Fit the SVD model from these sums.
+    [3] Read each test file again and compute SVD-reconstruction errors.  Keep
+        only the `num_candidates` test examples with the highest errors, in a
+        heap.
+    [4] Among these candidates, iteratively find the most novel example and
+        absorb it into the baseline SVD model (as in `do_novelty_detection`).
+    [5] Read images only for the novel examples.
+
+    The most novel example is the same as in `do_novelty_detection`.  Later
+    examples are exact only if they are among the candidates kept in step [3].
+
+    Q = number of novel test images found
+
+    :param baseline_file_names: 1-D list of paths to baseline files (will be
+        read by `read_image_file`).
+    :param test_file_names: 1-D list of paths to test files (will be read by
+        `read_image_file`).
+    :param image_normalization_dict: See doc for `do_novelty_detection`.
+    :param cnn_model_object: Same.
+    :param cnn_feature_layer_name: Same.
+    :param ucn_model_object: Same.
+    :param num_novel_test_images: Same.
+    :param percent_svd_variance_to_keep: Same.
+    :param num_candidates: Number of candidates kept in step [3].  Default is
+        `DEFAULT_NUM_CANDIDATES_PER_NOVEL_IMAGE * num_novel_test_images`.
+    :return: novelty_dict: Dictionary with the keys listed in
+        `do_novelty_detection` (except "novel_test_indices"), plus those listed
+        below.
+    novelty_dict['storm_ids']: length-Q numpy array of storm IDs.
+    novelty_dict['storm_steps']: length-Q numpy array of storm steps.
+    novelty_dict['novel_file_names']: length-Q list of paths to files
+        containing the novel examples.
+    novelty_dict['predictor_names']: 1-D list with names of predictor
+        variables.
+
+    :raises: TypeError: if `image_normalization_dict is None`.
+    """
+
+    if image_normalization_dict is None:
+        error_string = (
+            'image_normalization_dict cannot be None.  Must be specified.')
+        raise TypeError(error_string)
+
+    if num_candidates is None:
+        num_candidates = (
+            DEFAULT_NUM_CANDIDATES_PER_NOVEL_IMAGE * num_novel_test_images
         )
 
-        if novel_image_matrix_upconv is None:
-            novel_image_matrix_upconv = new_image_matrix_upconv + 0.
-            novel_image_matrix_upconv_svd = new_image_matrix_upconv_svd + 0.
-        else:
-            novel_image_matrix_upconv = numpy.concatenate(
-                (novel_image_matrix_upconv, new_image_matrix_upconv), axis=0
-            )
-            novel_image_matrix_upconv_svd = numpy.concatenate(
-                (novel_image_matrix_upconv_svd, new_image_matrix_upconv_svd),
-                axis=0
+    num_candidates = int(numpy.round(num_candidates))
+    assert num_candidates >= num_novel_test_images
+
+    # Accumulate running sums of features.
+    moment_dict = None
+
+    for this_file_name in baseline_file_names:
+        this_feature_matrix = _read_features_from_file(
+            netcdf_file_name=this_file_name,
+            image_normalization_dict=image_normalization_dict,
+            cnn_model_object=cnn_model_object,
+            cnn_feature_layer_name=cnn_feature_layer_name
+        )[0]
+
+        moment_dict = _update_feature_moments(
+            moment_dict=moment_dict, feature_matrix=this_feature_matrix,
+            is_baseline=True)
+
+    for this_file_name in test_file_names:
+        this_feature_matrix = _read_features_from_file(
+            netcdf_file_name=this_file_name,
+            image_normalization_dict=image_normalization_dict,
+            cnn_model_object=cnn_model_object,
+            cnn_feature_layer_name=cnn_feature_layer_name
+        )[0]
+
+        moment_dict = _update_feature_moments(
+            moment_dict=moment_dict, feature_matrix=this_feature_matrix,
+            is_baseline=False)
+
+    print(SEPARATOR_STRING)
+    svd_dictionary = _fit_svd_from_moments(
+        moment_dict=moment_dict,
+        percent_variance_to_keep=percent_svd_variance_to_keep)
+    print(SEPARATOR_STRING)
+
+    # Keep test examples with highest reconstruction errors.  Each heap item is
+    # (error, file index, example index in file, storm ID, storm step,
+    # feature vector).  File and example indices are unique, so feature vectors
+    # are never compared.
+    candidate_heap = []
+
+    for i in range(len(test_file_names)):
+        this_feature_matrix, this_image_dict = _read_features_from_file(
+            netcdf_file_name=test_file_names[i],
+            image_normalization_dict=image_normalization_dict,
+            cnn_model_object=cnn_model_object,
+            cnn_feature_layer_name=cnn_feature_layer_name)
+
+        these_errors = numpy.linalg.norm(
+            _apply_svd(feature_matrix=this_feature_matrix,
+                       svd_dictionary=svd_dictionary) -
+            this_feature_matrix,
+            axis=1
+        )
+
+        for j in numpy.argsort(-1 * these_errors)[:num_candidates]:
+            if (len(candidate_heap) == num_candidates and
+                    these_errors[j] <= candidate_heap[0][0]):
+                break
+
+            this_item = (
+                these_errors[j], i, j,
+                this_image_dict[STORM_IDS_KEY][j],
+                this_image_dict[STORM_STEPS_KEY][j],
+                this_feature_matrix[j, ...] + 0.
             )
 
+            if len(candidate_heap) < num_candidates:
+                heapq.heappush(candidate_heap, this_item)
+            else:
+                heapq.heapreplace(candidate_heap, this_item)
+
+    candidate_file_indices = numpy.array(
+        [c[1] for c in candidate_heap], dtype=int)
+    candidate_example_indices = numpy.array(
+        [c[2] for c in candidate_heap], dtype=int)
+    candidate_storm_ids = numpy.array([c[3] for c in candidate_heap], dtype=int)
+    candidate_storm_steps = numpy.array(
+        [c[4] for c in candidate_heap], dtype=int)
+    candidate_feature_matrix = numpy.array([c[5] for c in candidate_heap])
+
+    # Find novel examples among candidates.
+    num_novel_test_images = min(
+        [num_novel_test_images, len(candidate_heap)]
+    )
+    novel_indices = []
+    novel_feature_matrix_svd = numpy.full(
+        (num_novel_test_images, candidate_feature_matrix.shape[1]), numpy.nan)
+
+    for k in range(num_novel_test_images):
+        print('Finding {0:d}th of {1:d} novel test images...'.format(
+            k + 1, num_novel_test_images
+        ))
+
+        if len(novel_indices) > 0:
+            svd_dictionary = _update_svd(
+                svd_dictionary=svd_dictionary,
+                new_feature_vector=candidate_feature_matrix[
+                    novel_indices[-1], ...],
+                percent_variance_to_keep=percent_svd_variance_to_keep)
+
+        these_indices = numpy.delete(
+            numpy.linspace(
+                0, len(candidate_heap) - 1, num=len(candidate_heap), dtype=int
+            ),
+            novel_indices
+        )
+
+        this_feature_matrix_svd = _apply_svd(
+            feature_matrix=candidate_feature_matrix[these_indices, ...],
+            svd_dictionary=svd_dictionary)
+
+        these_errors = numpy.linalg.norm(
+            this_feature_matrix_svd -
+            candidate_feature_matrix[these_indices, ...],
+            axis=1
+        )
+
+        this_index = numpy.argmax(these_errors)
+        novel_indices.append(these_indices[this_index])
+        novel_feature_matrix_svd[k, ...] = this_feature_matrix_svd[
+            this_index, ...]
+
     novel_indices = numpy.array(novel_indices, dtype=int)
+    print(SEPARATOR_STRING)
+
+    # Read images only for novel examples.
+    novel_image_matrix_actual = None
+    predictor_names = None
+
+    for this_file_index in numpy.unique(candidate_file_indices[novel_indices]):
+        print('Reading data from: "{0:s}"...'.format(
+            test_file_names[this_file_index]
+        ))
+        this_image_dict = read_image_file(test_file_names[this_file_index])
+
+        these_novel_flags = (
+            candidate_file_indices[novel_indices] == this_file_index
+        )
+        these_example_indices = candidate_example_indices[
+            novel_indices[these_novel_flags]
+        ]
+
+        if novel_image_matrix_actual is None:
+            predictor_names = this_image_dict[PREDICTOR_NAMES_KEY]
+            novel_image_matrix_actual = numpy.full(
+                (num_novel_test_images,) +
+                this_image_dict[PREDICTOR_MATRIX_KEY].shape[1:],
+                numpy.nan
+            )
+
+        novel_image_matrix_actual[these_novel_flags, ...] = this_image_dict[
+            PREDICTOR_MATRIX_KEY][these_example_indices, ...]
+
+    # Decode all novel examples at once.
+    novel_image_matrix_upconv = ucn_model_object.predict(
+        candidate_feature_matrix[novel_indices, ...],
+        batch_size=num_novel_test_images)
+
+    novel_image_matrix_upconv_svd = ucn_model_object.predict(
+        novel_feature_matrix_svd, batch_size=num_novel_test_images)
 
     novel_image_matrix_upconv = denormalize_images(
         predictor_matrix=novel_image_matrix_upconv,
@@ -3111,9 +5310,15 @@ def do_novelty_detection(
         normalization_dict=image_normalization_dict)
 
     return {
-        NOVEL_IMAGES_ACTUAL_KEY: test_image_matrix[novel_indices, ...],
+        NOVEL_IMAGES_ACTUAL_KEY: novel_image_matrix_actual,
         NOVEL_IMAGES_UPCONV_KEY: novel_image_matrix_upconv,
-        NOVEL_IMAGES_UPCONV_SVD_KEY: novel_image_matrix_upconv_svd
+        NOVEL_IMAGES_UPCONV_SVD_KEY: novel_image_matrix_upconv_svd,
+        STORM_IDS_KEY: candidate_storm_ids[novel_indices],
+        STORM_STEPS_KEY: candidate_storm_steps[novel_indices],
+        NOVEL_FILE_NAMES_KEY: [
+            test_file_names[k] for k in candidate_file_indices[novel_indices]
+        ],
+        PREDICTOR_NAMES_KEY: predictor_names
     }
 
 
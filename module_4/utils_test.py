@@ -0,0 +1,822 @@
+"""Unit tests for utils.py."""
+
+import os
+import shutil
+import tempfile
+import unittest
+import numpy
+from scipy.interpolate import RegularGridInterpolator
+import keras
+from keras import backend as K
+from module_4 import utils
+
+TOLERANCE = 1e-6
+
+# The following constants are used to test grouped_permutation_test_for_cnn.
+PREDICTOR_NAMES = ['u_wind_m_s01', 'v_wind_m_s01', 'temperature_kelvins']
+IMAGE_DICT = {utils.PREDICTOR_NAMES_KEY: PREDICTOR_NAMES}
+
+PREDICTOR_GROUPS_EMPTY = [['u_wind_m_s01', 'v_wind_m_s01'], []]
+PREDICTOR_GROUPS_OVERLAPPING = [
+    ['u_wind_m_s01', 'v_wind_m_s01'], ['v_wind_m_s01', 'temperature_kelvins']
+]
+
+# The following constants are used to test _apply_cnn_to_permuted_data and
+# resume_permutation_test_for_cnn.
+RANDOM_STATE_OBJECT = numpy.random.RandomState(6695)
+NUM_EXAMPLES = 40
+NUM_GRID_ROWS = 32
+NUM_GRID_COLUMNS = 32
+PERMUTATION_RANDOM_SEED = 6695
+NUM_PERMUTATION_REPEATS = 2
+
+CNN_PREDICTOR_NAMES = [
+    utils.REFLECTIVITY_NAME, utils.TEMPERATURE_NAME, utils.U_WIND_NAME,
+    utils.V_WIND_NAME
+]
+
+CNN_IMAGE_DICT = {
+    utils.PREDICTOR_NAMES_KEY: CNN_PREDICTOR_NAMES,
+    utils.PREDICTOR_MATRIX_KEY: RANDOM_STATE_OBJECT.normal(size=(
+        NUM_EXAMPLES, NUM_GRID_ROWS, NUM_GRID_COLUMNS,
+        len(CNN_PREDICTOR_NAMES)
+    )),
+    utils.TARGET_MATRIX_KEY: (
+        RANDOM_STATE_OBJECT.uniform(
+            size=(NUM_EXAMPLES, NUM_GRID_ROWS, NUM_GRID_COLUMNS)
+        ) *
+        RANDOM_STATE_OBJECT.uniform(size=(NUM_EXAMPLES, 1, 1))
+    )
+}
+
+CNN_METADATA_DICT = {
+    utils.NORMALIZATION_DICT_KEY: {
+        n: numpy.array([0., 1.]) for n in CNN_PREDICTOR_NAMES
+    },
+    utils.BINARIZATION_THRESHOLD_KEY: 0.5
+}
+
+# The last candidate is a group of two channels in one corner of the grid.
+CHANNEL_INDICES_BY_CANDIDATE = [
+    numpy.array([0], dtype=int), numpy.array([1], dtype=int),
+    numpy.array([2], dtype=int), numpy.array([3], dtype=int),
+    numpy.array([2, 3], dtype=int)
+]
+GRID_SLICES_BY_CANDIDATE = [(slice(None), slice(None))] * 4 + [
+    (slice(0, NUM_GRID_ROWS // 2), slice(0, NUM_GRID_COLUMNS // 2))
+]
+
+PERMUTATION_RESULT_KEYS = [
+    utils.PERMUTED_PREDICTORS_KEY, utils.HIGHEST_COSTS_KEY,
+    utils.HIGHEST_COST_STDEVS_KEY, utils.ORIGINAL_COST_KEY,
+    utils.STEP1_PREDICTORS_KEY, utils.STEP1_COSTS_KEY,
+    utils.STEP1_COST_STDEVS_KEY
+]
+
+# The following constants are used to test bwo_for_class.
+NUM_BWO_ITERATIONS = 10
+BWO_LEARNING_RATE = 0.01
+BWO_TOLERANCE = 1e-4
+BWO_TARGET_CLASS = 1
+
+BWO_NORMALIZATION_DICT = {
+    utils.REFLECTIVITY_NAME: numpy.array([20., 15.]),
+    utils.TEMPERATURE_NAME: numpy.array([280., 10.]),
+    utils.U_WIND_NAME: numpy.array([5., 10.]),
+    utils.V_WIND_NAME: numpy.array([0., 10.])
+}
+
+
+def _setup_smooth_cnn():
+    """Sets up small CNN with smooth activation functions.
+
+    With max-pooling or leaky ReLU, rounding differences between batch sizes
+    sometimes send the gradient down a different path, after which the two
+    optimized inputs diverge.  A smooth model avoids this.
+
+    :return: cnn_model_object: Untrained instance of `keras.models.Model`.
+    """
+
+    input_layer_object = keras.layers.Input(shape=(
+        NUM_GRID_ROWS, NUM_GRID_COLUMNS, len(CNN_PREDICTOR_NAMES)
+    ))
+
+    current_layer_object = keras.layers.Conv2D(
+        filters=8, kernel_size=(3, 3), activation='tanh'
+    )(input_layer_object)
+
+    current_layer_object = keras.layers.GlobalAveragePooling2D()(
+        current_layer_object)
+
+    current_layer_object = keras.layers.Dense(1, activation='sigmoid')(
+        current_layer_object)
+
+    return keras.models.Model(
+        inputs=input_layer_object, outputs=current_layer_object)
+
+
+def _bwo_one_example_serial(cnn_model_object, input_matrix):
+    """Runs backwards optimization for one example with plain gradient descent.
+
+    This is the original single-example implementation of `utils.bwo_for_class`
+    (mean loss over the one example, gradient normalized by its root mean
+    square, fixed learning rate).
+
+    :param cnn_model_object: Trained instance of `keras.models.Model`.
+    :param input_matrix: numpy array with one example.  The first axis is the
+        example axis, with length 1.
+    :return: optimized_input_matrix: Optimized version of input.
+    """
+
+    # The model has one output neuron, which is the probability of class 1.
+    loss_tensor = K.mean(
+        (cnn_model_object.layers[-1].output[..., 0] - 1) ** 2
+    )
+
+    gradient_tensor = K.gradients(loss_tensor, [cnn_model_object.input])[0]
+    gradient_tensor /= K.maximum(
+        K.sqrt(K.mean(gradient_tensor ** 2)), K.epsilon()
+    )
+
+    inputs_to_loss_and_gradients = K.function(
+        [cnn_model_object.input, K.learning_phase()],
+        [loss_tensor, gradient_tensor]
+    )
+
+    optimized_input_matrix = input_matrix + 0.
+
+    for _ in range(NUM_BWO_ITERATIONS):
+        these_outputs = inputs_to_loss_and_gradients(
+            [optimized_input_matrix, 0]
+        )
+        optimized_input_matrix -= these_outputs[1] * BWO_LEARNING_RATE
+
+    return optimized_input_matrix
+
+
+# The following constants are used to test _upsample_cams.
+NUM_CAMS = 3
+ORIG_CAM_DIMENSIONS = numpy.array([4, 5, 3], dtype=int)
+NEW_CAM_DIMENSIONS = numpy.array([32, 32, 12], dtype=int)
+
+
+def _upsample_cams_with_scipy(class_activation_matrix, new_dimensions):
+    """Upsamples CAMs one at a time with `RegularGridInterpolator`.
+
+    :param class_activation_matrix: See doc for `utils._upsample_cams`.
+    :param new_dimensions: Same.
+    :return: class_activation_matrix: Same.
+    """
+
+    orig_coord_arrays = tuple(
+        numpy.linspace(0, d - 1, num=n)
+        for n, d in zip(class_activation_matrix.shape[1:], new_dimensions)
+    )
+    new_coord_arrays = tuple(
+        numpy.arange(d, dtype=float) for d in new_dimensions
+    )
+
+    query_point_matrix = numpy.stack(
+        numpy.meshgrid(*new_coord_arrays, indexing='ij'), axis=-1
+    )
+
+    return numpy.stack([
+        RegularGridInterpolator(
+            points=orig_coord_arrays, values=this_matrix, method='linear'
+        )(query_point_matrix)
+        for this_matrix in class_activation_matrix
+    ], axis=0)
+
+
+# The following constants are used to test _update_svd.
+NUM_SVD_FEATURES = 12
+NUM_TEST_EXAMPLES_FOR_SVD = 5
+PERCENT_VARIANCE_TO_KEEP = 97.5
+
+# The following constants are used to test _fit_svd_from_moments.
+NUM_BASELINE_EXAMPLES_FOR_MOMENTS = 60
+NUM_TEST_EXAMPLES_FOR_MOMENTS = 30
+NUM_EXAMPLES_PER_MOMENT_CHUNK = 20
+FEATURE_OFFSET_FOR_MOMENTS = 1000.
+
+
+def _compare_svd_models(first_svd_dictionary, second_svd_dictionary):
+    """Compares two SVD models.
+
+    EOFs are compared up to sign, since each EOF is defined only up to sign.
+    Singular values of zero are ignored, since `utils._update_svd` does not add
+    a mode when the new example lies in the span of existing EOFs.
+
+    :param first_svd_dictionary: Dictionary created by `utils._fit_svd` or
+        `utils._update_svd`.
+    :param second_svd_dictionary: Same.
+    :return: are_models_equal: Boolean flag.
+    """
+
+    first_singular_values = first_svd_dictionary[utils.SINGULAR_VALUES_KEY]
+    second_singular_values = second_svd_dictionary[utils.SINGULAR_VALUES_KEY]
+    first_singular_values = first_singular_values[
+        first_singular_values > TOLERANCE]
+    second_singular_values = second_singular_values[
+        second_singular_values > TOLERANCE]
+
+    if len(first_singular_values) != len(second_singular_values):
+        return False
+
+    if not numpy.allclose(
+            first_singular_values, second_singular_values, atol=TOLERANCE
+    ):
+        return False
+
+    if not numpy.isclose(
+            first_svd_dictionary[utils.TOTAL_VARIANCE_KEY],
+            second_svd_dictionary[utils.TOTAL_VARIANCE_KEY], atol=TOLERANCE
+    ):
+        return False
+
+    first_eof_matrix = first_svd_dictionary[utils.EOF_MATRIX_KEY]
+    second_eof_matrix = second_svd_dictionary[utils.EOF_MATRIX_KEY]
+    if first_eof_matrix.shape != second_eof_matrix.shape:
+        return False
+
+    these_dot_products = numpy.sum(first_eof_matrix * second_eof_matrix, axis=0)
+    return numpy.allclose(
+        numpy.absolute(these_dot_products), 1., atol=TOLERANCE
+    )
+
+
+def _apply_cnn_to_permuted_data_serial(
+        cnn_model_object, predictor_matrix, permutation_index_matrix):
+    """Applies CNN to each permuted version of the data, one at a time.
+
+    This is the original implementation, which copies the full predictor matrix
+    for each candidate.
+
+    :param cnn_model_object: See doc for `utils._apply_cnn_to_permuted_data`.
+    :param predictor_matrix: Same.
+    :param permutation_index_matrix: Same.
+    :return: forecast_probability_matrix: Same.
+    """
+
+    num_candidates = len(CHANNEL_INDICES_BY_CANDIDATE)
+    forecast_probability_matrix = numpy.full(
+        (num_candidates, predictor_matrix.shape[0]), numpy.nan)
+
+    for k in range(num_candidates):
+        this_predictor_matrix = predictor_matrix + 0.
+
+        utils._permute_candidate_in_place(
+            predictor_matrix=this_predictor_matrix,
+            channel_indices=CHANNEL_INDICES_BY_CANDIDATE[k],
+            grid_slices=GRID_SLICES_BY_CANDIDATE[k],
+            example_indices=permutation_index_matrix[k, :])
+
+        forecast_probability_matrix[k, :] = utils.apply_cnn(
+            cnn_model_object=cnn_model_object,
+            predictor_matrix=this_predictor_matrix, verbose=False)
+
+    return forecast_probability_matrix
+
+
+def _get_interrupting_cost_function(num_calls_before_interrupt):
+    """Creates cost function that interrupts the permutation test.
+
+    :param num_calls_before_interrupt: Number of calls that return a cost.
+    :return: cost_function: Same as `utils._negative_auc_function`, except that
+        every call after the first `num_calls_before_interrupt` raises
+        `KeyboardInterrupt` (as if the user had stopped the process).
+    """
+
+    num_calls_so_far = [0]
+
+    def cost_function(target_values, class_probabilities):
+        num_calls_so_far[0] += 1
+
+        if num_calls_so_far[0] > num_calls_before_interrupt:
+            raise KeyboardInterrupt
+
+        return utils._negative_auc_function(
+            target_values=target_values,
+            class_probabilities=class_probabilities)
+
+    return cost_function
+
+
+def _compare_permutation_results(first_result_dict, second_result_dict):
+    """Compares two sets of permutation results.
+
+    :param first_result_dict: Dictionary created by
+        `utils.permutation_test_for_cnn`.
+    :param second_result_dict: Same.
+    :return: are_dicts_equal: Boolean flag.
+    """
+
+    for this_key in PERMUTATION_RESULT_KEYS:
+        if this_key in [utils.PERMUTED_PREDICTORS_KEY,
+                        utils.STEP1_PREDICTORS_KEY]:
+            if first_result_dict[this_key] != second_result_dict[this_key]:
+                return False
+
+            continue
+
+        if not numpy.allclose(
+                first_result_dict[this_key], second_result_dict[this_key],
+                atol=TOLERANCE
+        ):
+            return False
+
+    return True
+
+
+class UtilsTests(unittest.TestCase):
+    """Each method is a unit test for utils.py."""
+
+    def _check_apply_cnn_to_permuted_data(self, num_examples_per_batch):
+        """Compares _apply_cnn_to_permuted_data with the serial version.
+
+        :param num_examples_per_batch: See doc for
+            `utils._apply_cnn_to_permuted_data`.
+        """
+
+        cnn_model_object = utils.setup_cnn(
+            num_grid_rows=NUM_GRID_ROWS, num_grid_columns=NUM_GRID_COLUMNS)
+        predictor_matrix, target_values = (
+            utils._prep_data_for_permutation_test(
+                image_dict=CNN_IMAGE_DICT, cnn_metadata_dict=CNN_METADATA_DICT)
+        )
+        orig_predictor_matrix = predictor_matrix + 0.
+
+        random_state_object = numpy.random.RandomState(
+            seed=PERMUTATION_RANDOM_SEED)
+        permutation_index_matrix = numpy.vstack([
+            random_state_object.permutation(NUM_EXAMPLES)
+            for _ in CHANNEL_INDICES_BY_CANDIDATE
+        ])
+
+        this_probability_matrix = utils._apply_cnn_to_permuted_data(
+            cnn_model_object=cnn_model_object,
+            predictor_matrix=predictor_matrix,
+            channel_indices_by_candidate=CHANNEL_INDICES_BY_CANDIDATE,
+            permutation_index_matrix=permutation_index_matrix,
+            grid_slices_by_candidate=GRID_SLICES_BY_CANDIDATE,
+            num_examples_per_batch=num_examples_per_batch, verbose=False)
+
+        expected_probability_matrix = _apply_cnn_to_permuted_data_serial(
+            cnn_model_object=cnn_model_object,
+            predictor_matrix=orig_predictor_matrix,
+            permutation_index_matrix=permutation_index_matrix)
+
+        self.assertTrue(numpy.array_equal(
+            predictor_matrix, orig_predictor_matrix
+        ))
+        self.assertTrue(numpy.allclose(
+            this_probability_matrix, expected_probability_matrix,
+            atol=TOLERANCE
+        ))
+
+        these_costs = numpy.array([
+            utils._negative_auc_function(target_values, p)
+            for p in this_probability_matrix
+        ])
+        these_expected_costs = numpy.array([
+            utils._negative_auc_function(target_values, p)
+            for p in expected_probability_matrix
+        ])
+
+        self.assertTrue(numpy.allclose(
+            these_costs, these_expected_costs, atol=TOLERANCE
+        ))
+
+    def test_apply_cnn_to_permuted_data_one_pass(self):
+        """Ensures correct output from _apply_cnn_to_permuted_data.
+
+        In this case, all candidates fit in one forward pass.
+        """
+
+        self._check_apply_cnn_to_permuted_data(
+            num_examples_per_batch=NUM_EXAMPLES * 10)
+
+    def test_apply_cnn_to_permuted_data_many_passes(self):
+        """Ensures correct output from _apply_cnn_to_permuted_data.
+
+        In this case, two candidates fit in each forward pass, so the last pass
+        contains only one.
+        """
+
+        self._check_apply_cnn_to_permuted_data(
+            num_examples_per_batch=NUM_EXAMPLES * 2)
+
+    def test_apply_cnn_to_permuted_data_in_place(self):
+        """Ensures correct output from _apply_cnn_to_permuted_data.
+
+        In this case, there are more examples than `num_examples_per_batch`, so
+        the predictor matrix itself is the working buffer.
+        """
+
+        self._check_apply_cnn_to_permuted_data(
+            num_examples_per_batch=NUM_EXAMPLES // 4)
+
+    def test_grouped_permutation_test_empty_group(self):
+        """Ensures correct output from grouped_permutation_test_for_cnn.
+
+        In this case, one predictor group is empty, so the method should raise
+        an error.
+        """
+
+        with self.assertRaises(ValueError):
+            utils.grouped_permutation_test_for_cnn(
+                cnn_model_object=None, image_dict=IMAGE_DICT,
+                cnn_metadata_dict=None, output_pickle_file_name=None,
+                predictor_groups=PREDICTOR_GROUPS_EMPTY)
+
+    def test_grouped_permutation_test_overlapping_groups(self):
+        """Ensures correct output from grouped_permutation_test_for_cnn.
+
+        In this case, one predictor is in two groups, so the method should
+        raise an error.
+        """
+
+        with self.assertRaises(ValueError):
+            utils.grouped_permutation_test_for_cnn(
+                cnn_model_object=None, image_dict=IMAGE_DICT,
+                cnn_metadata_dict=None, output_pickle_file_name=None,
+                predictor_groups=PREDICTOR_GROUPS_OVERLAPPING)
+
+    def test_resume_permutation_test_for_cnn(self):
+        """Ensures correct output from resume_permutation_test_for_cnn.
+
+        The test is interrupted at the start of the second step and then
+        resumed, which must give the same results as an uninterrupted run.
+        """
+
+        cnn_model_object = utils.setup_cnn(
+            num_grid_rows=NUM_GRID_ROWS, num_grid_columns=NUM_GRID_COLUMNS)
+        output_dir_name = tempfile.mkdtemp()
+        checkpoint_file_name = '{0:s}/checkpoint.p'.format(output_dir_name)
+
+        try:
+            uninterrupted_result_dict = utils.permutation_test_for_cnn(
+                cnn_model_object=cnn_model_object, image_dict=CNN_IMAGE_DICT,
+                cnn_metadata_dict=CNN_METADATA_DICT,
+                output_pickle_file_name='{0:s}/results.p'.format(
+                    output_dir_name),
+                num_repeats=NUM_PERMUTATION_REPEATS,
+                random_seed=PERMUTATION_RANDOM_SEED)
+
+            # The cost is computed once without permutation and once for each
+            # predictor and repeat in the first step.
+            with self.assertRaises(KeyboardInterrupt):
+                utils.permutation_test_for_cnn(
+                    cnn_model_object=cnn_model_object,
+                    image_dict=CNN_IMAGE_DICT,
+                    cnn_metadata_dict=CNN_METADATA_DICT,
+                    output_pickle_file_name='{0:s}/results.p'.format(
+                        output_dir_name),
+                    cost_function=_get_interrupting_cost_function(
+                        1 + len(CNN_PREDICTOR_NAMES) * NUM_PERMUTATION_REPEATS
+                    ),
+                    num_repeats=NUM_PERMUTATION_REPEATS,
+                    random_seed=PERMUTATION_RANDOM_SEED,
+                    checkpoint_file_name=checkpoint_file_name)
+
+            resumed_result_dict = utils.resume_permutation_test_for_cnn(
+                cnn_model_object=cnn_model_object, image_dict=CNN_IMAGE_DICT,
+                cnn_metadata_dict=CNN_METADATA_DICT,
+                checkpoint_file_name=checkpoint_file_name,
+                output_pickle_file_name='{0:s}/resumed_results.p'.format(
+                    output_dir_name)
+            )
+
+            self.assertFalse(os.path.isfile(
+                '{0:s}.tmp'.format(checkpoint_file_name)
+            ))
+        finally:
+            shutil.rmtree(output_dir_name)
+
+        self.assertTrue(len(
+            uninterrupted_result_dict[utils.PERMUTED_PREDICTORS_KEY]
+        ) == len(CNN_PREDICTOR_NAMES))
+        self.assertTrue(_compare_permutation_results(
+            uninterrupted_result_dict, resumed_result_dict
+        ))
+
+    def test_run_multipass_permutation_test_max_steps(self):
+        """Ensures correct output from _run_multipass_permutation_test.
+
+        In this case, the test stops after one step because of `max_num_steps`.
+        The checkpoint must not be marked as finished, so that the test can be
+        resumed.
+        """
+
+        cnn_model_object = utils.setup_cnn(
+            num_grid_rows=NUM_GRID_ROWS, num_grid_columns=NUM_GRID_COLUMNS)
+        predictor_matrix, target_values = (
+            utils._prep_data_for_permutation_test(
+                image_dict=CNN_IMAGE_DICT, cnn_metadata_dict=CNN_METADATA_DICT)
+        )
+
+        output_dir_name = tempfile.mkdtemp()
+        checkpoint_file_name = '{0:s}/checkpoint.p'.format(output_dir_name)
+
+        try:
+            utils._run_multipass_permutation_test(
+                cnn_model_object=cnn_model_object,
+                predictor_matrix=predictor_matrix,
+                target_values=target_values,
+                candidate_names=CNN_PREDICTOR_NAMES,
+                channel_indices_by_candidate=[
+                    numpy.array([m], dtype=int)
+                    for m in range(len(CNN_PREDICTOR_NAMES))
+                ],
+                cost_function=utils._negative_auc_function,
+                num_repeats=NUM_PERMUTATION_REPEATS,
+                num_examples_per_batch=
+                utils.DEFAULT_NUM_EXAMPLES_PER_PERMUTATION_BATCH,
+                random_state=numpy.random.RandomState(
+                    seed=PERMUTATION_RANDOM_SEED),
+                max_num_steps=1, checkpoint_file_name=checkpoint_file_name)
+
+            checkpoint_dict = utils.read_permutation_checkpoint(
+                checkpoint_file_name)
+
+            resumed_result_dict = utils.resume_permutation_test_for_cnn(
+                cnn_model_object=cnn_model_object, image_dict=CNN_IMAGE_DICT,
+                cnn_metadata_dict=CNN_METADATA_DICT,
+                checkpoint_file_name=checkpoint_file_name,
+                output_pickle_file_name='{0:s}/resumed_results.p'.format(
+                    output_dir_name)
+            )
+        finally:
+            shutil.rmtree(output_dir_name)
+
+        self.assertFalse(checkpoint_dict[utils.IS_FINISHED_KEY])
+        self.assertTrue(
+            len(checkpoint_dict[utils.PERMUTED_PREDICTORS_KEY]) == 1
+        )
+        self.assertTrue(len(
+            resumed_result_dict[utils.PERMUTED_PREDICTORS_KEY]
+        ) == len(CNN_PREDICTOR_NAMES))
+
+    def _check_bwo_batched(self, num_examples):
+        """Compares batched BWO with the original single-example version.
+
+        :param num_examples: Number of examples (starting points) optimized in
+            one call to `utils.bwo_for_class`.
+        """
+
+        cnn_model_object = _setup_smooth_cnn()
+        input_matrix = CNN_IMAGE_DICT[utils.PREDICTOR_MATRIX_KEY][
+            :num_examples, ...]
+
+        optimized_input_matrix = utils.bwo_for_class(
+            cnn_model_object=cnn_model_object, target_class=BWO_TARGET_CLASS,
+            init_function_or_matrices=[input_matrix],
+            num_iterations=NUM_BWO_ITERATIONS, learning_rate=BWO_LEARNING_RATE,
+            optimizer_type_string=utils.GRADIENT_DESCENT_STRING,
+            verbose=False
+        )[0]
+
+        self.assertFalse(numpy.allclose(
+            optimized_input_matrix, input_matrix, atol=BWO_TOLERANCE
+        ))
+
+        for i in range(num_examples):
+            this_expected_matrix = _bwo_one_example_serial(
+                cnn_model_object=cnn_model_object,
+                input_matrix=input_matrix[[i], ...]
+            )
+
+            self.assertTrue(numpy.allclose(
+                optimized_input_matrix[[i], ...], this_expected_matrix,
+                atol=BWO_TOLERANCE
+            ))
+
+    def test_bwo_for_class_one_example(self):
+        """Ensures correct output from bwo_for_class.
+
+        In this case, there is one starting point.
+        """
+
+        self._check_bwo_batched(num_examples=1)
+
+    def test_bwo_for_class_many_examples(self):
+        """Ensures correct output from bwo_for_class.
+
+        In this case, there are several starting points, each of which must be
+        optimized as if it were alone.
+        """
+
+        self._check_bwo_batched(num_examples=3)
+
+    def test_bwo_for_class_physical_limits(self):
+        """Ensures correct output from bwo_for_class.
+
+        In this case, synthetic values are clipped to physical limits, which
+        must hold in denormalized units.  Starting values are spread widely, so
+        that some of them begin outside the limits.
+        """
+
+        cnn_model_object = utils.setup_cnn(
+            num_grid_rows=NUM_GRID_ROWS, num_grid_columns=NUM_GRID_COLUMNS)
+
+        optimized_input_matrix = utils.bwo_for_class(
+            cnn_model_object=cnn_model_object, target_class=BWO_TARGET_CLASS,
+            init_function_or_matrices=[
+                5 * CNN_IMAGE_DICT[utils.PREDICTOR_MATRIX_KEY][:3, ...]
+            ],
+            num_iterations=NUM_BWO_ITERATIONS, learning_rate=0.5,
+            normalization_dict=BWO_NORMALIZATION_DICT,
+            predictor_names=CNN_PREDICTOR_NAMES,
+            physical_limits_dict=utils.DEFAULT_PHYSICAL_LIMITS_DICT,
+            verbose=False
+        )[0]
+
+        denorm_input_matrix = utils.denormalize_images(
+            predictor_matrix=optimized_input_matrix,
+            predictor_names=CNN_PREDICTOR_NAMES,
+            normalization_dict=BWO_NORMALIZATION_DICT)
+
+        for m in range(len(CNN_PREDICTOR_NAMES)):
+            these_limits = utils.DEFAULT_PHYSICAL_LIMITS_DICT[
+                CNN_PREDICTOR_NAMES[m]]
+            these_values = denorm_input_matrix[..., m]
+
+            self.assertTrue(
+                numpy.all(these_values >= these_limits[0] - BWO_TOLERANCE)
+            )
+            self.assertTrue(
+                numpy.all(these_values <= these_limits[1] + BWO_TOLERANCE)
+            )
+            self.assertTrue(numpy.any(
+                numpy.isclose(these_values, these_limits[0],
+                              atol=BWO_TOLERANCE) |
+                numpy.isclose(these_values, these_limits[1],
+                              atol=BWO_TOLERANCE)
+            ))
+
+    def _check_upsample_cams(self, num_spatial_dim):
+        """Compares _upsample_cams with `RegularGridInterpolator`.
+
+        :param num_spatial_dim: Number of spatial dimensions.
+        """
+
+        these_orig_dimensions = ORIG_CAM_DIMENSIONS[:num_spatial_dim]
+        these_new_dimensions = NEW_CAM_DIMENSIONS[:num_spatial_dim]
+
+        this_cam_matrix = RANDOM_STATE_OBJECT.uniform(
+            size=(NUM_CAMS,) + tuple(these_orig_dimensions)
+        )
+
+        this_actual_matrix = utils._upsample_cams(
+            class_activation_matrix=this_cam_matrix,
+            new_dimensions=these_new_dimensions)
+        this_expected_matrix = _upsample_cams_with_scipy(
+            class_activation_matrix=this_cam_matrix,
+            new_dimensions=these_new_dimensions)
+
+        self.assertTrue(
+            this_actual_matrix.shape == this_expected_matrix.shape
+        )
+        self.assertTrue(numpy.allclose(
+            this_actual_matrix, this_expected_matrix, atol=TOLERANCE
+        ))
+
+    def test_upsample_cams_1d(self):
+        """Ensures correct output from _upsample_cams.
+
+        In this case, each CAM is 1-D.
+        """
+
+        self._check_upsample_cams(num_spatial_dim=1)
+
+    def test_upsample_cams_2d(self):
+        """Ensures correct output from _upsample_cams.
+
+        In this case, each CAM is 2-D.
+        """
+
+        self._check_upsample_cams(num_spatial_dim=2)
+
+    def test_upsample_cams_3d(self):
+        """Ensures correct output from _upsample_cams.
+
+        In this case, each CAM is 3-D.
+        """
+
+        self._check_upsample_cams(num_spatial_dim=3)
+
+    def _check_update_svd(self, num_baseline_examples):
+        """Compares _update_svd with a new SVD of the whole baseline set.
+
+        Test examples are moved to the baseline set one at a time.
+
+        :param num_baseline_examples: Number of baseline examples at start.
+        """
+
+        baseline_feature_matrix = RANDOM_STATE_OBJECT.normal(
+            size=(num_baseline_examples, NUM_SVD_FEATURES)
+        )
+        test_feature_matrix = RANDOM_STATE_OBJECT.normal(
+            size=(NUM_TEST_EXAMPLES_FOR_SVD, NUM_SVD_FEATURES)
+        )
+
+        svd_dictionary = utils._fit_svd(
+            baseline_feature_matrix=baseline_feature_matrix,
+            test_feature_matrix=test_feature_matrix,
+            percent_variance_to_keep=PERCENT_VARIANCE_TO_KEEP,
+            method_string=utils.EXACT_SVD_STRING)
+
+        for i in range(NUM_TEST_EXAMPLES_FOR_SVD):
+            svd_dictionary = utils._update_svd(
+                svd_dictionary=svd_dictionary,
+                new_feature_vector=test_feature_matrix[i, ...],
+                percent_variance_to_keep=PERCENT_VARIANCE_TO_KEEP)
+
+            this_refit_dictionary = utils._fit_svd(
+                baseline_feature_matrix=numpy.concatenate(
+                    (baseline_feature_matrix, test_feature_matrix[:(i + 1)]),
+                    axis=0
+                ),
+                test_feature_matrix=test_feature_matrix[(i + 1):],
+                percent_variance_to_keep=PERCENT_VARIANCE_TO_KEEP,
+                method_string=utils.EXACT_SVD_STRING)
+
+            self.assertTrue(
+                _compare_svd_models(svd_dictionary, this_refit_dictionary)
+            )
+
+    def test_update_svd_rank_grows(self):
+        """Ensures correct output from _update_svd.
+
+        In this case, there are fewer baseline examples than features, so each
+        update adds one EOF.
+        """
+
+        self._check_update_svd(num_baseline_examples=NUM_SVD_FEATURES - 8)
+
+    def test_update_svd_full_rank(self):
+        """Ensures correct output from _update_svd.
+
+        In this case, there are more baseline examples than features, so the
+        number of EOFs does not change.
+        """
+
+        self._check_update_svd(num_baseline_examples=3 * NUM_SVD_FEATURES)
+
+    def test_fit_svd_from_moments(self):
+        """Ensures correct output from _fit_svd_from_moments.
+
+        Features are accumulated in chunks, and the resulting model must be the
+        same as from _fit_svd with all features in memory.  Features have a
+        large offset, which the running sums must handle without losing
+        precision.
+        """
+
+        baseline_feature_matrix = FEATURE_OFFSET_FOR_MOMENTS + (
+            RANDOM_STATE_OBJECT.normal(size=(
+                NUM_BASELINE_EXAMPLES_FOR_MOMENTS, NUM_SVD_FEATURES
+            ))
+        )
+        test_feature_matrix = FEATURE_OFFSET_FOR_MOMENTS + (
+            RANDOM_STATE_OBJECT.normal(size=(
+                NUM_TEST_EXAMPLES_FOR_MOMENTS, NUM_SVD_FEATURES
+            ))
+        )
+
+        moment_dict = None
+
+        for this_feature_matrix, this_flag in [
+                (baseline_feature_matrix, True), (test_feature_matrix, False)
+        ]:
+            for i in range(0, this_feature_matrix.shape[0],
+                           NUM_EXAMPLES_PER_MOMENT_CHUNK):
+                moment_dict = utils._update_feature_moments(
+                    moment_dict=moment_dict,
+                    feature_matrix=this_feature_matrix[
+                        i:(i + NUM_EXAMPLES_PER_MOMENT_CHUNK)
+                    ],
+                    is_baseline=this_flag)
+
+        streaming_svd_dictionary = utils._fit_svd_from_moments(
+            moment_dict=moment_dict,
+            percent_variance_to_keep=PERCENT_VARIANCE_TO_KEEP)
+
+        in_memory_svd_dictionary = utils._fit_svd(
+            baseline_feature_matrix=baseline_feature_matrix,
+            test_feature_matrix=test_feature_matrix,
+            percent_variance_to_keep=PERCENT_VARIANCE_TO_KEEP,
+            method_string=utils.COVARIANCE_SVD_STRING)
+
+        for this_key in [utils.FEATURE_MEANS_KEY, utils.FEATURE_STDEVS_KEY]:
+            self.assertTrue(numpy.allclose(
+                streaming_svd_dictionary[this_key],
+                in_memory_svd_dictionary[this_key], atol=TOLERANCE
+            ))
+
+        self.assertTrue(_compare_svd_models(
+            streaming_svd_dictionary, in_memory_svd_dictionary
+        ))
+
+
+if __name__ == '__main__':
+    unittest.main()
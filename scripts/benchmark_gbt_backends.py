@@ -0,0 +1,199 @@
+"""Compares backends for gradient-boosted trees (fit time and AUC)."""
+
+import time
+import argparse
+import numpy
+from module_2 import utils
+
+SEPARATOR_STRING = '\n\n' + '*' * 50 + '\n\n'
+
+FIRST_TRAINING_DATE_STRING = '20100101'
+LAST_TRAINING_DATE_STRING = '20141231'
+FIRST_VALIDATION_DATE_STRING = '20150101'
+LAST_VALIDATION_DATE_STRING = '20151231'
+PCT_LEVEL_FOR_BINARIZATION_THRESHOLD = 90.
+
+FEATURE_DIR_ARG_NAME = 'input_feature_dir_name'
+BACKENDS_ARG_NAME = 'backend_strings'
+NUM_TREES_ARG_NAME = 'num_trees'
+LEARNING_RATE_ARG_NAME = 'learning_rate'
+MIN_PER_SPLIT_ARG_NAME = 'min_examples_at_split'
+MIN_PER_LEAF_ARG_NAME = 'min_examples_at_leaf'
+
+FEATURE_DIR_HELP_STRING = (
+    'Name of directory with feature (CSV) files for training and validation.')
+
+BACKENDS_HELP_STRING = (
+    'List of backends to compare.  Each must be in the following list:\n{0:s}'
+).format(str(utils.VALID_GBT_BACKEND_STRINGS))
+
+NUM_TREES_HELP_STRING = 'Number of trees in each model.'
+LEARNING_RATE_HELP_STRING = 'Learning rate.'
+MIN_PER_SPLIT_HELP_STRING = 'Minimum number of examples at split node.'
+MIN_PER_LEAF_HELP_STRING = 'Minimum number of examples at leaf node.'
+
+INPUT_ARG_PARSER = argparse.ArgumentParser()
+INPUT_ARG_PARSER.add_argument(
+    '--' + FEATURE_DIR_ARG_NAME, type=str, required=False,
+    default=utils.DEFAULT_FEATURE_DIR_NAME, help=FEATURE_DIR_HELP_STRING)
+
+INPUT_ARG_PARSER.add_argument(
+    '--' + BACKENDS_ARG_NAME, type=str, nargs='+', required=False,
+    default=utils.VALID_GBT_BACKEND_STRINGS, help=BACKENDS_HELP_STRING)
+
+INPUT_ARG_PARSER.add_argument(
+    '--' + NUM_TREES_ARG_NAME, type=int, required=False, default=100,
+    help=NUM_TREES_HELP_STRING)
+
+INPUT_ARG_PARSER.add_argument(
+    '--' + LEARNING_RATE_ARG_NAME, type=float, required=False, default=0.1,
+    help=LEARNING_RATE_HELP_STRING)
+
+INPUT_ARG_PARSER.add_argument(
+    '--' + MIN_PER_SPLIT_ARG_NAME, type=int, required=False, default=500,
+    help=MIN_PER_SPLIT_HELP_STRING)
+
+INPUT_ARG_PARSER.add_argument(
+    '--' + MIN_PER_LEAF_ARG_NAME, type=int, required=False, default=200,
+    help=MIN_PER_LEAF_HELP_STRING)
+
+
+def _read_dataset(csv_file_names, binarization_threshold,
+                  normalization_dict=None):
+    """Reads dataset from feature files and normalizes predictors.
+
+    :param csv_file_names: 1-D list of paths to input files.
+    :param binarization_threshold: Binarization threshold for target variable.
+    :param normalization_dict: See doc for `utils.normalize_predictors`.  If
+        None, normalization params will be computed from these files.
+    :return: dataset_dict: Dictionary created by `utils.create_dataset`.
+    :return: normalization_dict: See doc for `utils.normalize_predictors`.
+    """
+
+    _, predictor_table, target_table = utils.read_many_feature_files(
+        csv_file_names)
+
+    predictor_table, normalization_dict = utils.normalize_predictors(
+        predictor_table=predictor_table, normalization_dict=normalization_dict)
+
+    dataset_dict = utils.create_dataset(
+        predictor_table=predictor_table, target_table=target_table)
+
+    dataset_dict[utils.BINARIZED_TARGET_VALUES_KEY] = (
+        utils.binarize_target_values(
+            target_values=dataset_dict[utils.TARGET_VALUES_KEY],
+            binarization_threshold=binarization_threshold)
+    )
+
+    return dataset_dict, normalization_dict
+
+
+def _run(input_feature_dir_name, backend_strings, num_trees, learning_rate,
+         min_examples_at_split, min_examples_at_leaf):
+    """Compares backends for gradient-boosted trees (fit time and AUC).
+
+    This is effectively the main method.
+
+    :param input_feature_dir_name: See documentation at top of file.
+    :param backend_strings: Same.
+    :param num_trees: Same.
+    :param learning_rate: Same.
+    :param min_examples_at_split: Same.
+    :param min_examples_at_leaf: Same.
+    """
+
+    for this_backend_string in backend_strings:
+        utils.check_gbt_backend(this_backend_string)
+
+    training_file_names = utils.find_many_feature_files(
+        first_date_string=FIRST_TRAINING_DATE_STRING,
+        last_date_string=LAST_TRAINING_DATE_STRING,
+        feature_dir_name=input_feature_dir_name)
+
+    validation_file_names = utils.find_many_feature_files(
+        first_date_string=FIRST_VALIDATION_DATE_STRING,
+        last_date_string=LAST_VALIDATION_DATE_STRING,
+        feature_dir_name=input_feature_dir_name)
+
+    binarization_threshold = utils.get_binarization_threshold(
+        csv_file_names=training_file_names,
+        percentile_level=PCT_LEVEL_FOR_BINARIZATION_THRESHOLD)
+    print(SEPARATOR_STRING)
+
+    # As in the notebook, validation data are normalized with params from the
+    # training data.
+    training_dataset_dict, normalization_dict = _read_dataset(
+        csv_file_names=training_file_names,
+        binarization_threshold=binarization_threshold)
+    print(SEPARATOR_STRING)
+
+    validation_dataset_dict = _read_dataset(
+        csv_file_names=validation_file_names,
+        binarization_threshold=binarization_threshold,
+        normalization_dict=normalization_dict
+    )[0]
+    print(SEPARATOR_STRING)
+
+    training_event_frequency = numpy.mean(
+        training_dataset_dict[utils.BINARIZED_TARGET_VALUES_KEY]
+    )
+    num_predictors = len(training_dataset_dict[utils.PREDICTOR_NAMES_KEY])
+
+    fit_time_by_backend_sec = {}
+    evaluation_dict_by_backend = {}
+
+    for this_backend_string in backend_strings:
+        this_model_object = utils.setup_classification_gbt(
+            max_predictors_per_split=num_predictors, num_trees=num_trees,
+            learning_rate=learning_rate,
+            min_examples_at_split=min_examples_at_split,
+            min_examples_at_leaf=min_examples_at_leaf,
+            backend_string=this_backend_string, num_predictors=num_predictors)
+
+        this_start_time_sec = time.time()
+        utils.train_classification_gbt(
+            model_object=this_model_object,
+            training_dataset_dict=training_dataset_dict)
+        fit_time_by_backend_sec[this_backend_string] = (
+            time.time() - this_start_time_sec
+        )
+
+        these_probabilities = this_model_object.predict_proba(
+            validation_dataset_dict[utils.PREDICTOR_MATRIX_KEY]
+        )[:, 1]
+
+        evaluation_dict_by_backend[this_backend_string] = (
+            utils.eval_binary_classifn(
+                observed_labels=validation_dataset_dict[
+                    utils.BINARIZED_TARGET_VALUES_KEY],
+                forecast_probabilities=these_probabilities,
+                training_event_frequency=training_event_frequency,
+                verbose=False, create_plots=False)
+        )
+
+        print(SEPARATOR_STRING)
+
+    for this_backend_string in backend_strings:
+        this_evaluation_dict = evaluation_dict_by_backend[this_backend_string]
+
+        print((
+            'Backend = "{0:s}" ... fit time = {1:.1f} s ... validation AUC = '
+            '{2:.4f} ... validation BSS = {3:.4f}'
+        ).format(
+            this_backend_string, fit_time_by_backend_sec[this_backend_string],
+            this_evaluation_dict[utils.AUC_KEY],
+            this_evaluation_dict[utils.BRIER_SKILL_SCORE_KEY]
+        ))
+
+
+if __name__ == '__main__':
+    INPUT_ARG_OBJECT = INPUT_ARG_PARSER.parse_args()
+
+    _run(
+        input_feature_dir_name=getattr(INPUT_ARG_OBJECT, FEATURE_DIR_ARG_NAME),
+        backend_strings=getattr(INPUT_ARG_OBJECT, BACKENDS_ARG_NAME),
+        num_trees=getattr(INPUT_ARG_OBJECT, NUM_TREES_ARG_NAME),
+        learning_rate=getattr(INPUT_ARG_OBJECT, LEARNING_RATE_ARG_NAME),
+        min_examples_at_split=getattr(INPUT_ARG_OBJECT, MIN_PER_SPLIT_ARG_NAME),
+        min_examples_at_leaf=getattr(INPUT_ARG_OBJECT, MIN_PER_LEAF_ARG_NAME)
+    )
@@ -0,0 +1,202 @@
+"""Benchmarks latency of repeated calls to interpretation methods.
+
+Each call uses one example.  If compiled gradient functions are reused
+properly, latency and the number of ops in the TensorFlow graph stay flat as
+the number of calls grows.
+"""
+
+import time
+import argparse
+import numpy
+from keras import backend as K
+from module_4 import utils
+
+SEPARATOR_STRING = '\n\n' + '*' * 50 + '\n\n'
+
+SALIENCY_METHOD_STRING = 'saliency'
+GRADCAM_METHOD_STRING = 'gradcam'
+BWO_METHOD_STRING = 'bwo'
+VALID_METHOD_STRINGS = [
+    SALIENCY_METHOD_STRING, GRADCAM_METHOD_STRING, BWO_METHOD_STRING
+]
+
+CNN_FILE_ARG_NAME = 'input_cnn_file_name'
+IMAGE_DIR_ARG_NAME = 'input_image_dir_name'
+FIRST_DATE_ARG_NAME = 'first_date_string'
+LAST_DATE_ARG_NAME = 'last_date_string'
+METHOD_ARG_NAME = 'method_string'
+TARGET_LAYER_ARG_NAME = 'target_layer_name'
+NUM_CALLS_ARG_NAME = 'num_calls'
+NUM_CALLS_PER_REPORT_ARG_NAME = 'num_calls_per_report'
+
+CNN_FILE_HELP_STRING = (
+    'Path to file with trained CNN.  Will be read by `utils.read_keras_model`.')
+
+IMAGE_DIR_HELP_STRING = (
+    'Name of directory with image (NetCDF) files.  Examples will be drawn from '
+    'these files.')
+
+DATE_HELP_STRING = (
+    'Date (format "yyyymmdd").  Examples will be drawn from the period '
+    '`{0:s}`...`{1:s}`.'
+).format(FIRST_DATE_ARG_NAME, LAST_DATE_ARG_NAME)
+
+METHOD_HELP_STRING = (
+    'Interpretation method to benchmark.  Must be in the following list:'
+    '\n{0:s}'
+).format(str(VALID_METHOD_STRINGS))
+
+TARGET_LAYER_HELP_STRING = (
+    'Name of target layer for Grad-CAM.  Used only if `{0:s} = "{1:s}"`.'
+).format(METHOD_ARG_NAME, GRADCAM_METHOD_STRING)
+
+NUM_CALLS_HELP_STRING = 'Total number of calls to the interpretation method.'
+
+NUM_CALLS_PER_REPORT_HELP_STRING = (
+    'Mean latency and graph size will be reported after every `{0:s}` calls.'
+).format(NUM_CALLS_PER_REPORT_ARG_NAME)
+
+DEFAULT_IMAGE_DIR_NAME = (
+    '/condo/swatwork/ralager/ams2019_short_course/'
+    'track_data_ncar_ams_3km_nc_small')
+DEFAULT_TARGET_LAYER_NAME = 'batch_normalization_4'
+DEFAULT_NUM_CALLS = 10000
+DEFAULT_NUM_CALLS_PER_REPORT = 1000
+
+INPUT_ARG_PARSER = argparse.ArgumentParser()
+INPUT_ARG_PARSER.add_argument(
+    '--' + CNN_FILE_ARG_NAME, type=str, required=True,
+    help=CNN_FILE_HELP_STRING)
+
+INPUT_ARG_PARSER.add_argument(
+    '--' + IMAGE_DIR_ARG_NAME, type=str, required=False,
+    default=DEFAULT_IMAGE_DIR_NAME, help=IMAGE_DIR_HELP_STRING)
+
+INPUT_ARG_PARSER.add_argument(
+    '--' + FIRST_DATE_ARG_NAME, type=str, required=True, help=DATE_HELP_STRING)
+
+INPUT_ARG_PARSER.add_argument(
+    '--' + LAST_DATE_ARG_NAME, type=str, required=True, help=DATE_HELP_STRING)
+
+INPUT_ARG_PARSER.add_argument(
+    '--' + METHOD_ARG_NAME, type=str, required=False,
+    default=SALIENCY_METHOD_STRING, help=METHOD_HELP_STRING)
+
+INPUT_ARG_PARSER.add_argument(
+    '--' + TARGET_LAYER_ARG_NAME, type=str, required=False,
+    default=DEFAULT_TARGET_LAYER_NAME, help=TARGET_LAYER_HELP_STRING)
+
+INPUT_ARG_PARSER.add_argument(
+    '--' + NUM_CALLS_ARG_NAME, type=int, required=False,
+    default=DEFAULT_NUM_CALLS, help=NUM_CALLS_HELP_STRING)
+
+INPUT_ARG_PARSER.add_argument(
+    '--' + NUM_CALLS_PER_REPORT_ARG_NAME, type=int, required=False,
+    default=DEFAULT_NUM_CALLS_PER_REPORT, help=NUM_CALLS_PER_REPORT_HELP_STRING)
+
+
+def _run(input_cnn_file_name, input_image_dir_name, first_date_string,
+         last_date_string, method_string, target_layer_name, num_calls,
+         num_calls_per_report):
+    """Benchmarks latency of repeated calls to interpretation methods.
+
+    This is effectively the main method.
+
+    :param input_cnn_file_name: See documentation at top of file.
+    :param input_image_dir_name: Same.
+    :param first_date_string: Same.
+    :param last_date_string: Same.
+    :param method_string: Same.
+    :param target_layer_name: Same.
+    :param num_calls: Same.
+    :param num_calls_per_report: Same.
+    :raises: ValueError: if `method_string not in VALID_METHOD_STRINGS`.
+    """
+
+    if method_string not in VALID_METHOD_STRINGS:
+        error_string = (
+            '\n{0:s}\nValid methods (listed above) do not include "{1:s}".'
+        ).format(str(VALID_METHOD_STRINGS), method_string)
+
+        raise ValueError(error_string)
+
+    # Read CNN and images.
+    cnn_metafile_name = utils.find_model_metafile(
+        model_file_name=input_cnn_file_name, raise_error_if_missing=True)
+
+    print('Reading trained CNN from: "{0:s}"...'.format(input_cnn_file_name))
+    cnn_model_object = utils.read_keras_model(input_cnn_file_name)
+
+    print('Reading CNN metadata from: "{0:s}"...'.format(cnn_metafile_name))
+    cnn_metadata_dict = utils.read_model_metadata(cnn_metafile_name)
+    print(SEPARATOR_STRING)
+
+    image_file_names = utils.find_many_image_files(
+        first_date_string=first_date_string, last_date_string=last_date_string,
+        image_dir_name=input_image_dir_name)
+
+    image_dict = utils.read_many_image_files(image_file_names)
+    print(SEPARATOR_STRING)
+
+    predictor_matrix, _ = utils.normalize_images(
+        predictor_matrix=image_dict[utils.PREDICTOR_MATRIX_KEY],
+        predictor_names=image_dict[utils.PREDICTOR_NAMES_KEY],
+        normalization_dict=cnn_metadata_dict[utils.NORMALIZATION_DICT_KEY]
+    )
+
+    num_examples = predictor_matrix.shape[0]
+    session_object = utils.InterpretationSession(cnn_model_object)
+    graph_object = K.get_session().graph
+
+    # Run benchmark.
+    latency_by_call_sec = numpy.full(num_calls, numpy.nan)
+
+    for i in range(num_calls):
+        this_matrix = predictor_matrix[[numpy.mod(i, num_examples)], ...]
+        this_start_time_sec = time.time()
+
+        if method_string == SALIENCY_METHOD_STRING:
+            session_object.get_saliency_for_class(
+                target_class=1, list_of_input_matrices=[this_matrix])
+        elif method_string == GRADCAM_METHOD_STRING:
+            session_object.run_gradcam(
+                list_of_input_matrices=[this_matrix], target_class=1,
+                target_layer_name=target_layer_name)
+        else:
+            session_object.bwo_for_class(
+                target_class=1, init_function_or_matrices=[this_matrix],
+                num_iterations=1, verbose=False)
+
+        latency_by_call_sec[i] = time.time() - this_start_time_sec
+
+        if numpy.mod(i + 1, num_calls_per_report) != 0 and i != num_calls - 1:
+            continue
+
+        this_first_index = num_calls_per_report * (i // num_calls_per_report)
+
+        print((
+            'Calls {0:d}-{1:d}: mean latency = {2:.4f} s ... median = {3:.4f} '
+            's ... graph ops = {4:d} ... compiled functions = {5:d}'
+        ).format(
+            this_first_index + 1, i + 1,
+            numpy.mean(latency_by_call_sec[this_first_index:(i + 1)]),
+            numpy.median(latency_by_call_sec[this_first_index:(i + 1)]),
+            len(graph_object.get_operations()),
+            session_object.get_num_compiled_functions()
+        ))
+
+
+if __name__ == '__main__':
+    INPUT_ARG_OBJECT = INPUT_ARG_PARSER.parse_args()
+
+    _run(
+        input_cnn_file_name=getattr(INPUT_ARG_OBJECT, CNN_FILE_ARG_NAME),
+        input_image_dir_name=getattr(INPUT_ARG_OBJECT, IMAGE_DIR_ARG_NAME),
+        first_date_string=getattr(INPUT_ARG_OBJECT, FIRST_DATE_ARG_NAME),
+        last_date_string=getattr(INPUT_ARG_OBJECT, LAST_DATE_ARG_NAME),
+        method_string=getattr(INPUT_ARG_OBJECT, METHOD_ARG_NAME),
+        target_layer_name=getattr(INPUT_ARG_OBJECT, TARGET_LAYER_ARG_NAME),
+        num_calls=getattr(INPUT_ARG_OBJECT, NUM_CALLS_ARG_NAME),
+        num_calls_per_report=getattr(
+            INPUT_ARG_OBJECT, NUM_CALLS_PER_REPORT_ARG_NAME)
+    )
@@ -0,0 +1,204 @@
+"""Benchmarks throughput of tree-based models (scikit-learn vs. compiled).
+
+The model (decision tree, random forest, or gradient-boosted trees) is read
+from a Pickle file created by `utils.write_model`.  Before timing, this script
+checks that the compiled model (`tree_inference`) gives the same probabilities
+as scikit-learn.  The compiled model is what `model_store.apply_model` uses to
+score tree-based models, so this script measures the cost of scoring without
+scikit-learn.
+"""
+
+import time
+import argparse
+import numpy
+from module_2 import utils
+from module_2 import tree_inference
+
+SEPARATOR_STRING = '\n\n' + '*' * 50 + '\n\n'
+
+MODEL_FILE_ARG_NAME = 'input_model_file_name'
+FEATURE_DIR_ARG_NAME = 'input_feature_dir_name'
+FIRST_DATE_ARG_NAME = 'first_date_string'
+LAST_DATE_ARG_NAME = 'last_date_string'
+BLOCK_SIZE_ARG_NAME = 'num_examples_per_block'
+NUM_THREADS_ARG_NAME = 'num_threads_list'
+NUM_REPEATS_ARG_NAME = 'num_repeats'
+
+MODEL_FILE_HELP_STRING = (
+    'Path to file with trained model.  Will be read by `utils.read_model`.')
+
+FEATURE_DIR_HELP_STRING = (
+    'Name of directory with feature (CSV) files.  Examples will be drawn from '
+    'these files.')
+
+DATE_HELP_STRING = (
+    'Date (format "yyyymmdd").  Examples will be drawn from the period '
+    '`{0:s}`...`{1:s}`.'
+).format(FIRST_DATE_ARG_NAME, LAST_DATE_ARG_NAME)
+
+BLOCK_SIZE_HELP_STRING = 'Number of examples per block for compiled model.'
+
+NUM_THREADS_HELP_STRING = (
+    'List of thread counts.  The compiled model will be timed with each.')
+
+NUM_REPEATS_HELP_STRING = (
+    'Number of times to apply each model.  The median time will be reported.')
+
+DEFAULT_NUM_THREADS_LIST = [1, 2, 4, 8]
+DEFAULT_NUM_REPEATS = 5
+
+INPUT_ARG_PARSER = argparse.ArgumentParser()
+INPUT_ARG_PARSER.add_argument(
+    '--' + MODEL_FILE_ARG_NAME, type=str, required=True,
+    help=MODEL_FILE_HELP_STRING)
+
+INPUT_ARG_PARSER.add_argument(
+    '--' + FEATURE_DIR_ARG_NAME, type=str, required=False,
+    default=utils.DEFAULT_FEATURE_DIR_NAME, help=FEATURE_DIR_HELP_STRING)
+
+INPUT_ARG_PARSER.add_argument(
+    '--' + FIRST_DATE_ARG_NAME, type=str, required=True, help=DATE_HELP_STRING)
+
+INPUT_ARG_PARSER.add_argument(
+    '--' + LAST_DATE_ARG_NAME, type=str, required=True, help=DATE_HELP_STRING)
+
+INPUT_ARG_PARSER.add_argument(
+    '--' + BLOCK_SIZE_ARG_NAME, type=int, required=False,
+    default=tree_inference.DEFAULT_NUM_EXAMPLES_PER_BLOCK,
+    help=BLOCK_SIZE_HELP_STRING)
+
+INPUT_ARG_PARSER.add_argument(
+    '--' + NUM_THREADS_ARG_NAME, type=int, nargs='+', required=False,
+    default=DEFAULT_NUM_THREADS_LIST, help=NUM_THREADS_HELP_STRING)
+
+INPUT_ARG_PARSER.add_argument(
+    '--' + NUM_REPEATS_ARG_NAME, type=int, required=False,
+    default=DEFAULT_NUM_REPEATS, help=NUM_REPEATS_HELP_STRING)
+
+
+def _time_function(function_object, num_repeats):
+    """Times function with no arguments.
+
+    :param function_object: Function to time.
+    :param num_repeats: Number of calls.
+    :return: median_time_sec: Median time per call.
+    :return: output: Output from last call.
+    """
+
+    time_by_call_sec = numpy.full(num_repeats, numpy.nan)
+
+    for i in range(num_repeats):
+        this_start_time_sec = time.time()
+        output = function_object()
+        time_by_call_sec[i] = time.time() - this_start_time_sec
+
+    return numpy.median(time_by_call_sec), output
+
+
+def _run(input_model_file_name, input_feature_dir_name, first_date_string,
+         last_date_string, num_examples_per_block, num_threads_list,
+         num_repeats):
+    """Benchmarks throughput of tree-based models (scikit-learn vs. compiled).
+
+    This is effectively the main method.
+
+    :param input_model_file_name: See documentation at top of file.
+    :param input_feature_dir_name: Same.
+    :param first_date_string: Same.
+    :param last_date_string: Same.
+    :param num_examples_per_block: Same.
+    :param num_threads_list: Same.
+    :param num_repeats: Same.
+    :raises: ValueError: if the compiled model does not give the same
+        probabilities as scikit-learn.
+    """
+
+    print('Reading model from: "{0:s}"...'.format(input_model_file_name))
+    model_object = utils.read_model(input_model_file_name)
+
+    # With multiple jobs, random forests in scikit-learn add trees in a random
+    # order, so results are not reproducible to the last bit.
+    model_parameter_dict = model_object.get_params()
+    if 'n_jobs' in model_parameter_dict:
+        model_object.set_params(n_jobs=1)
+    if 'verbose' in model_parameter_dict:
+        model_object.set_params(verbose=0)
+
+    feature_file_names = utils.find_many_feature_files(
+        first_date_string=first_date_string, last_date_string=last_date_string,
+        feature_dir_name=input_feature_dir_name)
+
+    _, predictor_table, _ = utils.read_many_feature_files(feature_file_names)
+    print(SEPARATOR_STRING)
+
+    # The training-set normalization parameters are not stored with the model,
+    # so predictors are normalized with parameters from these files.  This is
+    # close enough to measure throughput.
+    predictor_table, _ = utils.normalize_predictors(predictor_table)
+    predictor_matrix = numpy.ascontiguousarray(
+        predictor_table.values, dtype=numpy.float32)
+    num_examples = predictor_matrix.shape[0]
+
+    compile_time_sec, model_dict = _time_function(
+        function_object=lambda: tree_inference.compile_model(model_object),
+        num_repeats=1)
+
+    print('Compiled {0:d} trees in {1:.3f} seconds.'.format(
+        model_dict[tree_inference.NUM_TREES_KEY], compile_time_sec
+    ))
+
+    sklearn_time_sec, sklearn_probability_matrix = _time_function(
+        function_object=lambda: model_object.predict_proba(predictor_matrix),
+        num_repeats=num_repeats)
+
+    print((
+        'scikit-learn: {0:.3f} seconds for {1:d} examples ({2:.0f} examples '
+        'per second)'
+    ).format(
+        sklearn_time_sec, num_examples, num_examples / sklearn_time_sec
+    ))
+
+    for this_num_threads in num_threads_list:
+        this_time_sec, this_probability_matrix = _time_function(
+            function_object=lambda: tree_inference.predict_proba(
+                model_dict=model_dict, predictor_matrix=predictor_matrix,
+                num_examples_per_block=num_examples_per_block,
+                num_threads=this_num_threads),
+            num_repeats=num_repeats)
+
+        if not numpy.array_equal(
+                this_probability_matrix, sklearn_probability_matrix):
+            error_string = (
+                'Compiled model ({0:d} threads) does not give the same '
+                'probabilities as scikit-learn.  Max absolute difference = '
+                '{1:.4e}.'
+            ).format(
+                this_num_threads,
+                numpy.max(numpy.absolute(
+                    this_probability_matrix - sklearn_probability_matrix
+                ))
+            )
+
+            raise ValueError(error_string)
+
+        print((
+            'Compiled ({0:d} threads): {1:.3f} seconds ({2:.0f} examples per '
+            'second; {3:.2f} times scikit-learn)'
+        ).format(
+            this_num_threads, this_time_sec, num_examples / this_time_sec,
+            sklearn_time_sec / this_time_sec
+        ))
+
+
+if __name__ == '__main__':
+    INPUT_ARG_OBJECT = INPUT_ARG_PARSER.parse_args()
+
+    _run(
+        input_model_file_name=getattr(INPUT_ARG_OBJECT, MODEL_FILE_ARG_NAME),
+        input_feature_dir_name=getattr(INPUT_ARG_OBJECT, FEATURE_DIR_ARG_NAME),
+        first_date_string=getattr(INPUT_ARG_OBJECT, FIRST_DATE_ARG_NAME),
+        last_date_string=getattr(INPUT_ARG_OBJECT, LAST_DATE_ARG_NAME),
+        num_examples_per_block=getattr(INPUT_ARG_OBJECT, BLOCK_SIZE_ARG_NAME),
+        num_threads_list=getattr(INPUT_ARG_OBJECT, NUM_THREADS_ARG_NAME),
+        num_repeats=getattr(INPUT_ARG_OBJECT, NUM_REPEATS_ARG_NAME)
+    )
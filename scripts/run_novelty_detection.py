@@ -23,6 +23,10 @@ LAST_DATE_ARG_NAME = 'last_date_string'
 NUM_BASELINE_EX_ARG_NAME = 'num_baseline_examples'
 NUM_TEST_EX_ARG_NAME = 'num_test_examples'
 PERCENT_VARIANCE_ARG_NAME = 'percent_svd_variance_to_keep'
+STREAMING_ARG_NAME = 'use_streaming'
+FIRST_BASELINE_DATE_ARG_NAME = 'first_baseline_date_string'
+LAST_BASELINE_DATE_ARG_NAME = 'last_baseline_date_string'
+NUM_CANDIDATES_ARG_NAME = 'num_candidates'
 OUTPUT_DIR_ARG_NAME = 'output_dir_name'
 
 UCN_FILE_HELP_STRING = (
@@ -59,6 +63,31 @@ PERCENT_VARIANCE_HELP_STRING = (
     'Percent of variance to retain in the SVD (singular-value decomposition) '
     'model.  This determines how many modes (eigenvectors) are kept.')
 
+STREAMING_HELP_STRING = (
+    'Boolean flag.  If 1, will use '
+    '`short_course.do_streaming_novelty_detection`, which reads one file at a '
+    'time.  All examples from the period '
+    '`{0:s}`...`{1:s}` will be test examples, and all examples from the period '
+    '`{2:s}`...`{3:s}` will be baseline examples.  `{4:s}` will be the number '
+    'of novel test examples to find, and `{5:s}` will be ignored.  If 0, will '
+    'use `short_course.do_novelty_detection`, which holds all images in memory.'
+).format(FIRST_DATE_ARG_NAME, LAST_DATE_ARG_NAME, FIRST_BASELINE_DATE_ARG_NAME,
+         LAST_BASELINE_DATE_ARG_NAME, NUM_TEST_EX_ARG_NAME,
+         NUM_BASELINE_EX_ARG_NAME)
+
+BASELINE_DATE_HELP_STRING = (
+    'Date (format "yyyymmdd").  Used only if `{0:s} = 1`, in which case all '
+    'examples from the period `{1:s}`...`{2:s}` will be baseline examples.'
+).format(STREAMING_ARG_NAME, FIRST_BASELINE_DATE_ARG_NAME,
+         LAST_BASELINE_DATE_ARG_NAME)
+
+NUM_CANDIDATES_HELP_STRING = (
+    'Used only if `{0:s} = 1`.  Number of candidate test examples (with the '
+    'highest reconstruction errors) kept in memory.  If you make this '
+    'non-positive, will use the default in '
+    '`short_course.do_streaming_novelty_detection`.'
+).format(STREAMING_ARG_NAME)
+
 OUTPUT_DIR_HELP_STRING = (
     'Name of output directory.  The dictionary created by '
     '`short_course.do_novelty_detection`, as well as plots, will be saved here.'
@@ -99,6 +128,22 @@ INPUT_ARG_PARSER.add_argument(
     '--' + PERCENT_VARIANCE_ARG_NAME, type=float, required=False,
     default=DEFAULT_PCT_VARIANCE_TO_KEEP, help=PERCENT_VARIANCE_HELP_STRING)
 
+INPUT_ARG_PARSER.add_argument(
+    '--' + STREAMING_ARG_NAME, type=int, required=False, default=0,
+    help=STREAMING_HELP_STRING)
+
+INPUT_ARG_PARSER.add_argument(
+    '--' + FIRST_BASELINE_DATE_ARG_NAME, type=str, required=False, default='',
+    help=BASELINE_DATE_HELP_STRING)
+
+INPUT_ARG_PARSER.add_argument(
+    '--' + LAST_BASELINE_DATE_ARG_NAME, type=str, required=False, default='',
+    help=BASELINE_DATE_HELP_STRING)
+
+INPUT_ARG_PARSER.add_argument(
+    '--' + NUM_CANDIDATES_ARG_NAME, type=int, required=False, default=-1,
+    help=NUM_CANDIDATES_HELP_STRING)
+
 INPUT_ARG_PARSER.add_argument(
     '--' + OUTPUT_DIR_ARG_NAME, type=str, required=True,
     help=OUTPUT_DIR_HELP_STRING)
@@ -108,7 +153,8 @@ def _write_novelty_results(novelty_dict, pickle_file_name):
     """Writes novelty-detection results to Pickle file.
 
     :param novelty_dict: Dictionary created by
-        `short_course.do_novelty_detection`.
+        `short_course.do_novelty_detection` or
+        `short_course.do_streaming_novelty_detection`.
     :param pickle_file_name: Path to output file.
     """
 
@@ -119,22 +165,20 @@ def _write_novelty_results(novelty_dict, pickle_file_name):
     pickle_file_handle.close()
 
 
-def _plot_novelty_detection(image_dict, novelty_dict, test_index,
+def _plot_novelty_detection(predictor_names, novelty_dict, test_index,
                             top_output_dir_name):
     """Plots results of novelty detection.
 
-    :param image_dict: Dictionary created by
-        `short_course.read_many_image_files`, containing input data for novelty
-        detection.
+    :param predictor_names: 1-D list with names of predictor variables.
     :param novelty_dict: Dictionary created by
-        `short_course.do_novelty_detection`, containing results.
+        `short_course.do_novelty_detection` or
+        `short_course.do_streaming_novelty_detection`, containing results.
     :param test_index: Array index.  The [i]th-most novel test example will be
         plotted, where i = `test_index`.
     :param top_output_dir_name: Name of top-level output directory.  Figures
         will be saved here.
     """
 
-    predictor_names = image_dict[short_course.PREDICTOR_NAMES_KEY]
     temperature_index = predictor_names.index(short_course.TEMPERATURE_NAME)
     reflectivity_index = predictor_names.index(short_course.REFLECTIVITY_NAME)
 
@@ -217,7 +261,9 @@ def _plot_novelty_detection(image_dict, novelty_dict, test_index,
 
 def _run(input_ucn_file_name, input_image_dir_name, first_date_string,
          last_date_string, num_baseline_examples, num_test_examples,
-         percent_svd_variance_to_keep, top_output_dir_name):
+         percent_svd_variance_to_keep, use_streaming,
+         first_baseline_date_string, last_baseline_date_string, num_candidates,
+         top_output_dir_name):
     """Runs novelty detection.
 
     This is effectively the main method.
@@ -229,6 +275,10 @@ def _run(input_ucn_file_name, input_image_dir_name, first_date_string,
     :param num_baseline_examples: Same.
     :param num_test_examples: Same.
     :param percent_svd_variance_to_keep: Same.
+    :param use_streaming: Same.
+    :param first_baseline_date_string: Same.
+    :param last_baseline_date_string: Same.
+    :param num_candidates: Same.
     :param top_output_dir_name: Same.
     """
 
@@ -255,6 +305,52 @@ def _run(input_ucn_file_name, input_image_dir_name, first_date_string,
     cnn_metadata_dict = short_course.read_model_metadata(cnn_metafile_name)
     print(SEPARATOR_STRING)
 
+    if use_streaming:
+        test_file_names = short_course.find_many_image_files(
+            first_date_string=first_date_string,
+            last_date_string=last_date_string,
+            image_dir_name=input_image_dir_name)
+
+        baseline_file_names = short_course.find_many_image_files(
+            first_date_string=first_baseline_date_string,
+            last_date_string=last_baseline_date_string,
+            image_dir_name=input_image_dir_name)
+
+        if num_candidates <= 0:
+            num_candidates = None
+
+        novelty_dict = short_course.do_streaming_novelty_detection(
+            baseline_file_names=baseline_file_names,
+            test_file_names=test_file_names,
+            image_normalization_dict=cnn_metadata_dict[
+                short_course.NORMALIZATION_DICT_KEY],
+            cnn_model_object=cnn_model_object,
+            cnn_feature_layer_name=short_course.get_cnn_flatten_layer(
+                cnn_model_object),
+            ucn_model_object=ucn_model_object,
+            num_novel_test_images=num_test_examples,
+            percent_svd_variance_to_keep=percent_svd_variance_to_keep,
+            num_candidates=num_candidates)
+        print(SEPARATOR_STRING)
+
+        novelty_file_name = '{0:s}/novelty_results.p'.format(
+            top_output_dir_name)
+        print('Writing novelty results to: "{0:s}"...\n'.format(
+            novelty_file_name))
+        _write_novelty_results(novelty_dict=novelty_dict,
+                               pickle_file_name=novelty_file_name)
+
+        num_novel_examples = len(novelty_dict[short_course.STORM_IDS_KEY])
+
+        for i in range(num_novel_examples):
+            _plot_novelty_detection(
+                predictor_names=novelty_dict[short_course.PREDICTOR_NAMES_KEY],
+                novelty_dict=novelty_dict, test_index=i,
+                top_output_dir_name=top_output_dir_name)
+            print('\n')
+
+        return
+
     # Read images.
     image_file_names = short_course.find_many_image_files(
         first_date_string=first_date_string, last_date_string=last_date_string,
@@ -319,7 +415,8 @@ def _run(input_ucn_file_name, input_image_dir_name, first_date_string,
 
     for i in range(num_test_examples):
         _plot_novelty_detection(
-            image_dict=image_dict, novelty_dict=novelty_dict, test_index=i,
+            predictor_names=image_dict[short_course.PREDICTOR_NAMES_KEY],
+            novelty_dict=novelty_dict, test_index=i,
             top_output_dir_name=top_output_dir_name)
         print('\n')
 
@@ -337,5 +434,11 @@ if __name__ == '__main__':
         num_test_examples=getattr(INPUT_ARG_OBJECT, NUM_TEST_EX_ARG_NAME),
         percent_svd_variance_to_keep=getattr(
             INPUT_ARG_OBJECT, PERCENT_VARIANCE_ARG_NAME),
+        use_streaming=bool(getattr(INPUT_ARG_OBJECT, STREAMING_ARG_NAME)),
+        first_baseline_date_string=getattr(
+            INPUT_ARG_OBJECT, FIRST_BASELINE_DATE_ARG_NAME),
+        last_baseline_date_string=getattr(
+            INPUT_ARG_OBJECT, LAST_BASELINE_DATE_ARG_NAME),
+        num_candidates=getattr(INPUT_ARG_OBJECT, NUM_CANDIDATES_ARG_NAME),
         top_output_dir_name=getattr(INPUT_ARG_OBJECT, OUTPUT_DIR_ARG_NAME)
     )
@@ -20,7 +20,8 @@ CLASSIFIERS = [
     'Development Status :: 2 - Pre-Alpha',
     'Intended Audience :: Science/Research',
     'License :: OSI Approved :: MIT License',
-    'Programming Language :: Python :: 2.7'
+    'Programming Language :: Python :: 3 :: Only',
+    'Programming Language :: Python :: 3.6'
 ]
 
 if __name__ == '__main__':
@@ -36,5 +37,6 @@ if __name__ == '__main__':
           scripts=[],
           keywords=KEYWORDS,
           classifiers=CLASSIFIERS,
+          python_requires='>=3.6',
           include_package_data=True,
           zip_safe=False)